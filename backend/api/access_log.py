@@ -0,0 +1,168 @@
+# api/access_log.py
+"""
+Query access log.
+
+Every summary / RAG / QA request records the document it targeted and (for
+questions) the question. Requests only bump in-memory counters; a background
+thread folds them into the `document_access` and `query_log` tables every
+ACCESS_LOG_FLUSH_S, so the request path never waits on the database.
+
+Only the ACCESS_LOG_QUESTIONS most recently asked distinct questions are kept
+per document. Questions are grouped case- and whitespace-insensitively; the
+latest wording is stored. Counts are added with INSERT ... ON CONFLICT DO
+UPDATE (SQLite / PostgreSQL), so workers flushing the same new question at
+once both land.
+
+api/warmup.py reads `hot_documents` and `frequent_questions` at startup.
+
+    ACCESS_LOG_ENABLED=1   ACCESS_LOG_FLUSH_S=10   ACCESS_LOG_QUESTIONS=50
+"""
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from services.logging_setup import get_logger
+from .db import SessionLocal
+from .models import DocumentAccess, QueryLog
+
+logger = get_logger(__name__)
+
+ACCESS_LOG_ENABLED = os.environ.get("ACCESS_LOG_ENABLED", "1") == "1"
+ACCESS_LOG_FLUSH_S = float(os.environ.get("ACCESS_LOG_FLUSH_S", "10"))
+ACCESS_LOG_QUESTIONS = int(os.environ.get("ACCESS_LOG_QUESTIONS", "50"))
+# longest question stored (longer ones are still counted, by their prefix)
+_MAX_QUESTION_CHARS = 500
+
+
+def question_key(question: str) -> str:
+    return " ".join(question.lower().split())[:_MAX_QUESTION_CHARS]
+
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _add_counts(db, model, keys: Tuple[str, ...], counter: str, rows: List[Dict]):
+    """Insert `rows`, or add their `counter` to the existing row and overwrite the other columns."""
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is None:  # no upsert: get-or-create (concurrent first inserts may conflict)
+        for values in rows:
+            row = db.query(model).filter_by(**{k: values[k] for k in keys}).first()
+            if row is None:
+                db.add(model(**values))
+                continue
+            for name, value in values.items():
+                setattr(row, name, getattr(row, name) + value if name == counter else value)
+        return
+    table = model.__table__
+    for values in rows:
+        stmt = insert(table).values(**values)
+        updates = {name: stmt.excluded[name] for name in values if name not in keys}
+        updates[counter] = table.c[counter] + stmt.excluded[counter]
+        db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=updates))
+
+
+class AccessLog:
+    def __init__(self, session_factory: Callable = SessionLocal, keep_questions: int = ACCESS_LOG_QUESTIONS):
+        self.session_factory = session_factory
+        self.keep_questions = keep_questions
+        self._lock = threading.Lock()
+        self._docs: Counter = Counter()
+        self._questions: Dict[Tuple[str, str], List] = {}  # (doc, key) -> [count, latest wording, last asked]
+        self._last: Dict[str, datetime] = {}
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def record(self, doc_id: Optional[str], question: Optional[str] = None):
+        """Count one request for `doc_id` (cheap: the DB write happens on the next flush)."""
+        if not ACCESS_LOG_ENABLED or not doc_id:
+            return
+        now = datetime.utcnow()
+        with self._lock:
+            self._docs[doc_id] += 1
+            self._last[doc_id] = now
+            if question and question.strip():
+                key = question_key(question)
+                entry = self._questions.setdefault((doc_id, key), [0, "", now])
+                entry[0] += 1
+                entry[1] = question.strip()[:_MAX_QUESTION_CHARS]
+                entry[2] = now
+
+    def flush(self) -> int:
+        """Write pending counts to the DB; returns the number of requests written."""
+        with self._lock:
+            docs, questions, last = self._docs, self._questions, self._last
+            self._docs, self._questions, self._last = Counter(), {}, {}
+        if not docs:
+            return 0
+        db = self.session_factory()
+        try:
+            _add_counts(db, DocumentAccess, ("doc_id",), "queries", [
+                {"doc_id": doc_id, "queries": n, "last_query_at": last[doc_id]} for doc_id, n in docs.items()
+            ])
+            _add_counts(db, QueryLog, ("doc_id", "question_key"), "count", [
+                {"doc_id": doc_id, "question_key": key, "question": text, "count": n, "last_asked_at": asked}
+                for (doc_id, key), (n, text, asked) in questions.items()
+            ])
+            db.flush()
+            for doc_id in {d for d, _ in questions}:
+                stale = (db.query(QueryLog.id).filter_by(doc_id=doc_id)
+                         .order_by(QueryLog.last_asked_at.desc()).offset(self.keep_questions).all())
+                if stale:
+                    db.query(QueryLog).filter(QueryLog.id.in_([r.id for r in stale])).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("access_log_flush_failed", extra={"error": str(e), "requests": sum(docs.values())})
+            return 0
+        finally:
+            db.close()
+        return sum(docs.values())
+
+    # ---------------- reads (warm-up) ----------------
+    def hot_documents(self, limit: int) -> List[str]:
+        """Up to `limit` documents, most queried first."""
+        db = self.session_factory()
+        try:
+            rows = (db.query(DocumentAccess.doc_id)
+                    .order_by(DocumentAccess.queries.desc(), DocumentAccess.last_query_at.desc()).limit(limit).all())
+            return [r.doc_id for r in rows]
+        finally:
+            db.close()
+
+    def frequent_questions(self, doc_id: str, limit: int) -> List[str]:
+        db = self.session_factory()
+        try:
+            rows = (db.query(QueryLog.question).filter_by(doc_id=doc_id)
+                    .order_by(QueryLog.count.desc(), QueryLog.last_asked_at.desc()).limit(limit).all())
+            return [r.question for r in rows]
+        finally:
+            db.close()
+
+    # ---------------- background flusher ----------------
+    def _run(self, interval: float):
+        while not self._stopping.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self, interval: float = ACCESS_LOG_FLUSH_S):
+        if not ACCESS_LOG_ENABLED or interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="access-log", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+access_log = AccessLog()
@@ -0,0 +1,226 @@
+# api/admission.py
+"""
+Admission control for heavy endpoints.
+
+Every heavy request belongs to an endpoint class with its own concurrency
+limit and bounded wait queue. All classes draw from one pool of worker
+slots, but RESERVED_INTERACTIVE of those slots can only be used by the
+interactive QA class, so batch ingestion can never starve question
+answering. When a class queue is full (or a queued request waits too
+long) the request is rejected with 429 and a Retry-After hint.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from services.metrics import REGISTRY
+
+TOTAL_SLOTS = int(os.environ.get("ADMISSION_TOTAL_SLOTS", "12"))
+RESERVED_INTERACTIVE = int(os.environ.get("ADMISSION_RESERVED_INTERACTIVE", "4"))
+
+IN_FLIGHT = REGISTRY.gauge("admission_in_flight", "Requests running per endpoint class.", ("lane",))
+QUEUED = REGISTRY.gauge("admission_queued", "Requests waiting per endpoint class.", ("lane",))
+REJECTED = REGISTRY.counter("admission_rejected_total", "Requests rejected with 429.", ("lane", "reason"))
+QUEUE_WAIT = REGISTRY.histogram("admission_queue_wait_seconds", "Time spent waiting for a slot.", ("lane",))
+
+
+class Lane:
+    def __init__(self, name: str, limit: int, queue_limit: int, queue_timeout: float, priority: int, interactive: bool = False):
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.priority = priority  # lower runs first when slots free up
+        self.interactive = interactive
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.avg_service_s = 1.0  # EWMA, feeds Retry-After
+
+    def observe(self, seconds: float):
+        self.avg_service_s = 0.8 * self.avg_service_s + 0.2 * seconds
+
+
+def _env_lane(name: str, limit: int, queue_limit: int, timeout: float, priority: int, interactive: bool = False) -> Lane:
+    key = name.upper()
+    return Lane(
+        name,
+        limit=int(os.environ.get(f"LANE_{key}_LIMIT", limit)),
+        queue_limit=int(os.environ.get(f"LANE_{key}_QUEUE", queue_limit)),
+        queue_timeout=float(os.environ.get(f"LANE_{key}_TIMEOUT_S", timeout)),
+        priority=priority,
+        interactive=interactive,
+    )
+
+
+class Rejected(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} lane is {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, lanes, total_slots: int = TOTAL_SLOTS, reserved_interactive: int = RESERVED_INTERACTIVE):
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}
+        self.total_slots = total_slots
+        self.reserved_interactive = min(reserved_interactive, total_slots)
+        self.in_use = 0
+        self.batch_in_use = 0
+
+    def _can_run(self, lane: Lane) -> bool:
+        if lane.in_flight >= lane.limit:
+            return False
+        if self.in_use >= self.total_slots:
+            return False
+        return lane.interactive or self.batch_in_use < self.total_slots - self.reserved_interactive
+
+    def _take(self, lane: Lane):
+        lane.in_flight += 1
+        self.in_use += 1
+        if not lane.interactive:
+            self.batch_in_use += 1
+        IN_FLIGHT.set(lane.in_flight, lane=lane.name)
+
+    def _retry_after(self, lane: Lane) -> int:
+        backlog = len(lane.waiters) + lane.in_flight
+        return max(1, int(lane.avg_service_s * backlog / max(1, lane.limit)))
+
+    def _dispatch(self):
+        """Hand freed slots to waiters, highest-priority lane first."""
+        for lane in sorted(self.lanes.values(), key=lambda l: l.priority):
+            while lane.waiters and self._can_run(lane):
+                fut = lane.waiters.popleft()
+                if fut.done():
+                    continue
+                self._take(lane)
+                fut.set_result(True)
+            QUEUED.set(len(lane.waiters), lane=lane.name)
+
+    def _outranked(self, lane: Lane) -> bool:
+        """True when a higher-priority lane has queued work that could use a free slot."""
+        return any(
+            other.priority < lane.priority and other.waiters and self._can_run(other)
+            for other in self.lanes.values()
+        )
+
+    async def acquire(self, name: str):
+        lane = self.lanes[name]
+        if not lane.waiters and self._can_run(lane) and not self._outranked(lane):
+            self._take(lane)
+            return
+        if len(lane.waiters) >= lane.queue_limit:
+            REJECTED.inc(lane=name, reason="queue_full")
+            raise Rejected(name, "queue full", self._retry_after(lane))
+
+        fut = asyncio.get_running_loop().create_future()
+        lane.waiters.append(fut)
+        QUEUED.set(len(lane.waiters), lane=name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=lane.queue_timeout)
+        except asyncio.CancelledError:
+            # client went away while queued: give back a slot granted meanwhile
+            if fut.done() and not fut.cancelled():
+                self.release(name)
+            else:
+                fut.cancel()
+                try:
+                    lane.waiters.remove(fut)
+                except ValueError:
+                    pass
+                QUEUED.set(len(lane.waiters), lane=name)
+            raise
+        except asyncio.TimeoutError:
+            if fut.done():
+                # a slot was granted just as the timer fired: keep it
+                QUEUE_WAIT.observe(time.perf_counter() - start, lane=name)
+                return
+            fut.cancel()
+            try:
+                lane.waiters.remove(fut)
+            except ValueError:
+                pass
+            QUEUED.set(len(lane.waiters), lane=name)
+            REJECTED.inc(lane=name, reason="queue_timeout")
+            raise Rejected(name, "busy", self._retry_after(lane))
+        QUEUE_WAIT.observe(time.perf_counter() - start, lane=name)
+
+    def release(self, name: str, service_seconds: Optional[float] = None):
+        lane = self.lanes[name]
+        lane.in_flight -= 1
+        self.in_use -= 1
+        if not lane.interactive:
+            self.batch_in_use -= 1
+        if service_seconds is not None:
+            lane.observe(service_seconds)
+        IN_FLIGHT.set(lane.in_flight, lane=name)
+        self._dispatch()
+
+    def status(self) -> Dict:
+        return {
+            "total_slots": self.total_slots,
+            "reserved_interactive": self.reserved_interactive,
+            "in_use": self.in_use,
+            "lanes": {
+                lane.name: {
+                    "limit": lane.limit,
+                    "in_flight": lane.in_flight,
+                    "queued": len(lane.waiters),
+                    "queue_limit": lane.queue_limit,
+                    "priority": lane.priority,
+                    "interactive": lane.interactive,
+                    "avg_service_s": round(lane.avg_service_s, 3),
+                }
+                for lane in self.lanes.values()
+            },
+        }
+
+
+controller = AdmissionController([
+    _env_lane("qa", limit=TOTAL_SLOTS, queue_limit=64, timeout=30, priority=0, interactive=True),
+    _env_lane("summarize", limit=2, queue_limit=8, timeout=60, priority=1),
+    _env_lane("ingest", limit=3, queue_limit=16, timeout=120, priority=2),
+])
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Map a request to its endpoint class (None = not admission-controlled)."""
+    if method == "OPTIONS" or path.startswith("/youtube/status"):
+        return None
+    if method == "GET" and path.startswith("/youtube/bulk/"):
+        return None
+    if path.startswith(("/rag/", "/qa")):
+        return "qa"
+    if path.startswith("/summarize/"):
+        return "summarize"
+    if path.startswith(("/youtube/", "/files/upload", "/process")):
+        return "ingest"
+    return None
+
+
+# ------------------------
+# Middleware
+# ------------------------
+async def admission_middleware(request: Request, call_next):
+    lane = classify(request.method, request.url.path)
+    if lane is None:
+        return await call_next(request)
+    try:
+        await controller.acquire(lane)
+    except Rejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Server busy ({e}), retry later"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        controller.release(lane, time.perf_counter() - start)
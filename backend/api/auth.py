@@ -1,13 +1,28 @@
 # api/auth.py
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import hmac
+import threading
+import time
 from jose import jwt, JWTError
-from fastapi import HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+from services.metrics import record_cache
 
 SECRET_KEY = os.environ.get("JWT_SECRET", "change_me_in_prod")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("JWT_EXP_MIN", "60"))
 
+# Protected heavy endpoints only reject anonymous callers when this is on,
+# so the current frontend (which does not send tokens yet) keeps working.
+REQUIRE_AUTH = os.environ.get("REQUIRE_AUTH", "0") == "1"
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+# Shared secret for operator endpoints (profiling, storage collection); unset = those endpoints do not exist.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -20,3 +35,71 @@ def decode_access_token(token: str) -> dict:
         return payload
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+# ======================================================
+# ♻️ Verified-token LRU cache
+# Keyed by a digest of the token; entries are dropped once the token's own
+# `exp` passes, so caching never extends a token's lifetime.
+# ======================================================
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_lock = threading.Lock()
+
+def decode_access_token_cached(token: str) -> dict:
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+    with _token_lock:
+        entry = _token_cache.get(key)
+        if entry is not None:
+            payload, exp = entry
+            if exp > now:
+                _token_cache.move_to_end(key)
+                record_cache("jwt", hit=True)
+                return payload
+            del _token_cache[key]
+    record_cache("jwt", hit=False)
+    payload = decode_access_token(token)
+    exp = float(payload.get("exp", now))
+    with _token_lock:
+        _token_cache[key] = (payload, exp)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+# ======================================================
+# 🧩 FastAPI dependencies
+# ======================================================
+_bearer = HTTPBearer(auto_error=False)
+
+def get_optional_user(creds: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[dict]:
+    """Token claims ({"sub", "user_id", "exp"}) when a valid bearer token is sent, else None."""
+    if creds is None:
+        return None
+    return decode_access_token_cached(creds.credentials)
+
+def get_current_user(user: Optional[dict] = Depends(get_optional_user)) -> dict:
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+def require_user(user: Optional[dict] = Depends(get_optional_user)) -> Optional[dict]:
+    """Guard for heavy endpoints: enforced only when REQUIRE_AUTH=1."""
+    if REQUIRE_AUTH:
+        return get_current_user(user)
+    return user
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Guard for operator endpoints: the X-Admin-Token header must match ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+def user_key(user: Optional[dict]) -> Optional[str]:
+    """Stable owner key for storage accounting (None for anonymous callers)."""
+    if not user:
+        return None
+    return str(user.get("user_id") or user.get("sub"))
@@ -1,52 +1,107 @@
 # api/crud.py
+import os
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from . import models
 from .schemas import UserCreate
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 MAX_PW_BYTES = 72
 
-def hash_password(password: str) -> str:
+# ======================================================
+# 🔐 Dedicated bcrypt executor
+# bcrypt is deliberately slow; run it on its own small pool so a burst of
+# logins cannot occupy the threadpool that serves RAG / summarize requests.
+# ======================================================
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.environ.get("BCRYPT_MAX_PENDING", "32"))
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_MAX_PENDING)
+
+def _truncate(password: str) -> str:
     pw = password.strip()
     if len(pw.encode("utf-8")) > MAX_PW_BYTES:
         pw = pw[:MAX_PW_BYTES]
-    return pwd_context.hash(pw)
+    return pw
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(_truncate(password))
 
 def verify_password(plain: str, hashed: str) -> bool:
     try:
-        pw = plain.strip()
-        if len(pw.encode("utf-8")) > MAX_PW_BYTES:
-            pw = pw[:MAX_PW_BYTES]
-        return pwd_context.verify(pw, hashed)
+        return pwd_context.verify(_truncate(plain), hashed)
     except Exception:
         return False
 
+async def _run_bcrypt(fn, *args):
+    if not _bcrypt_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, fn, *args)
+    finally:
+        _bcrypt_slots.release()
+
+async def hash_password_async(password: str) -> str:
+    return await _run_bcrypt(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_bcrypt(verify_password, plain, hashed)
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user_in: UserCreate):
+def _validate_new_user(user_in: UserCreate):
     if user_in.password != user_in.confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match")
     if len(user_in.password) < 8:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password too short (min 8 chars)")
-    existing = get_user_by_email(db, user_in.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = hash_password(user_in.password)
-    user = models.User(email=user_in.email, hashed_password=hashed)
+
+def _insert_user(db: Session, email: str, hashed: str):
+    user = models.User(email=email, hashed_password=hashed)
     db.add(user)
     db.commit()
     db.refresh(user)
     return user
 
-def update_user_password(db: Session, user: models.User, new_password: str):
-    if len(new_password) < 8:
-        raise HTTPException(status_code=400, detail="Password too short (min 8 chars)")
-    hashed = hash_password(new_password)
+def _save_password(db: Session, user: models.User, hashed: str):
     user.hashed_password = hashed
     db.add(user)
     db.commit()
     db.refresh(user)
     return user
+
+def create_user(db: Session, user_in: UserCreate):
+    _validate_new_user(user_in)
+    existing = get_user_by_email(db, user_in.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return _insert_user(db, user_in.email, hash_password(user_in.password))
+
+async def create_user_async(db: Session, user_in: UserCreate):
+    _validate_new_user(user_in)
+    existing = await run_in_threadpool(get_user_by_email, db, user_in.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed = await hash_password_async(user_in.password)
+    return await run_in_threadpool(_insert_user, db, user_in.email, hashed)
+
+def update_user_password(db: Session, user: models.User, new_password: str):
+    if len(new_password) < 8:
+        raise HTTPException(status_code=400, detail="Password too short (min 8 chars)")
+    return _save_password(db, user, hash_password(new_password))
+
+async def update_user_password_async(db: Session, user: models.User, new_password: str):
+    if len(new_password) < 8:
+        raise HTTPException(status_code=400, detail="Password too short (min 8 chars)")
+    hashed = await hash_password_async(new_password)
+    return await run_in_threadpool(_save_password, db, user, hashed)
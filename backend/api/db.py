@@ -36,15 +36,16 @@ SessionLocal = sessionmaker(
 def init_db():
     """
     Initialize the database tables.
-    If tables don't exist, creates them automatically.
+    Tables that don't exist yet (a fresh DB, or ones added since) are created.
     """
     try:
         inspector = inspect(engine)
-        existing_tables = inspector.get_table_names()
+        existing_tables = set(inspector.get_table_names())
+        missing = [t for t in Base.metadata.sorted_tables if t.name not in existing_tables]
 
-        if not existing_tables:
-            print("🧱 No tables found — creating new tables...")
-            Base.metadata.create_all(bind=engine)
+        if missing:
+            print(f"🧱 Creating missing tables: {', '.join(t.name for t in missing)}")
+            Base.metadata.create_all(bind=engine, tables=missing)
             print("✅ Database tables created successfully.")
         else:
             print("✅ Database already initialized — skipping table creation.")
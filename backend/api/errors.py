@@ -0,0 +1,11 @@
+# api/errors.py
+from fastapi import HTTPException, status
+from services.memory_governor import AdmissionTimeout
+
+def busy(e: AdmissionTimeout) -> HTTPException:
+    """503 for requests the memory governor could not admit in time."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
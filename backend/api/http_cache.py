@@ -0,0 +1,250 @@
+# api/http_cache.py
+"""
+HTTP caching and compression for the read-heavy routes.
+
+- ETags: strong validators derived from the document's live index version
+  (embeddings_index.index_version changes on every build/append, and between
+  an evicted build and its re-ingest) plus whatever else shapes the body
+  (question, top_k, model). Computed before
+  any work, so `If-None-Match` on /summarize/{id} or a repeated RAG GET
+  returns 304 without loading a model.
+- Cache-Control: one policy per route class (CACHE_CONTROL). Responses are
+  "private" because heavy routes can sit behind a bearer token.
+- Compression: CompressionMiddleware encodes single-body responses above
+  COMPRESS_MIN_BYTES with brotli (when installed and accepted) or gzip.
+  Streaming responses pass through untouched. The encoding is appended to
+  the ETag ("...-gzip") so each representation keeps its own validator.
+- JSON: FastJSONResponse renders with orjson when installed and with a
+  compact stdlib encoder otherwise; hot routes return it directly, which
+  also skips FastAPI's jsonable_encoder pass.
+
+    SUMMARY_CACHE_MAX_AGE=60   RAG_CACHE_MAX_AGE=0 (0 = revalidate every time)
+    COMPRESS_MIN_BYTES=1024    COMPRESS_GZIP_LEVEL=6   COMPRESS_BROTLI_QUALITY=4
+    HTTP_ETAG_SALT=            bump to invalidate every client copy at once
+"""
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from services.embeddings_index import index_version
+from services.metrics import REGISTRY
+from services import model_registry
+from services.model_registry import MODEL_BACKEND
+from services.storage import INDEX_DIR
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+SUMMARY_CACHE_MAX_AGE = int(os.environ.get("SUMMARY_CACHE_MAX_AGE", "60"))
+RAG_CACHE_MAX_AGE = int(os.environ.get("RAG_CACHE_MAX_AGE", "0"))
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+HTTP_ETAG_SALT = os.environ.get("HTTP_ETAG_SALT", "")
+
+NOT_MODIFIED = REGISTRY.counter("http_not_modified_total", "Conditional GETs answered with 304.", ("policy",))
+COMPRESSED_BYTES = REGISTRY.counter("http_compressed_bytes_total", "Response bytes before and after compression.",
+                                    ("encoding", "stage"))
+
+
+def _policy(max_age: int) -> str:
+    return f"private, max-age={max_age}, must-revalidate" if max_age > 0 else "private, no-cache"
+
+
+CACHE_CONTROL = {
+    "summary": _policy(SUMMARY_CACHE_MAX_AGE),
+    "rag": _policy(RAG_CACHE_MAX_AGE),
+}
+
+
+# ======================================================
+# 🧾 JSON rendering
+# ======================================================
+def _default(obj: Any):
+    if hasattr(obj, "tolist"):  # numpy scalars / arrays
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ======================================================
+# 🏷️ ETags + conditional GET
+# ======================================================
+def document_etag(doc_id: str, *parts: Any) -> Optional[str]:
+    """Strong ETag for a response about `doc_id`; None when it has no index (nothing to validate)."""
+    version = index_version(os.path.join(INDEX_DIR, doc_id))
+    if version is None:
+        return None
+    key = "\x1f".join(str(p) for p in (HTTP_ETAG_SALT, doc_id, version, *parts))
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def answer_etag(doc_id: str, question: str, top_k: int) -> Optional[str]:
+    # generation is beam search (deterministic) for a given model and index; the
+    # governor may have loaded a smaller variant than RAG_MODEL
+    return document_etag(doc_id, "rag", question, top_k, model_registry.variant("rag"), MODEL_BACKEND)
+
+
+def summary_etag(doc_id: str, *parts: Any) -> Optional[str]:
+    # the summarizer variant depends on the memory available when it was loaded
+    return document_etag(doc_id, "summary", *parts, model_registry.variant("summarizer"), MODEL_BACKEND)
+
+
+def _opaque(tag: str) -> str:
+    """The tag without W/ or the content-coding suffix CompressionMiddleware added."""
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag) == etag for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: Optional[str], policy: str) -> dict:
+    headers = {"Cache-Control": CACHE_CONTROL[policy]}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(request: Request, etag: Optional[str], policy: str) -> Optional[Response]:
+    """A 304 when the client already holds this version, else None (go on and build the body)."""
+    if request.method not in ("GET", "HEAD") or not matches(request.headers.get("if-none-match"), etag):
+        return None
+    NOT_MODIFIED.inc(policy=policy)
+    return Response(status_code=304, headers=cache_headers(etag, policy))
+
+
+def cached_json(content: Any, etag: Optional[str], policy: str) -> FastJSONResponse:
+    return FastJSONResponse(content, headers=cache_headers(etag, policy))
+
+
+# ======================================================
+# 🗜️ Response compression (pure ASGI)
+# ======================================================
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _accepted(header: str) -> Iterable[str]:
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        yield name.strip().lower()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set(_accepted(accept_encoding))
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_bytes: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for k, v in scope.get("headers", ()):
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if state["passthrough"]:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            start, body = state["start"], message.get("body", b"")
+            headers = [(k.lower(), v) for k, v in start.get("headers", [])]
+            content_type = next((v.decode("latin-1") for k, v in headers if k == b"content-type"), "")
+            if (message.get("more_body")  # streaming: leave it alone
+                    or len(body) < self.min_bytes
+                    or any(k == b"content-encoding" for k, _ in headers)
+                    or not content_type.startswith(_COMPRESSIBLE)):
+                state["passthrough"] = True
+                await send(start)
+                return await send(message)
+
+            encoded = compress(body, encoding)
+            COMPRESSED_BYTES.inc(len(body), encoding=encoding, stage="in")
+            COMPRESSED_BYTES.inc(len(encoded), encoding=encoding, stage="out")
+            out = []
+            vary = False
+            for k, v in headers:
+                if k == b"content-length":
+                    continue
+                if k == b"etag" and v.endswith(b'"'):
+                    v = v[:-1] + f'-{encoding}"'.encode("latin-1")
+                if k == b"vary":
+                    vary = True
+                    if b"accept-encoding" not in v.lower():
+                        v = v + b", Accept-Encoding"
+                out.append((k, v))
+            out.append((b"content-encoding", encoding.encode("latin-1")))
+            out.append((b"content-length", str(len(encoded)).encode("latin-1")))
+            if not vary:
+                out.append((b"vary", b"Accept-Encoding"))
+            state["passthrough"] = True
+            await send({**start, "headers": out})
+            await send({**message, "body": encoded})
+
+        await self.app(scope, receive, send_wrapper)
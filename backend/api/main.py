@@ -1,6 +1,8 @@
 # api/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, HTTPException, Request, status, Query
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import os
 from sqlalchemy.orm import Session
 
@@ -9,6 +11,9 @@ from sqlalchemy.orm import Session
 # ------------------------
 from .db import init_db, get_db
 from . import schemas, crud
+from .auth import require_admin, require_user
+from .errors import busy
+from services.memory_governor import AdmissionTimeout
 
 # Routes inside api/
 from .schemas import UserCreate, UserOut, LoginIn
@@ -21,6 +26,17 @@ from .routes.transcribe_route import router as transcribe_router
 from .routes.rag_route import router as rag_router
 from .routes.summarize_route import router as summarize_router
 from .routes.qa import router as qa_router
+from .routes.metrics_route import router as metrics_router
+from .routes.system_route import router as system_router
+from .routes.profiling_route import router as profiling_router
+from .middleware import metrics_middleware, ProfilingMiddleware
+from .http_cache import CompressionMiddleware, FastJSONResponse, answer_etag, cached_json, not_modified
+from .admission import admission_middleware
+from .access_log import access_log
+from .warmup import warmup
+from .services.emailer import email_queue
+from services.storage import artifacts
+from services import bulk_ingest, parallel_embed, profiling, progressive
 
 # Routes outside api/ (files upload)
 from .routes.files import router as files_router
@@ -29,15 +45,38 @@ from .routes.files import router as files_router
 # FAISS + RAG core services
 # ------------------------
 from services.embeddings_index import FaissIndexManager
-from services.rag import rag_answer
+from services.rag import rag_answer, RAG_TOP_K
+from services.logging_setup import get_logger
+
+logger = get_logger("api")
 
 # ------------------------
 # Initialize App
 # ------------------------
-app = FastAPI(title="AI Video & Document Summarizer / RAG Engine")
+app = FastAPI(title="AI Video & Document Summarizer / RAG Engine", default_response_class=FastJSONResponse)
+
+# ------------------------
+# Per-request profiling (innermost, so queue time is not profiled; idle unless armed)
+# ------------------------
+app.add_middleware(ProfilingMiddleware)
+
+# ------------------------
+# Admission control (per-class concurrency limits, 429 when queues are full)
+# ------------------------
+app.middleware("http")(admission_middleware)
+
+# ------------------------
+# Request metrics (latency / status per route)
+# ------------------------
+app.middleware("http")(metrics_middleware)
 
 # ------------------------
-# CORS
+# gzip / brotli for large JSON bodies (outside the metrics, so latency excludes it)
+# ------------------------
+app.add_middleware(CompressionMiddleware)
+
+# ------------------------
+# CORS (added last = outermost, so 429/503 responses still carry CORS headers)
 # ------------------------
 app.add_middleware(
     CORSMiddleware,
@@ -54,9 +93,24 @@ app.add_middleware(
 def on_startup():
     try:
         init_db()
-        print("✅ Database initialized successfully.")
+        logger.info("database_initialized")
     except Exception as e:
-        print(f"⚠️ Database initialization skipped or failed: {e}")
+        logger.warning("database_init_failed", extra={"error": str(e)})
+    # background quota enforcement / tmp cleanup (STORAGE_GC_INTERVAL_S=0 disables)
+    artifacts.start()
+    access_log.start()
+    # hot indexes + frequent question embeddings; /ready reports progress
+    warmup.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # flush queued outbound email before the process exits
+    email_queue.stop(timeout=10)
+    artifacts.stop(timeout=10)
+    access_log.stop(timeout=10)
+    parallel_embed.shutdown()
+    progressive.shutdown()
+    bulk_ingest.shutdown()
 
 # ------------------------
 # Root endpoint
@@ -65,25 +119,29 @@ def on_startup():
 def root():
     return {"status": "ok", "project": "AI YouTube & Document Summarizer"}
 
+# ------------------------
+# Readiness: 503 until the startup warm-up is done
+# ------------------------
+@app.get("/ready")
+def ready():
+    state = warmup.status()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 # ------------------------
 # User Signup
 # ------------------------
 @app.post("/signup", response_model=UserOut)
-def signup(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing = get_user_by_email(db, user_in.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    user = create_user(db, user_in)
-    return user
+async def signup(user_in: UserCreate, db: Session = Depends(get_db)):
+    return await crud.create_user_async(db, user_in)
 
-@app.post("/login")
-def login(user_in: LoginIn, db: Session = Depends(get_db)):
+@app.post("/login", response_model=UserOut)  # never echo the password hash
+async def login(user_in: LoginIn, db: Session = Depends(get_db)):
 
-    user = get_user_by_email(db, user_in.email)
+    user = await run_in_threadpool(crud.get_user_by_email, db, user_in.email)
     if not user:
         raise HTTPException(status_code=400, detail="User not found")
 
-    if not verify_password(user_in.password, user.password_hash):
+    if not await crud.verify_password_async(user_in.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect password")
 
     return user
@@ -92,21 +150,29 @@ def login(user_in: LoginIn, db: Session = Depends(get_db)):
 # ====================================================
 # INCLUDE ROUTERS (clean + fixed order)
 # ====================================================
+# Heavy routers share the (cached) bearer-token check; it only rejects
+# anonymous calls when REQUIRE_AUTH=1.
+auth_guard = [Depends(require_user)]
+
 app.include_router(auth_router)           # /auth/*
-app.include_router(youtube_router)         # /youtube/*
-app.include_router(transcribe_router)      # /process/*
-app.include_router(files_router)           # /files/*
-app.include_router(rag_router)             # /rag/*
-app.include_router(qa_router)              # /qa/*
-app.include_router(summarize_router)       # /summarize/*
+app.include_router(youtube_router, dependencies=auth_guard)     # /youtube/*
+app.include_router(transcribe_router, dependencies=auth_guard)  # /process/*
+app.include_router(files_router, dependencies=auth_guard)       # /files/*
+app.include_router(rag_router, dependencies=auth_guard)         # /rag/*
+app.include_router(qa_router, dependencies=auth_guard)          # /qa/*
+app.include_router(summarize_router, dependencies=auth_guard)   # /summarize/*
+app.include_router(metrics_router)         # /metrics
+app.include_router(system_router, dependencies=auth_guard)      # /system/*
+app.include_router(profiling_router, dependencies=[Depends(require_admin)])  # /system/profile/*
 
 
 
 # ====================================================
 # Unified RAG endpoint (text query about video/file)
 # ====================================================
-@app.get("/rag/query")
+@app.get("/rag/query", dependencies=auth_guard)
 def rag_query(
+    request: Request,
     question: str = Query(..., description="Ask a question about the transcript or document"),
     video_id: str | None = Query(None, description="Optional: Video/File ID")
 ):
@@ -120,21 +186,30 @@ def rag_query(
         if not video_id:
             raise HTTPException(status_code=404, detail="No FAISS index found. Process a video or file first.")
 
+        access_log.record(video_id, question)
+        etag = answer_etag(video_id, question, RAG_TOP_K)
+        unchanged = not_modified(request, etag, "rag")
+        if unchanged is not None:
+            return unchanged
+
         # Retrieve + answer
         answer_data = rag_answer(video_id, question)
 
-        return {
+        return cached_json({
             "video_id": video_id,
             "question": question,
             "answer": answer_data["answer"],
-            "sources": answer_data.get("sources", [])
-        }
+            "sources": answer_data.get("sources", []),
+            "coverage": answer_data.get("coverage"),
+        }, etag, "rag")
 
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG Query Failed: {str(e)}")
 
 
-@app.post("/rag/query")
+@app.post("/rag/query", dependencies=auth_guard)
 def rag_query_post(payload: dict):
     question = payload.get("question")
     video_id = payload.get("video_id")
@@ -148,14 +223,22 @@ def rag_query_post(payload: dict):
         if not video_id:
             video_id = fm._get_latest_video_id()
 
+        access_log.record(video_id, question)
         answer_data = rag_answer(video_id, question)
 
         return {
             "video_id": video_id,
             "question": question,
             "answer": answer_data["answer"],
-            "sources": answer_data.get("sources", [])
+            "sources": answer_data.get("sources", []),
+            "coverage": answer_data.get("coverage"),
         }
 
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG POST Failed: {str(e)}")
+
+
+# Endpoints run under the request's profile when one is armed (see services/profiling.py).
+profiling.instrument(app)
@@ -0,0 +1,64 @@
+# api/middleware.py
+import time
+from fastapi import Request
+from starlette.routing import Match
+from services.metrics import HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_FLIGHT
+from services.profiling import request_profiler, start_request_profile
+
+
+def _route_template(request: Request) -> str:
+    """Resolve the matched route path (e.g. /summarize/{video_id}) to keep label cardinality bounded."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+# ------------------------
+# Request metrics
+# ------------------------
+async def metrics_middleware(request: Request, call_next):
+    route = _route_template(request)
+    method = request.method
+    status_code = 500
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=route)
+        HTTP_REQUESTS.inc(method=method, route=route, status=status_code)
+
+
+# ------------------------
+# Per-request cProfile (armed through /system/profile/requests)
+# Plain ASGI so that, while disarmed, a request costs one attribute check.
+# ------------------------
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not request_profiler.armed:
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", ())}
+        if not request_profiler.claim(scope["path"], headers):
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profile = start_request_profile()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_profiler.record(profile, scope["method"], scope["path"], status["code"], time.perf_counter() - start)
@@ -1,5 +1,5 @@
 # api/models.py
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -11,3 +11,21 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+# Query access log (see api/access_log.py): per-document counts and the
+# questions asked about each document, used to pre-warm hot indexes.
+class DocumentAccess(Base):
+    __tablename__ = "document_access"
+    doc_id = Column(String, primary_key=True)
+    queries = Column(Integer, nullable=False, default=0)
+    last_query_at = Column(DateTime, default=datetime.utcnow)
+
+class QueryLog(Base):
+    __tablename__ = "query_log"
+    __table_args__ = (UniqueConstraint("doc_id", "question_key"),)
+    id = Column(Integer, primary_key=True)
+    doc_id = Column(String, index=True, nullable=False)
+    question_key = Column(String, nullable=False)  # normalized question
+    question = Column(Text, nullable=False)        # latest wording
+    count = Column(Integer, nullable=False, default=0)
+    last_asked_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,228 @@
+# api/prefork.py
+"""
+Preforking production launcher (POSIX).
+
+The parent imports the app, loads the read-only models and the most
+recently used FAISS indexes once, freezes the garbage collector and then
+forks the workers. Workers share those pages copy-on-write instead of each
+paying the full load time and memory:
+
+    cd backend
+    python -m api.prefork --workers 4 --port 8000
+    python -m api.prefork --workers 8 --max-requests 2000 --preload embedder,rag
+
+gc.freeze() moves every object that exists at fork time into a permanent
+generation, so collections in the workers never write to (and copy) the
+shared pages. Refcount updates on objects that workers actually use still
+copy their pages; model weights are large tensor buffers, which are not
+touched by refcounting.
+
+A worker exits gracefully after --max-requests requests (plus up to
+--max-requests-jitter, so workers do not recycle together) and the parent
+forks a fresh one from the preloaded image. SIGTERM/SIGINT stop all workers
+gracefully, SIGHUP recycles them one at a time.
+
+Kinds served by model servers (MODEL_SERVERS) are not preloaded: there is
+nothing to share. `python -m benchmarks.prefork_memory` compares per-worker
+unique memory with independently started workers.
+"""
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+from services.logging_setup import get_logger
+
+logger = get_logger("prefork")
+
+PREFORK_WORKERS = int(os.environ.get("PREFORK_WORKERS", str(os.cpu_count() or 2)))
+PREFORK_PRELOAD = os.environ.get("PREFORK_PRELOAD", "embedder,rag,summarizer")
+PREFORK_WARM_INDEXES = int(os.environ.get("PREFORK_WARM_INDEXES", "8"))
+PREFORK_MAX_REQUESTS = int(os.environ.get("PREFORK_MAX_REQUESTS", "1000"))
+PREFORK_MAX_REQUESTS_JITTER = int(os.environ.get("PREFORK_MAX_REQUESTS_JITTER", "100"))
+PREFORK_GRACEFUL_TIMEOUT_S = float(os.environ.get("PREFORK_GRACEFUL_TIMEOUT_S", "30"))
+
+
+# ======================================================
+# 📦 Parent-side preload
+# ======================================================
+def preload(kinds: List[str], warm_indexes: int = PREFORK_WARM_INDEXES) -> Dict[str, float]:
+    """Load models and hot indexes into this process; returns seconds spent per item."""
+    from services import model_registry
+    from services.embeddings_index import load_cached_index
+    from services.storage import artifacts
+
+    timings = {}
+    for kind in kinds:
+        if model_registry.is_remote(kind):
+            continue
+        start = time.perf_counter()
+        model_registry.get(kind)
+        timings[kind] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    warmed = 0
+    for doc_id in artifacts.recently_accessed(warm_indexes):
+        try:
+            load_cached_index(doc_id)
+            warmed += 1
+        except Exception as e:  # a broken index must not keep the server from starting
+            logger.warning("prefork_warm_failed", extra={"doc_id": doc_id, "error": str(e)})
+    timings["indexes"] = round(time.perf_counter() - start, 3)
+    logger.info("prefork_preloaded", extra={"timings": timings, "indexes": warmed})
+    return timings
+
+
+def freeze():
+    """Collect once, then move every surviving object out of the collector's reach."""
+    gc.collect()
+    gc.freeze()
+
+
+# ======================================================
+# 👷 Workers
+# ======================================================
+def _serve(app, sock: socket.socket, max_requests: int) -> int:
+    import uvicorn
+
+    gc.enable()
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)  # only the parent reacts to SIGHUP
+    config = uvicorn.Config(app, limit_max_requests=max_requests or None, log_config=None, access_log=False)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0
+
+
+class Arbiter:
+    """Keeps `workers` forked children running and replaces any that exit."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, max_requests: int, jitter: int,
+                 graceful_timeout: float = PREFORK_GRACEFUL_TIMEOUT_S):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}  # pid -> started
+        self._stopping = False
+        self._recycle: List[int] = []
+
+    def _spawn(self):
+        limit = self.max_requests + (random.randint(0, self.jitter) if self.max_requests and self.jitter else 0)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _serve(self.app, self.sock, limit)
+            except BaseException as e:
+                logger.error("prefork_worker_crashed", extra={"error": str(e)})
+            finally:
+                os._exit(code)
+        self.children[pid] = time.time()
+        logger.info("prefork_worker_started", extra={"pid": pid, "max_requests": limit})
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_hup(self, signum, frame):
+        self._recycle = list(self.children)
+
+    def _reap(self) -> int:
+        reaped = 0
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return reaped
+            if pid == 0:
+                return reaped
+            started = self.children.pop(pid, None)
+            if started is not None:
+                reaped += 1
+                logger.info("prefork_worker_exited", extra={
+                    "pid": pid, "code": os.waitstatus_to_exitcode(status), "uptime_s": round(time.time() - started, 1),
+                })
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+        for _ in range(self.workers):
+            self._spawn()
+        while not self._stopping:
+            self._reap()
+            if self._recycle and len(self.children) == self.workers:
+                # one at a time, so capacity never drops by more than a worker
+                pid = self._recycle.pop()
+                if pid in self.children:
+                    os.kill(pid, signal.SIGTERM)
+            while not self._stopping and len(self.children) < self.workers:
+                self._spawn()
+            time.sleep(0.2)
+        return self.stop()
+
+    def stop(self) -> int:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)  # uvicorn finishes in-flight requests
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning("prefork_worker_killed", extra={"pid": pid})
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap()
+        return 0
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# ======================================================
+# 🖥️ CLI
+# ======================================================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Preforking launcher with copy-on-write model sharing")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=PREFORK_WORKERS)
+    parser.add_argument("--preload", default=PREFORK_PRELOAD, help="comma-separated model kinds to load before forking")
+    parser.add_argument("--warm-indexes", type=int, default=PREFORK_WARM_INDEXES,
+                        help="most recently used indexes to load before forking")
+    parser.add_argument("--max-requests", type=int, default=PREFORK_MAX_REQUESTS, help="recycle a worker after this many (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=PREFORK_MAX_REQUESTS_JITTER)
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        parser.error("preforking needs os.fork(); on Windows use scripts/run_api.ps1 (uvicorn) instead")
+
+    # no automatic collections while building the shared image
+    gc.disable()
+    from api.main import app
+
+    sock = bind(args.host, args.port)
+    preload([k.strip() for k in args.preload.split(",") if k.strip()], args.warm_indexes)
+    freeze()
+    logger.info("prefork_listening", extra={"host": args.host, "port": args.port, "workers": args.workers})
+    return Arbiter(app, sock, args.workers, args.max_requests, args.max_requests_jitter).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
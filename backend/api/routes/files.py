@@ -1,66 +1,85 @@
 # routes/files.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from typing import Optional
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
+from ..auth import get_optional_user, user_key
 import os
+import shutil
 import uuid
-from services.file_reader import (
-    extract_text_from_pdf,
-    extract_text_from_docx,
-    extract_text_from_txt,
-    extract_text_from_csv
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from services.embeddings_index import FaissIndexManager
+from services.file_reader import EXTRACTORS
+from services.chunking import document_chunks
+from services.embeddings_index import FaissIndexManager, index_exists
+from services.storage import artifacts
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
 UPLOAD_DIR = "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# plain def: parsing, embedding and the admission wait run on the threadpool, never on the event loop
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+def upload_file(
+    file: UploadFile = File(...),
+    append_to: Optional[str] = Query(None, description="Add this file to an existing document instead of creating one"),
+    user: Optional[dict] = Depends(get_optional_user),
+):
     try:
+        if append_to and not index_exists(os.path.join("faiss_index", append_to)):
+            raise HTTPException(status_code=404, detail=f"No document {append_to} to append to")
+
         ext = file.filename.split(".")[-1].lower()
+        if ext not in EXTRACTORS:
+            raise HTTPException(status_code=400, detail="Unsupported file type")
         file_id = f"file_{uuid.uuid4().hex[:8]}"
         save_path = os.path.join(UPLOAD_DIR, f"{file_id}.{ext}")
 
+        # copy in 1 MB pieces: large CSV exports never sit in memory whole
         with open(save_path, "wb") as f:
-            f.write(await file.read())
+            shutil.copyfileobj(file.file, f, 1024 * 1024)
 
-        # Extract text
-        if ext == "pdf":
-            full_text = extract_text_from_pdf(save_path)
-        elif ext == "docx":
-            full_text = extract_text_from_docx(save_path)
-        elif ext == "txt":
-            full_text = extract_text_from_txt(save_path)
-        elif ext == "csv":
-            full_text = extract_text_from_csv(save_path)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-
-        if not full_text.strip():
-            raise HTTPException(status_code=400, detail="File contains no readable text.")
-
-        # Chunking
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
-        chunks = splitter.split_text(full_text)
-
-        # Metadata
-        metadata = [
-            {"start": i, "end": i + 1, "chunk_text": ch}
-            for i, ch in enumerate(chunks)
-        ]
+        # CSV rows are grouped under their header, DOCX paragraphs under their heading
+        metadata = document_chunks(save_path)
 
         # FAISS
         fm = FaissIndexManager()
-        folder = fm.build_index(file_id, chunks, metadata)
+        if append_to:
+            # only the new file is embedded; existing chunks keep their vectors and ids
+            metadata = list(metadata)
+            if not metadata:
+                raise HTTPException(status_code=400, detail="File contains no readable text.")
+            for m in metadata:
+                m["source"] = file.filename
+            chunks = [m["chunk_text"] for m in metadata]
+            chunk_ids = fm.append_chunks(append_to, chunks, metadata)
+            artifacts.discard_intermediates(file_id)
+            artifacts.register(append_to, kind="file")
+            return {
+                "status": "success",
+                "file_id": append_to,
+                "chunks": len(chunk_ids),  # chunks repeating stored ones are folded into them
+                "chunk_ids": chunk_ids,
+                "faiss_folder": os.path.join(fm.index_dir, append_to),
+            }
+
+        # chunks are embedded as they are read
+        n_chunks = fm.build_index_streaming(file_id, metadata)
+        if not n_chunks:
+            raise HTTPException(status_code=400, detail="File contains no readable text.")
+        folder = fm._get_video_index_path(file_id)
+        # raw upload is an intermediate: dropped here unless KEEP_INTERMEDIATES=1
+        artifacts.register(file_id, owner=user_key(user), kind="file")
 
         return {
             "status": "success",
             "file_id": file_id,
-            "chunks": len(chunks),
+            "chunks": n_chunks,
             "faiss_folder": folder
         }
 
+    except HTTPException:
+        raise
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File processing failed: {e}")
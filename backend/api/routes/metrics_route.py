@@ -0,0 +1,9 @@
+# api/routes/metrics_route.py
+from fastapi import APIRouter, Response
+from services.metrics import render_latest, CONTENT_TYPE_LATEST
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,7 @@
 # api/routes/process.py
 from fastapi import APIRouter, HTTPException
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
 from pydantic import BaseModel
 from services.audio_download import download_audio
 from services.transcribe import transcribe_audio_file
@@ -24,5 +26,7 @@ def process_video(payload: ProcessIn):
         manager = FaissIndexManager()
         index_path, meta_path = manager.build_and_save(meta["id"], chunks, metadatas)
         return {"status": "success", "video_id": meta["id"], "transcript": transcript_path, "index": index_path}
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,104 @@
+# api/routes/profiling_route.py
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response
+from services.profiling import (
+    collapsed, dump_profile, memory_tracer, render_profile, request_profiler, sample_stacks,
+    PROFILE_MAX_SECONDS,
+)
+
+# Mounted with the admin guard in api/main.py (X-Admin-Token; absent unless ADMIN_TOKEN is set).
+# Every call profiles the worker process that happens to serve it.
+router = APIRouter(prefix="/system/profile", tags=["Profiling"])
+
+# ------------------------
+# Stack sampling
+# ------------------------
+@router.post("/sample", response_class=PlainTextResponse)
+async def sample(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    idle: bool = Query(False, description="Include threads parked in wait/select"),
+):
+    """Sample every thread for `seconds`; collapsed stacks for flamegraph.pl / speedscope."""
+    stacks = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0, idle)
+    return PlainTextResponse(collapsed(stacks))
+
+# ------------------------
+# Per-request cProfile
+# ------------------------
+@router.post("/requests")
+def arm_request_profiling(payload: dict):
+    """Profile the next `count` requests matching `route` (path prefix) and/or carrying `header`."""
+    try:
+        return request_profiler.arm(
+            route=payload.get("route"),
+            header=payload.get("header"),
+            count=int(payload.get("count", 10)),
+            ttl_s=float(payload.get("ttl_s", 300)),
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/requests")
+def disarm_request_profiling():
+    request_profiler.disarm()
+    return request_profiler.status()
+
+@router.get("/requests")
+def list_request_profiles():
+    return request_profiler.status()
+
+@router.get("/requests/{profile_id}")
+def get_request_profile(
+    profile_id: int,
+    format: str = Query("text", pattern="^(text|prof)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(40, ge=1, le=500),
+):
+    """pstats report, or the raw .prof file (format=prof) for snakeviz."""
+    entry = request_profiler.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found (only the most recent are kept)")
+    if format == "prof":
+        return Response(
+            content=dump_profile(entry),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="request-{profile_id}.prof"'},
+        )
+    return PlainTextResponse(render_profile(entry, sort, limit))
+
+# ------------------------
+# tracemalloc
+# ------------------------
+@router.get("/memory")
+def memory_status():
+    return memory_tracer.status()
+
+@router.post("/memory/start")
+def memory_start(frames: int = Query(1, ge=1, le=64, description="Traceback depth kept per allocation")):
+    return memory_tracer.start(frames)
+
+@router.post("/memory/stop")
+def memory_stop():
+    return memory_tracer.stop()
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(label: str | None = Query(None)):
+    try:
+        return await run_in_threadpool(memory_tracer.snapshot, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/memory/diff")
+async def memory_diff(
+    base: str = Query(...),
+    current: str = Query(...),
+    top: int = Query(25, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+):
+    """Allocation growth from snapshot `base` to `current`, largest first."""
+    try:
+        return await run_in_threadpool(memory_tracer.diff, base, current, top, group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
@@ -1,21 +1,27 @@
 # api/routes/qa.py
 from fastapi import APIRouter, HTTPException, Query
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
+from ..access_log import access_log
 from pydantic import BaseModel
-from services.rag import rag_answer
+from services.rag import rag_answer, RAG_TOP_K
 
 router = APIRouter(prefix="/qa", tags=["QA"])
 
 class QAIn(BaseModel):
     video_id: str
     question: str
-    k: int = 4
+    k: int = RAG_TOP_K
 
 @router.post("/")
 def ask_qa(payload: QAIn):
+    access_log.record(payload.video_id, payload.question)
     try:
-        res = rag_answer(payload.video_id, payload.question, k=payload.k)
+        res = rag_answer(payload.video_id, payload.question, top_k=payload.k)
         return res
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Index or transcript not found for provided video_id")
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
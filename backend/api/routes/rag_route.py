@@ -1,13 +1,21 @@
 # api/routes/rag_route.py
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
+from .. import http_cache
+from ..access_log import access_log
 from typing import Optional
-from services.rag import rag_answer
+from services.rag import rag_answer, RAG_TOP_K
 from services.embeddings_index import FaissIndexManager
+from services.storage import artifacts
 import os
 
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
 def get_latest_video_id():
+    latest = artifacts.latest_indexed()
+    if latest:
+        return latest
     base_dir = "faiss_index"
     if not os.path.exists(base_dir):
         return None
@@ -18,14 +26,21 @@ def get_latest_video_id():
     return subdirs[-1]
 
 @router.get("/ask")
-def ask_question(q: str = Query(...), video_id: Optional[str] = Query(None)):
+def ask_question(request: Request, q: str = Query(...), video_id: Optional[str] = Query(None)):
     try:
         if not video_id:
             video_id = get_latest_video_id()
             if not video_id:
                 raise HTTPException(status_code=404, detail="No FAISS index found")
+        access_log.record(video_id, q)
+        etag = http_cache.answer_etag(video_id, q, RAG_TOP_K)
+        unchanged = http_cache.not_modified(request, etag, "rag")
+        if unchanged is not None:
+            return unchanged
         response = rag_answer(video_id=video_id, question=q)
-        return {"video_id": video_id, "question": q, "answer": response.get("answer"), "sources": response.get("sources", [])}
+        return http_cache.cached_json({"video_id": video_id, "question": q, "answer": response.get("answer"), "sources": response.get("sources", []), "coverage": response.get("coverage")}, etag, "rag")
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,7 +55,10 @@ def ask_question_post(payload: dict):
             video_id = get_latest_video_id()
             if not video_id:
                 raise HTTPException(status_code=404, detail="No FAISS index found")
+        access_log.record(video_id, question)
         response = rag_answer(video_id=video_id, question=question)
-        return {"video_id": video_id, "question": question, "answer": response.get("answer"), "sources": response.get("sources", [])}
+        return {"video_id": video_id, "question": question, "answer": response.get("answer"), "sources": response.get("sources", []), "coverage": response.get("coverage")}
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,17 +1,30 @@
 # api/routes/summarize_route.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from services.memory_governor import AdmissionTimeout
+from services.extractive import SUMMARY_SECTIONS, SUMMARY_INPUT_CHARS
+from ..errors import busy
+from .. import http_cache
+from ..access_log import access_log
 from services.summarize import generate_summary_json
 import os
 
 router = APIRouter(prefix="/summarize", tags=["Summarize"])
 
 @router.get("/{video_id}")
-def summarize_video(video_id: str):
+def summarize_video(video_id: str, request: Request):
+    access_log.record(video_id)
+    # tied to the index version read before summarizing, so a concurrent rebuild can only make it stale early
+    etag = http_cache.summary_etag(video_id, SUMMARY_SECTIONS, SUMMARY_INPUT_CHARS)
+    unchanged = http_cache.not_modified(request, etag, "summary")
+    if unchanged is not None:
+        return unchanged
     try:
         # Will raise FileNotFoundError if meta not found
         summary = generate_summary_json(video_id)
-        return summary
+        return http_cache.cached_json(summary, etag, "summary")
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,33 @@
+# api/routes/system_route.py
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from services.memory_governor import governor
+from services.storage import artifacts
+from services import model_registry
+from ..admission import controller
+from ..auth import require_admin
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+@router.get("/memory")
+def memory_status():
+    """Memory governor state: budget, resident models/caches, queued requests and recent decisions."""
+    status = governor.status()
+    status["models"] = model_registry.loaded()
+    return status
+
+@router.get("/admission")
+def admission_status():
+    """Per-class concurrency limits, running and queued requests."""
+    return controller.status()
+
+@router.get("/storage")
+async def storage_report():
+    """Dry-run storage report: usage per owner and what a collection pass would delete."""
+    return await run_in_threadpool(artifacts.collect, True)
+
+# deletes documents: operator only, like /system/profile (X-Admin-Token)
+@router.post("/storage/collect", dependencies=[Depends(require_admin)])
+async def storage_collect(dry_run: bool = Query(True, description="Only report; set false to delete")):
+    """Run one garbage-collection pass now (quota eviction + orphaned tmp files)."""
+    return await run_in_threadpool(artifacts.collect, dry_run)
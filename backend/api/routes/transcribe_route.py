@@ -1,5 +1,7 @@
 # routes/transcribe_route.py
 from fastapi import APIRouter, HTTPException
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
 from services.transcribe import transcribe_and_index
 
 router = APIRouter(prefix="/process", tags=["Transcription & Indexing"])
@@ -9,6 +11,8 @@ def process_video(youtube_url: str):
     try:
         result = transcribe_and_index(youtube_url)
         return result
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
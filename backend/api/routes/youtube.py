@@ -1,6 +1,11 @@
 # api/routes/youtube.py
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+from services.memory_governor import AdmissionTimeout
+from ..errors import busy
+from ..auth import get_optional_user, user_key
 from pydantic import HttpUrl
 import logging
 import os
@@ -8,8 +13,13 @@ import json
 
 from services.audio_download import download_audio
 from services.transcribe import transcribe_and_index
-from services.chunking import chunk_text_from_segments
-from services.embeddings_index import FaissIndexManager
+from services.chunking import (
+    chunk_text_from_segments, map_chunks_to_timestamps, TRANSCRIPT_CHUNK_SIZE, TRANSCRIPT_CHUNK_OVERLAP,
+)
+from services.embeddings_index import FaissIndexManager, load_coverage
+from services import bulk_ingest, progressive
+from services.storage import artifacts
+from services.transcript_store import read_transcript
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # -----------------------------
@@ -39,7 +49,23 @@ def download_youtube_audio(youtube_url: HttpUrl = Query(...)):
 # FULL PROCESS PIPELINE
 # -----------------------------
 @router.post("/process")
-def process_youtube_video(youtube_url: HttpUrl = Query(...)):
+def process_youtube_video(
+    youtube_url: HttpUrl = Query(...),
+    progressive_index: bool = Query(False, alias="progressive"),
+    user: Optional[dict] = Depends(get_optional_user),
+):
+    if progressive_index:
+        # returns at once; QA works as soon as the first window is indexed
+        job = progressive.start_progressive(str(youtube_url), owner=user_key(user))
+        return JSONResponse(status_code=202, content={
+            "status": job.state,
+            "job_id": job.job_id,
+            "video_id": job.video_id,
+            "coverage": job.coverage,
+            # a new job's video id is not known yet: poll it by job id
+            "status_url": f"/youtube/status/{job.video_id or job.job_id}",
+        })
+
     try:
         result = transcribe_and_index(str(youtube_url))
         video_id = result["video_id"]
@@ -52,8 +78,7 @@ def process_youtube_video(youtube_url: HttpUrl = Query(...)):
                 detail=f"Transcript file missing: {transcript_path}"
             )
 
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            transcript_data = json.load(f)
+        transcript_data = read_transcript(transcript_path)
 
         segments = transcript_data.get("segments", [])
 
@@ -65,53 +90,13 @@ def process_youtube_video(youtube_url: HttpUrl = Query(...)):
             chunks = chunk_text_from_segments(segments)
 
             # Timestamp mapping
-            full_text = " ".join(seg["text"] for seg in segments)
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=800, chunk_overlap=50
-            )
-            text_chunks = splitter.split_text(full_text)
-
-            seg_texts = [s["text"] for s in segments]
-            seg_starts = [s["start"] for s in segments]
-            seg_ends = [s["end"] for s in segments]
-
-            metadatas = []
-            seg_ptr = 0
-
-            for chunk in text_chunks:
-                chunk = chunk.strip()
-                if not chunk:
-                    continue
-
-                start_ts, end_ts = None, None
-                accum = ""
-
-                for i in range(seg_ptr, len(seg_texts)):
-                    if start_ts is None:
-                        start_ts = seg_starts[i]
-                    end_ts = seg_ends[i]
-
-                    accum += " " + seg_texts[i]
-                    if len(accum) >= len(chunk):
-                        seg_ptr = i + 1
-                        break
-
-                if start_ts is None:
-                    start_ts = 0.0
-                if end_ts is None:
-                    end_ts = start_ts
-
-                metadatas.append({
-                    "chunk_text": chunk,
-                    "start": float(start_ts),
-                    "end": float(end_ts)
-                })
+            metadatas = map_chunks_to_timestamps(segments, chunks)
 
         else:
             # Fallback
             full_text = transcript_data.get("text", "")
             splitter = RecursiveCharacterTextSplitter(
-                chunk_size=800, chunk_overlap=50
+                chunk_size=TRANSCRIPT_CHUNK_SIZE, chunk_overlap=TRANSCRIPT_CHUNK_OVERLAP
             )
             chunks = splitter.split_text(full_text)
 
@@ -132,6 +117,7 @@ def process_youtube_video(youtube_url: HttpUrl = Query(...)):
         # ------------------------------------------
         fm = FaissIndexManager()
         folder = fm.build_index(video_id, chunks, metadatas)
+        artifacts.register(video_id, owner=user_key(user), kind="video")
 
         return {
             "status": "success",
@@ -141,5 +127,59 @@ def process_youtube_video(youtube_url: HttpUrl = Query(...)):
             "chunks": len(chunks)
         }
 
+    except AdmissionTimeout as e:
+        raise busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# -----------------------------
+# Progressive ingest status
+# -----------------------------
+@router.get("/status/{video_id}")
+def youtube_status(video_id: str):
+    """Progress of a progressive ingest, by video id (or the job id returned before the id was known)."""
+    job = progressive.get_job(video_id)
+    if job is not None:
+        return job.to_dict()
+    # finished before this process started (or built in one shot)
+    try:
+        coverage = load_coverage(video_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No index for video {video_id}")
+    return {"video_id": video_id, "state": "done", "coverage": coverage}
+
+
+# -----------------------------
+# Bulk ingest (playlists, URL lists, server folders)
+# -----------------------------
+@router.post("/bulk")
+def bulk_ingest_start(payload: dict, user: Optional[dict] = Depends(get_optional_user)):
+    urls = payload.get("urls") or []
+    playlists = payload.get("playlists") or ([payload["playlist"]] if payload.get("playlist") else [])
+    directory = payload.get("directory")
+    if not (urls or playlists or directory):
+        raise HTTPException(status_code=400, detail="Provide urls, playlist(s) or directory")
+    if directory:
+        # only folders below BULK_INGEST_ROOT can be read through the API
+        root = os.path.abspath(bulk_ingest.BULK_INGEST_ROOT)
+        directory = os.path.abspath(os.path.join(root, directory))
+        if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+            raise HTTPException(status_code=400, detail=f"Directory must be a folder under {bulk_ingest.BULK_INGEST_ROOT}")
+
+    try:
+        job = bulk_ingest.start_bulk(urls, playlists, directory, job_id=payload.get("job_id"), owner=user_key(user))
+    except ValueError as e:  # job_id names the journal and the work dir: plain names only
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(status_code=202, content={
+        **job.to_dict(),
+        "status_url": f"/youtube/bulk/{job.job_id}",
+    })
+
+
+@router.get("/bulk/{job_id}")
+def bulk_ingest_status(job_id: str):
+    job = bulk_ingest.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No bulk job {job_id}")
+    return job.to_dict()
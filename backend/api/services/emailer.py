@@ -1,7 +1,15 @@
 # api/services/emailer.py
+import heapq
+import itertools
+import queue
 import smtplib
+import threading
+import time
 from email.message import EmailMessage
 import os
+from services.logging_setup import get_logger
+
+logger = get_logger(__name__)
 
 SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
@@ -10,16 +18,232 @@ SMTP_PASS = os.environ.get("SMTP_PASS")  # app password
 
 FROM = os.environ.get("EMAIL_FROM", SMTP_USER)
 
-def send_email(to: str, subject: str, body: str):
-    if not SMTP_USER or not SMTP_PASS:
-        raise RuntimeError("SMTP credentials not set (SMTP_USER/SMTP_PASS)")
+# "smtp" (real server) or "memory" (in-process stand-in, see StandInSMTP)
+SMTP_BACKEND = os.environ.get("SMTP_BACKEND", "smtp").lower()
+# Local relay / debugging server (e.g. `python -m aiosmtpd -n -l localhost:1025`): no STARTTLS, no login
+SMTP_LOCAL = os.environ.get("SMTP_LOCAL", "0") == "1"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "20"))
+SMTP_IDLE_SECONDS = float(os.environ.get("SMTP_IDLE_SECONDS", "60"))
+
+EMAIL_QUEUE_SIZE = int(os.environ.get("EMAIL_QUEUE_SIZE", "1000"))
+EMAIL_MAX_RETRIES = int(os.environ.get("EMAIL_MAX_RETRIES", "5"))
+EMAIL_BACKOFF_BASE = float(os.environ.get("EMAIL_BACKOFF_BASE", "2.0"))
+EMAIL_BACKOFF_MAX = float(os.environ.get("EMAIL_BACKOFF_MAX", "300"))
+
+
+def _build_message(to: str, subject: str, body: str) -> EmailMessage:
     msg = EmailMessage()
-    msg["From"] = FROM
+    msg["From"] = FROM or "noreply@localhost"
     msg["To"] = to
     msg["Subject"] = subject
     msg.set_content(body)
+    return msg
+
+
+def _check_configured():
+    if SMTP_BACKEND == "smtp" and not SMTP_LOCAL and (not SMTP_USER or not SMTP_PASS):
+        raise RuntimeError("SMTP credentials not set (SMTP_USER/SMTP_PASS)")
+
+
+# ======================================================
+# 🧪 Local SMTP stand-in (SMTP_BACKEND=memory)
+# ======================================================
+class StandInSMTP:
+    """Minimal smtplib.SMTP look-alike that records messages in `outbox`."""
+
+    outbox = []
+    connections = 0
+
+    def __init__(self, host=None, port=None, timeout=None):
+        StandInSMTP.connections += 1
+        self.closed = False
+
+    def starttls(self):
+        return (220, b"ready")
+
+    def login(self, user, password):
+        return (235, b"ok")
+
+    def noop(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("closed")
+        return (250, b"ok")
+
+    def send_message(self, msg):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("closed")
+        StandInSMTP.outbox.append(msg)
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+    @classmethod
+    def reset(cls):
+        cls.outbox = []
+        cls.connections = 0
+
+
+def _default_connection_factory():
+    if SMTP_BACKEND == "memory":
+        return StandInSMTP()
+    return smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.send_message(msg)
+
+# ======================================================
+# 🔌 Pooled sender: one authenticated connection, reused
+# ======================================================
+class PooledSMTPSender:
+    def __init__(self, connection_factory=_default_connection_factory, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self._factory = connection_factory
+        self._idle_seconds = idle_seconds
+        self._conn = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = self._factory()
+        if SMTP_BACKEND == "smtp" and not SMTP_LOCAL:
+            conn.starttls()
+            conn.login(SMTP_USER, SMTP_PASS)
+        return conn
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+        self._conn = None
+
+    def close_if_idle(self):
+        with self._lock:
+            if self._conn is not None and time.monotonic() - self._last_used > self._idle_seconds:
+                self._close()
+
+    def send(self, msg: EmailMessage):
+        with self._lock:
+            for attempt in (1, 2):
+                if self._conn is None:
+                    self._conn = self._connect()
+                try:
+                    self._conn.send_message(msg)
+                    self._last_used = time.monotonic()
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError, OSError):
+                    # stale pooled connection: reconnect once, then surface the error
+                    self._close()
+                    if attempt == 2:
+                        raise
+                except Exception:
+                    self._close()
+                    raise
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# ======================================================
+# 📬 Outbound queue with retry + exponential backoff
+# ======================================================
+class EmailQueue:
+    def __init__(self, sender: PooledSMTPSender, maxsize: int = EMAIL_QUEUE_SIZE,
+                 max_retries: int = EMAIL_MAX_RETRIES, backoff_base: float = EMAIL_BACKOFF_BASE,
+                 backoff_max: float = EMAIL_BACKOFF_MAX):
+        self.sender = sender
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._incoming: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._retry_heap = []
+        self._seq = itertools.count()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, msg: EmailMessage) -> bool:
+        self._ensure_started()
+        try:
+            self._incoming.put_nowait((msg, 0))
+            return True
+        except queue.Full:
+            logger.warning("email_queue_full", extra={"to": msg["To"]})
+            return False
+
+    def pending(self) -> int:
+        return self._incoming.qsize() + len(self._retry_heap)
+
+    def _next_timeout(self) -> float:
+        if self._retry_heap:
+            return max(0.0, self._retry_heap[0][0] - time.monotonic())
+        return 1.0
+
+    def _run(self):
+        while True:
+            if self._retry_heap and self._retry_heap[0][0] <= time.monotonic():
+                _, _, msg, attempt = heapq.heappop(self._retry_heap)
+                self._deliver(msg, attempt)
+                continue
+            if self._stopping.is_set() and self._incoming.empty():
+                break  # scheduled retries still waiting are dropped on shutdown
+            try:
+                msg, attempt = self._incoming.get(timeout=min(1.0, self._next_timeout()))
+            except queue.Empty:
+                self.sender.close_if_idle()
+                continue
+            self._deliver(msg, attempt)
+        self.sender.close()
+
+    def _deliver(self, msg: EmailMessage, attempt: int):
+        try:
+            self.sender.send(msg)
+            self.sent += 1
+            logger.info("email_sent", extra={"to": msg["To"], "attempt": attempt + 1})
+        except Exception as e:
+            if attempt + 1 >= self.max_retries:
+                self.failed += 1
+                logger.error("email_failed", extra={"to": msg["To"], "attempts": attempt + 1, "error": str(e)})
+                return
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            heapq.heappush(self._retry_heap, (time.monotonic() + delay, next(self._seq), msg, attempt + 1))
+            logger.warning("email_retry_scheduled", extra={"to": msg["To"], "attempt": attempt + 1, "delay_s": delay, "error": str(e)})
+
+    def stop(self, timeout: float = 10.0):
+        """Flush queued messages (retries still waiting are dropped) and stop the worker."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_sender = PooledSMTPSender()
+email_queue = EmailQueue(_sender)
+
+
+def enqueue_email(to: str, subject: str, body: str) -> bool:
+    """Queue a message for background delivery; returns as soon as it is queued."""
+    _check_configured()
+    return email_queue.enqueue(_build_message(to, subject, body))
+
+
+def send_email(to: str, subject: str, body: str):
+    """Synchronous send over the pooled connection (scripts / admin tools)."""
+    _check_configured()
+    _sender.send(_build_message(to, subject, body))
@@ -0,0 +1,149 @@
+# api/warmup.py
+"""
+Startup warm-up of hot documents.
+
+After a deploy the first queries for each popular document used to pay for
+the model load, faiss.read_index, unpickling the metadata and encoding the
+question. On startup a background thread now:
+
+1. loads the models in WARMUP_MODELS (models served remotely are skipped);
+2. loads the WARMUP_DOCS most queried documents (access log, topped up with
+   the most recently used ones from the artifact catalog) into the index
+   cache, as long as their estimated size fits WARMUP_MEMORY_MB;
+3. encodes up to WARMUP_QUESTIONS frequent questions per document into the
+   query embedding cache.
+
+It stops early once WARMUP_BUDGET_S has elapsed. Progress is reported by
+GET /ready, which answers 503 until warm-up has finished (or was disabled),
+so a load balancer can hold traffic back from a cold worker. Failures are
+logged and skipped: serving cold is better than never becoming ready.
+
+    WARMUP_ENABLED=1   WARMUP_MODELS=embedder,rag   WARMUP_DOCS=8
+    WARMUP_QUESTIONS=20   WARMUP_BUDGET_S=120   WARMUP_MEMORY_MB=1024
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from services import model_registry
+from services.embeddings_index import FaissIndexManager, estimated_nbytes, load_cached_index
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY
+from services.storage import artifacts, INDEX_DIR, MB
+from .access_log import AccessLog, access_log
+
+logger = get_logger(__name__)
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+WARMUP_MODELS = [k.strip() for k in os.environ.get("WARMUP_MODELS", "embedder,rag").split(",") if k.strip()]
+WARMUP_DOCS = int(os.environ.get("WARMUP_DOCS", "8"))
+WARMUP_QUESTIONS = int(os.environ.get("WARMUP_QUESTIONS", "20"))
+WARMUP_BUDGET_S = float(os.environ.get("WARMUP_BUDGET_S", "120"))
+WARMUP_MEMORY_MB = int(os.environ.get("WARMUP_MEMORY_MB", "1024"))
+
+WARMUP_SECONDS = REGISTRY.gauge("warmup_seconds", "Duration of the startup warm-up.")
+WARMUP_DOCUMENTS = REGISTRY.gauge("warmup_documents", "Indexes loaded by the startup warm-up.")
+
+
+class Warmup:
+    def __init__(self, log: AccessLog = access_log):
+        self.log = log
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state: Dict = {"state": "pending" if WARMUP_ENABLED else "disabled"}
+
+    @property
+    def ready(self) -> bool:
+        return self._state["state"] in ("ready", "disabled")
+
+    def status(self) -> Dict:
+        with self._lock:
+            state = {k: list(v) if isinstance(v, list) else v for k, v in self._state.items()}
+        state["ready"] = self.ready
+        return state
+
+    def _update(self, **fields):
+        with self._lock:
+            self._state.update(fields)
+
+    def _candidates(self, limit: int) -> List[str]:
+        try:
+            ranked = self.log.hot_documents(limit)
+        except Exception as e:  # no DB yet: the artifact catalog still knows what was used last
+            logger.warning("warmup_access_log_unavailable", extra={"error": str(e)})
+            ranked = []
+        for doc_id in artifacts.recently_accessed(limit):
+            if doc_id not in ranked:
+                ranked.append(doc_id)
+        return [d for d in ranked if os.path.isdir(os.path.join(INDEX_DIR, d))][:limit]
+
+    def run(self, models: List[str] = WARMUP_MODELS, docs: int = WARMUP_DOCS, questions: int = WARMUP_QUESTIONS,
+            budget_s: float = WARMUP_BUDGET_S, memory_mb: int = WARMUP_MEMORY_MB) -> Dict:
+        start = time.perf_counter()
+        deadline = start + budget_s
+        self._update(state="running", models=[], documents=[], skipped=[], questions=0, bytes=0, stopped=None)
+        try:
+            for kind in models:
+                if time.perf_counter() > deadline:
+                    break
+                if model_registry.is_remote(kind):
+                    continue
+                try:
+                    model_registry.get(kind)
+                except Exception as e:
+                    logger.warning("warmup_model_failed", extra={"kind": kind, "error": str(e)})
+                    continue
+                with self._lock:
+                    self._state["models"].append(kind)
+
+            candidates = self._candidates(docs)
+            self._update(planned=candidates)
+            budget = memory_mb * MB
+            used = 0
+            manager = None
+            for doc_id in candidates:
+                if time.perf_counter() > deadline:
+                    self._update(stopped="time_budget")
+                    break
+                size = estimated_nbytes(os.path.join(INDEX_DIR, doc_id))
+                if used + size > budget:
+                    with self._lock:
+                        self._state["skipped"].append(doc_id)
+                    continue
+                try:
+                    load_cached_index(doc_id)
+                    asked = self.log.frequent_questions(doc_id, questions) if questions > 0 else []
+                    if asked:
+                        manager = manager or FaissIndexManager()
+                        encoded = manager.embed_queries(asked)
+                    else:
+                        encoded = 0
+                except Exception as e:  # one broken index must not stop the rest
+                    logger.warning("warmup_document_failed", extra={"doc_id": doc_id, "error": str(e)})
+                    continue
+                used += size
+                with self._lock:
+                    self._state["documents"].append(doc_id)
+                    self._state["questions"] += encoded
+                    self._state["bytes"] = used
+        except Exception as e:
+            logger.warning("warmup_failed", extra={"error": str(e)})
+            self._update(error=str(e))
+        elapsed = round(time.perf_counter() - start, 3)
+        self._update(state="ready", seconds=elapsed)
+        WARMUP_SECONDS.set(elapsed)
+        WARMUP_DOCUMENTS.set(len(self._state["documents"]))
+        status = self.status()
+        logger.info("warmup_done", extra={k: status[k] for k in ("seconds", "models", "documents", "questions", "bytes")})
+        return status
+
+    def start(self) -> Optional[threading.Thread]:
+        if not WARMUP_ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return None
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+warmup = Warmup()
@@ -0,0 +1,181 @@
+# benchmarks/corpora.py
+"""
+Synthetic, seeded corpora for the benchmark suite: whisper-style segments,
+retrieved-chunk lists, PDF / DOCX / CSV files of configurable size and a
+golden question set for the retrieval evaluation.
+"""
+import csv
+import os
+import random
+from typing import Dict, List
+
+SIZES = {
+    "small": 50,
+    "medium": 500,
+    "large": 5000,
+}
+
+_WORDS = (
+    "model data index vector search query answer video lecture transcript chunk "
+    "embedding summary neural network training latency memory throughput cache "
+    "python server request response token context retrieval system design test "
+    "the a of and to in is for on with that this it as we you are be"
+).split()
+
+# Repeated lines make `_unique_lines_across_chunks` do real dedup work.
+_BOILERPLATE = [
+    "Don't forget to like and subscribe.",
+    "This video is sponsored by our partners.",
+    "Page header - Confidential",
+]
+
+
+def _sentence(rng: random.Random, n_words: int = 12) -> str:
+    words = [rng.choice(_WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def make_segments(n: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    for i in range(n):
+        text = rng.choice(_BOILERPLATE) if i % 17 == 0 else _sentence(rng)
+        dur = rng.uniform(2.0, 6.0)
+        segments.append({"id": i, "start": round(t, 2), "end": round(t + dur, 2), "text": " " + text})
+        t += dur
+    return segments
+
+
+def make_whisper_result(segments: List[Dict], seed: int = 0) -> Dict:
+    """Whisper-shaped result: segments carry token ids and decoding stats like the real output."""
+    rng = random.Random(seed)
+    full = []
+    for s in segments:
+        full.append({
+            **s,
+            "seek": int(s["start"] * 100),
+            "tokens": [rng.randrange(50000) for _ in range(len(s["text"].split()) + 2)],
+            "temperature": 0.0,
+            "avg_logprob": -rng.random(),
+            "compression_ratio": 1 + rng.random(),
+            "no_speech_prob": rng.random() / 10,
+        })
+    return {"text": "".join(s["text"] for s in segments), "segments": full, "language": "en"}
+
+
+def make_retrieved(n_chunks: int, lines_per_chunk: int = 8, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n_chunks):
+        lines = [rng.choice(_BOILERPLATE) if rng.random() < 0.25 else _sentence(rng) for _ in range(lines_per_chunk)]
+        out.append({"chunk_text": "\n".join(lines), "distance": rng.random(), "start": i * 10.0, "end": i * 10.0 + 10.0})
+    return out
+
+
+def make_questions(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"What does the speaker say about {rng.choice(_WORDS)} and {rng.choice(_WORDS)}?" for _ in range(n)]
+
+
+def make_golden_set(n_segments: int = 400, n_docs: int = 3, facts_per_doc: int = 10, seed: int = 0) -> Dict:
+    """
+    Transcripts with planted facts and one question per fact, in the golden-set
+    format of benchmarks/retrieval_eval.py (expected spans in seconds).
+    """
+    rng = random.Random(seed)
+    documents, questions = [], []
+    for d in range(n_docs):
+        segments = make_segments(n_segments, seed=seed + d)
+        for f, i in enumerate(sorted(rng.sample(range(1, n_segments), facts_per_doc))):
+            name = f"{rng.choice(_WORDS)}{d}x{f}"
+            value = rng.randrange(10, 999)
+            segments[i]["text"] = f" The {name} setting was raised to {value} after the outage review."
+            questions.append({
+                "doc": f"doc{d}",
+                "question": f"What was the {name} setting raised to?",
+                "spans": [[segments[i]["start"], segments[i]["end"]]],
+            })
+        documents.append({"id": f"doc{d}", "segments": segments})
+    return {"documents": documents, "questions": questions}
+
+
+def write_csv(path: str, rows: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "title", "category", "notes"])
+        for i in range(rows):
+            w.writerow([i, _sentence(rng, 4), rng.choice(_WORDS), _sentence(rng, 10)])
+    return path
+
+
+def write_docx(path: str, paragraphs: int, seed: int = 0) -> str:
+    import docx
+    rng = random.Random(seed)
+    doc = docx.Document()
+    for i in range(paragraphs):
+        if i % 20 == 0:
+            doc.add_heading(f"Section {i // 20 + 1}", level=1)
+        doc.add_paragraph(" ".join(_sentence(rng) for _ in range(3)))
+    doc.save(path)
+    return path
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0) -> str:
+    """Minimal hand-written PDF (Helvetica text pages) so no PDF writer dependency is needed."""
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")  # placeholder, filled once page ids are known
+    page_ids = []
+    for p in range(pages):
+        lines = [_BOILERPLATE[2]] + [_sentence(rng) for _ in range(lines_per_page - 1)]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        for ln in lines:
+            ops.append("(" + ln.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def file_sizes(size: str) -> Dict[str, int]:
+    """Scale file corpora from the segment count of a size class."""
+    n = SIZES[size]
+    return {"csv_rows": n * 20, "docx_paragraphs": n, "pdf_pages": max(1, n // 25)}
+
+
+def write_corpus_files(out_dir: str, size: str, seed: int = 0) -> Dict[str, str]:
+    os.makedirs(out_dir, exist_ok=True)
+    dims = file_sizes(size)
+    return {
+        "csv": write_csv(os.path.join(out_dir, f"{size}.csv"), dims["csv_rows"], seed),
+        "docx": write_docx(os.path.join(out_dir, f"{size}.docx"), dims["docx_paragraphs"], seed),
+        "pdf": write_pdf(os.path.join(out_dir, f"{size}.pdf"), dims["pdf_pages"], seed=seed),
+    }
@@ -0,0 +1,91 @@
+# benchmarks/embed_scaling.py
+"""
+Embedding throughput vs. number of worker processes.
+
+    cd backend
+    python -m benchmarks.embed_scaling                        # stub embedder, 1..cores workers
+    python -m benchmarks.embed_scaling --chunks 20000 --workers 1,2,4,8
+    python -m benchmarks.embed_scaling --real                 # EMBED_MODEL via sentence-transformers
+
+"1" is the in-process baseline (what build_index does without EMBED_WORKERS).
+Every parallel run is checked against the baseline vectors, so a broken
+order restoration fails loudly instead of looking fast.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def _default_workers():
+    cores = os.cpu_count() or 1
+    counts, n = [1], 2
+    while n <= cores:
+        counts.append(n)
+        n *= 2
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-process embedding scaling benchmark")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--workers", help="comma-separated worker counts (default 1,2,4,..,cores)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--real", action="store_true", help="use the real EMBED_MODEL instead of the stub")
+    args = parser.parse_args(argv)
+
+    if not args.real:
+        # set before the registry is imported so spawned workers pick the stub too
+        os.environ["MODEL_BACKEND"] = "stub"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import numpy as np
+    from benchmarks import corpora
+    from benchmarks.harness import percentile
+    from services import model_registry
+    from services.parallel_embed import ParallelEncoder
+
+    rng_segments = corpora.make_segments(args.chunks)
+    # mixed lengths, like real chunks (short headings next to full paragraphs)
+    texts = [" ".join(s["text"] for s in rng_segments[i:i + 1 + i % 7]) for i in range(args.chunks)]
+    counts = [int(w) for w in args.workers.split(",")] if args.workers else _default_workers()
+
+    embedder = model_registry.get_embedder()
+    baseline_vectors = None
+    rows = []
+    for workers in counts:
+        encoder = ParallelEncoder(workers, batch_size=args.batch_size) if workers > 1 else None
+        if encoder is not None:
+            encoder.encode(texts[: workers * args.batch_size])  # warm up: start workers, load models
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if encoder is None:
+                vectors = np.asarray(embedder.encode(texts, batch_size=args.batch_size), dtype="float32")
+            else:
+                vectors = encoder.encode(texts)
+            samples.append(time.perf_counter() - start)
+        if encoder is not None:
+            encoder.shutdown()
+
+        if baseline_vectors is None:
+            baseline_vectors = vectors
+        elif not np.allclose(vectors, baseline_vectors, atol=1e-5):
+            print(f"workers={workers}: vectors differ from the in-process baseline", file=sys.stderr)
+            return 1
+        rows.append((workers, percentile(samples, 50)))
+
+    base = rows[0][1]
+    print(f"{args.chunks} chunks, batch {args.batch_size}, {os.cpu_count()} cores, {'real' if args.real else 'stub'} embedder")
+    print(f"{'workers':>8} {'p50 s':>9} {'chunks/s':>10} {'speedup':>8} {'efficiency':>11}")
+    for workers, seconds in rows:
+        speedup = base / seconds
+        print(f"{workers:>8} {seconds:>9.3f} {args.chunks / seconds:>10.0f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# benchmarks/harness.py
+"""Timing, percentile and baseline-comparison helpers for the benchmark suite."""
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2, items: int = 1) -> Dict[str, float]:
+    """
+    Run `fn` `warmup + repeat` times and summarise the timed runs.
+    `items` is the amount of work one call does (chunks, rows, queries) and
+    drives the throughput figure.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    total = sum(samples)
+    return {
+        "runs": repeat,
+        "items": items,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": total / repeat * 1000,
+        "throughput_per_s": (items * repeat / total) if total else 0.0,
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Dict]]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float = 0.25, noise_floor_ms: float = 0.5):
+    """
+    Return a list of (key, baseline_p50, current_p50, ratio) for benchmarks
+    whose p50 got slower than `tolerance` allows. Differences below
+    `noise_floor_ms` are ignored.
+    """
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        b, c = base["p50_ms"], cur["p50_ms"]
+        if c - b > noise_floor_ms and c > b * (1 + tolerance):
+            regressions.append((key, b, c, c / b if b else float("inf")))
+    return regressions
+
+
+def format_table(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None) -> str:
+    header = f"{'benchmark':<40} {'p50 ms':>10} {'p99 ms':>10} {'items/s':>12}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    lines = [header, "-" * len(header)]
+    for key in sorted(results):
+        r = results[key]
+        line = f"{key:<40} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['throughput_per_s']:>12.1f}"
+        if baseline:
+            base = baseline.get(key)
+            line += f" {(r['p50_ms'] / base['p50_ms']):>8.2f}x" if base and base["p50_ms"] else f" {'new':>9}"
+        lines.append(line)
+    return "\n".join(lines)
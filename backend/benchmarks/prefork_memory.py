@@ -0,0 +1,150 @@
+# benchmarks/prefork_memory.py
+"""
+Startup time and per-worker memory: independent workers vs. the prefork launcher.
+
+    cd backend
+    python -m benchmarks.prefork_memory --real --workers 4        # real models (the interesting case)
+    python -m benchmarks.prefork_memory --workers 4 --no-freeze   # prefork without gc.freeze()
+
+"independent" starts every worker on its own (what `uvicorn --workers N`
+does): each imports the app and loads the models. "prefork" loads once in a
+parent and forks, as api/prefork.py does. Each worker then runs a full
+garbage collection, like a worker that has been serving for a while, before
+memory is sampled.
+
+USS is memory only that process maps (what killing it would free); PSS
+splits shared pages between their users, so the PSS total is the real
+footprint of the whole group, parent included.
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import sys
+import time
+
+MB = 1024 ** 2
+
+
+def _settle():
+    gc.enable()
+    gc.collect()
+
+
+def _independent_worker(kinds, warm, ready, stop):
+    from api.main import app  # noqa: F401
+    from api.prefork import preload
+
+    preload(kinds, warm)
+    _settle()
+    ready.put(os.getpid())
+    stop.wait()
+
+
+def _prefork_parent(kinds, warm, workers, freeze, ready, stop):
+    from api.prefork import preload, freeze as freeze_gc
+
+    gc.disable()
+    from api.main import app  # noqa: F401
+    preload(kinds, warm)
+    if freeze:
+        freeze_gc()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _settle()
+            ready.put(os.getpid())
+            stop.wait()
+            os._exit(0)
+        children.append(pid)
+    ready.put(("parent", os.getpid()))
+    stop.wait()
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def _sample(pids):
+    import psutil
+
+    rows = []
+    for pid in pids:
+        info = psutil.Process(pid).memory_full_info()
+        rows.append({"rss": info.rss, "uss": info.uss, "pss": getattr(info, "pss", 0)})
+    return rows
+
+
+def _run(mode, args, ctx):
+    ready, stop = ctx.Queue(), ctx.Event()
+    kinds = [k.strip() for k in args.preload.split(",") if k.strip()]
+    start = time.perf_counter()
+    if mode == "independent":
+        procs = [ctx.Process(target=_independent_worker, args=(kinds, args.warm_indexes, ready, stop))
+                 for _ in range(args.workers)]
+        expected = args.workers
+    else:
+        procs = [ctx.Process(target=_prefork_parent,
+                             args=(kinds, args.warm_indexes, args.workers, not args.no_freeze, ready, stop))]
+        expected = args.workers + 1
+    for p in procs:
+        p.start()
+
+    workers, parent = [], None
+    for _ in range(expected):
+        item = ready.get(timeout=args.timeout)
+        if isinstance(item, tuple):
+            parent = item[1]
+        else:
+            workers.append(item)
+    startup = time.perf_counter() - start
+
+    rows = _sample(workers)
+    group = rows + (_sample([parent]) if parent else [])
+    stop.set()
+    for p in procs:
+        p.join()
+    mean = lambda key: sum(r[key] for r in rows) / len(rows) / MB  # noqa: E731
+    return {
+        "mode": mode if mode == "independent" or not args.no_freeze else "prefork (no freeze)",
+        "startup_s": startup,
+        "rss_mb": mean("rss"),
+        "uss_mb": mean("uss"),
+        "pss_mb": mean("pss"),
+        "total_pss_mb": sum(r["pss"] for r in group) / MB,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-worker unique memory: independent workers vs. prefork")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--preload", default="embedder,rag,summarizer")
+    parser.add_argument("--warm-indexes", type=int, default=8)
+    parser.add_argument("--no-freeze", action="store_true", help="fork without gc.freeze()")
+    parser.add_argument("--real", action="store_true", help="load the real models instead of the stubs")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds to wait for workers to load")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        print("prefork needs os.fork()", file=sys.stderr)
+        return 1
+    if not args.real:
+        # set before anything imports the registry; spawned processes inherit it
+        os.environ["MODEL_BACKEND"] = "stub"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    ctx = mp.get_context("spawn")
+    results = [_run("independent", args, ctx), _run("prefork", args, ctx)]
+
+    print(f"{args.workers} workers, preload={args.preload}, {'real' if args.real else 'stub'} models")
+    print(f"{'mode':<22} {'startup s':>10} {'RSS MB':>9} {'USS MB':>9} {'PSS MB':>9} {'group PSS MB':>13}")
+    for r in results:
+        print(f"{r['mode']:<22} {r['startup_s']:>10.2f} {r['rss_mb']:>9.1f} {r['uss_mb']:>9.1f} "
+              f"{r['pss_mb']:>9.1f} {r['total_pss_mb']:>13.1f}")
+    base, fork = results
+    if fork["uss_mb"]:
+        print(f"\nunique memory per worker: {base['uss_mb'] / fork['uss_mb']:.1f}x less with prefork")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
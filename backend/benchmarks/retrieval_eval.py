@@ -0,0 +1,324 @@
+# benchmarks/retrieval_eval.py
+"""
+Retrieval quality vs. latency for chunking and index parameters.
+
+Sweeps chunk size, chunk overlap, FAISS index type and top_k over a golden
+set of documents and questions, and reports recall@k, MRR, index size,
+build time and query latency for every combination:
+
+    cd backend
+    python -m benchmarks.retrieval_eval --synthetic                       # planted-fact smoke run, stub embedder
+    python -m benchmarks.retrieval_eval --golden eval/golden.json --real  # the real embedder
+    python -m benchmarks.retrieval_eval --golden eval/golden.json --real \\
+        --chunk-sizes 400,800,1200 --overlaps 0,100,200 --top-k 3,5,8 \\
+        --index-types "Flat;HNSW32;IVF{nlist},Flat" --out eval/results.csv
+
+Golden set (JSON; paths are relative to the file):
+
+    {"documents": [
+        {"id": "lecture", "transcript": "transcripts/lecture.tsz"},   # or inline "segments": [...]
+        {"id": "handbook", "path": "docs/handbook.pdf"}              # any upload format, or inline "text"
+     ],
+     "questions": [
+        {"doc": "lecture", "question": "Why was the cache resized?", "spans": [[312.0, 340.5]]},
+        {"doc": "handbook", "question": "Who approves refunds?", "answers": ["the billing lead"]}
+     ]}
+
+A transcript chunk is relevant when its time range (or that of a duplicate
+folded into it) overlaps an expected span; a document chunk when it
+contains an expected answer string (case and punctuation ignored). Recall
+is the share of a question's expected spans/answers found in the top k,
+averaged over questions; MRR uses the rank of the first relevant chunk.
+
+Index types are faiss.index_factory strings; "{nlist}" becomes sqrt(chunks)
+per document. Latency is the FAISS search alone (one query at a time, as
+in production); the question embedding does not depend on these
+parameters and is reported once. Build time is embedding plus index
+construction. Chunks are deduplicated as in production (DEDUP_ENABLED).
+Rows marked * are on the recall / p50-latency Pareto frontier.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+
+def _ints(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _norm(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+# ======================================================
+# 📚 Golden set
+# ======================================================
+def load_golden(path: str) -> Dict:
+    from services.file_reader import extract_text
+    from services.transcript_store import read_transcript
+
+    with open(path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    root = os.path.dirname(os.path.abspath(path))
+    for doc in golden["documents"]:
+        if "transcript" in doc:
+            doc["segments"] = read_transcript(os.path.join(root, doc["transcript"])).get("segments", [])
+        elif "path" in doc:
+            doc["path"] = os.path.join(root, doc["path"])
+            if doc["path"].lower().endswith((".pdf", ".txt")):
+                doc["text"] = extract_text(doc["path"])
+    return golden
+
+
+def chunk_document(doc: Dict, size: int, overlap: int) -> List[Dict]:
+    """Chunk metadatas for one golden document, the way ingestion would chunk it."""
+    from services.chunking import chunk_plain_text, chunk_text_from_segments, document_chunks, map_chunks_to_timestamps
+
+    if doc.get("segments"):
+        chunks = chunk_text_from_segments(doc["segments"], chunk_size=size, chunk_overlap=overlap)
+        return map_chunks_to_timestamps(doc["segments"], chunks)
+    if "text" in doc:
+        return [{"chunk_text": t, "start": i, "end": i + 1} for i, (t, _) in enumerate(chunk_plain_text(doc["text"], size, overlap))]
+    return list(document_chunks(doc["path"], size, overlap))
+
+
+def _relevant(meta: Dict, question: Dict) -> List[int]:
+    """Indexes of the question's expected spans / answers this chunk covers."""
+    found = []
+    places = [meta] + list(meta.get("duplicates", []))
+    for n, (lo, hi) in enumerate(question.get("spans", [])):
+        if any(p.get("start") is not None and p["start"] < hi and p.get("end", p["start"]) > lo for p in places):
+            found.append(n)
+    text = _norm(meta.get("chunk_text") or "")
+    offset = len(question.get("spans", []))
+    for n, answer in enumerate(question.get("answers", [])):
+        if _norm(answer) in text:
+            found.append(offset + n)
+    return found
+
+
+def score(ranked: Sequence[Dict], question: Dict, k: int):
+    """(recall@k, reciprocal rank within k) for one question."""
+    expected = len(question.get("spans", [])) + len(question.get("answers", []))
+    covered, rr = set(), 0.0
+    for rank, meta in enumerate(ranked[:k], start=1):
+        hits = _relevant(meta, question)
+        if hits and not rr:
+            rr = 1.0 / rank
+        covered.update(hits)
+    return (len(covered) / expected if expected else 0.0), rr
+
+
+# ======================================================
+# 🧪 Sweep
+# ======================================================
+def build_faiss(spec: str, vectors):
+    import faiss
+
+    n, d = vectors.shape
+    spec = spec.replace("{nlist}", str(max(1, int(math.sqrt(n)))))
+    index = faiss.index_factory(d, spec)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def _set_search_params(index, nprobe: int, ef_search: int):
+    import faiss
+
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except Exception:  # not an IVF / HNSW index
+            pass
+
+
+def evaluate(golden: Dict, chunk_sizes: Sequence[int], overlaps: Sequence[int], index_types: Sequence[str],
+             top_ks: Sequence[int], repeat: int = 3, nprobe: int = 8, ef_search: int = 64) -> Dict:
+    import faiss
+    import numpy as np
+    from services import dedup, model_registry
+    from benchmarks.harness import percentile
+
+    embedder = model_registry.get_embedder()
+    docs = {d["id"]: d for d in golden["documents"]}
+    questions = [q for q in golden["questions"] if q["doc"] in docs]
+    start = time.perf_counter()
+    qvecs = np.asarray(embedder.encode([q["question"] for q in questions], show_progress_bar=False), dtype="float32")
+    query_embed_ms = (time.perf_counter() - start) * 1000 / max(1, len(questions))
+    max_k = max(top_ks)
+
+    rows = []
+    for size in chunk_sizes:
+        for overlap in overlaps:
+            if overlap >= size:
+                continue
+            # chunk + embed once per (size, overlap); index types reuse the vectors
+            prepared, embed_s = {}, 0.0
+            for doc_id, doc in docs.items():
+                metas = chunk_document(doc, size, overlap)
+                texts = [m["chunk_text"] for m in metas]
+                t0 = time.perf_counter()
+                vectors = np.asarray(embedder.encode(texts, show_progress_bar=False), dtype="float32")
+                embed_s += time.perf_counter() - t0
+                if dedup.DEDUP_ENABLED and metas:
+                    deduper = dedup.Deduper()
+                    keep, records = deduper.exact(texts, metas)
+                    texts, vectors = [texts[i] for i in keep], vectors[keep]
+                    keep = deduper.near(texts, records, vectors)
+                    metas, vectors = [records[i] for i in keep], vectors[keep]
+                prepared[doc_id] = (metas, np.ascontiguousarray(vectors))
+            n_chunks = sum(len(m) for m, _ in prepared.values())
+
+            for spec in index_types:
+                indexes, build_s, nbytes = {}, embed_s, 0
+                try:
+                    for doc_id, (metas, vectors) in prepared.items():
+                        if not len(metas):
+                            continue
+                        t0 = time.perf_counter()
+                        index = build_faiss(spec, vectors)
+                        build_s += time.perf_counter() - t0
+                        _set_search_params(index, nprobe, ef_search)
+                        indexes[doc_id] = index
+                        nbytes += faiss.serialize_index(index).nbytes
+                except Exception as e:  # e.g. IVF with fewer chunks than training needs
+                    print(f"skip size={size} overlap={overlap} index={spec}: {e}", file=sys.stderr)
+                    continue
+
+                for k in top_ks:
+                    latencies, recalls, rrs, ctx = [], [], [], []
+                    for q, qvec in zip(questions, qvecs):
+                        index = indexes.get(q["doc"])
+                        if index is None:
+                            recalls.append(0.0)
+                            rrs.append(0.0)
+                            continue
+                        for _ in range(repeat):
+                            t0 = time.perf_counter()
+                            _, ids = index.search(qvec[None, :], k)
+                            latencies.append(time.perf_counter() - t0)
+                        metas = prepared[q["doc"]][0]
+                        ranked = [metas[i] for i in ids[0] if i >= 0]
+                        recall, rr = score(ranked, q, k)
+                        recalls.append(recall)
+                        rrs.append(rr)
+                        ctx.append(sum(len(m["chunk_text"]) for m in ranked))
+                    rows.append({
+                        "chunk_size": size,
+                        "overlap": overlap,
+                        "index": spec,
+                        "top_k": k,
+                        "chunks": n_chunks,
+                        "recall": sum(recalls) / max(1, len(recalls)),
+                        "mrr": sum(rrs) / max(1, len(rrs)),
+                        "index_kb": nbytes / 1024,
+                        "build_s": build_s,
+                        "p50_ms": percentile(latencies, 50) * 1000,
+                        "p99_ms": percentile(latencies, 99) * 1000,
+                        "context_chars": sum(ctx) / max(1, len(ctx)),
+                    })
+    _mark_frontier(rows)
+    return {"questions": len(questions), "documents": len(docs), "query_embed_ms": query_embed_ms,
+            "max_k": max_k, "rows": rows}
+
+
+def _mark_frontier(rows: List[Dict]):
+    """Flag rows no other row beats on both recall and p50 latency."""
+    for r in rows:
+        r["frontier"] = not any(
+            o is not r and o["recall"] >= r["recall"] and o["p50_ms"] <= r["p50_ms"]
+            and (o["recall"] > r["recall"] or o["p50_ms"] < r["p50_ms"])
+            for o in rows
+        )
+
+
+def format_rows(rows: List[Dict]) -> str:
+    header = (f"  {'size':>5} {'ovl':>4} {'index':<18} {'k':>3} {'chunks':>7} {'recall':>7} {'MRR':>6} "
+              f"{'index KB':>9} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'ctx chars':>9}")
+    lines = [header, "-" * len(header)]
+    ordered = sorted(rows, key=lambda r: (r["top_k"], -r["recall"], r["p50_ms"]))
+    for r in ordered:
+        lines.append(
+            f"{'*' if r['frontier'] else ' '} {r['chunk_size']:>5} {r['overlap']:>4} {r['index']:<18} {r['top_k']:>3} "
+            f"{r['chunks']:>7} {r['recall']:>7.3f} {r['mrr']:>6.3f} {r['index_kb']:>9.1f} {r['build_s']:>8.2f} "
+            f"{r['p50_ms']:>7.3f} {r['p99_ms']:>7.3f} {r['context_chars']:>9.0f}"
+        )
+    return "\n".join(lines)
+
+
+def _save(path: str, result: Dict):
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(result["rows"][0]))
+            writer.writeheader()
+            writer.writerows(result["rows"])
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+# ======================================================
+# 🖥️ CLI
+# ======================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Retrieval quality vs. latency sweep over chunking and index parameters")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--golden", help="golden-set JSON file")
+    source.add_argument("--synthetic", action="store_true", help="generated transcripts with planted facts")
+    parser.add_argument("--chunk-sizes", type=_ints, default=[400, 800, 1200])
+    parser.add_argument("--overlaps", type=_ints, default=[0, 50, 150])
+    parser.add_argument("--index-types", default="Flat;HNSW32;IVF{nlist},Flat", help="';'-separated faiss.index_factory strings")
+    parser.add_argument("--top-k", type=_ints, default=[3, 5, 8])
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists probed per query")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW candidate list size")
+    parser.add_argument("--repeat", type=int, default=3, help="timed searches per question")
+    parser.add_argument("--real", action="store_true", help="use the real EMBED_MODEL instead of the stub")
+    parser.add_argument("--out", help="write rows to .csv or the full result to .json")
+    args = parser.parse_args(argv)
+
+    if not args.real:
+        os.environ["MODEL_BACKEND"] = "stub"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from services import stub_models
+    from services.logging_setup import configure_logging
+
+    if not args.real:
+        stub_models.install()
+    configure_logging(level="WARNING", force=True)
+
+    if args.synthetic:
+        from benchmarks import corpora
+        golden = corpora.make_golden_set()
+    else:
+        golden = load_golden(args.golden)
+
+    index_types = [s.strip() for s in args.index_types.split(";") if s.strip()]
+    result = evaluate(golden, args.chunk_sizes, args.overlaps, index_types, args.top_k,
+                      repeat=args.repeat, nprobe=args.nprobe, ef_search=args.ef_search)
+    if not result["rows"]:
+        print("no configuration could be evaluated", file=sys.stderr)
+        return 1
+
+    print(f"{result['documents']} documents, {result['questions']} questions, "
+          f"{'real' if args.real else 'stub'} embedder, question embedding {result['query_embed_ms']:.2f} ms each")
+    print(format_rows(result["rows"]))
+    if args.out:
+        _save(args.out, result)
+        print(f"\nwritten to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
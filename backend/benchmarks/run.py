@@ -0,0 +1,172 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite for the ingestion and QA hot paths.
+
+Heavy models are replaced by the deterministic stand-ins in
+services/stub_models.py, so this runs on CPU with no network:
+
+    cd backend
+    python -m benchmarks.run                              # all benchmarks, all sizes
+    python -m benchmarks.run --sizes small,medium --only chunking,search
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.25
+
+With --baseline, exits non-zero when any p50 regresses beyond the tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+# worker processes (EMBED_WORKERS) load their models from the environment
+os.environ.setdefault("MODEL_BACKEND", "stub")
+# "search" cycles through a few questions; measure the encoder, not the query cache
+os.environ.setdefault("QUERY_EMBED_CACHE_SIZE", "0")
+
+from services import stub_models  # noqa: E402
+from services.logging_setup import configure_logging  # noqa: E402
+
+stub_models.install()
+configure_logging(level="WARNING", force=True)
+
+from services.chunking import chunk_text_from_segments, map_chunks_to_timestamps, document_chunks  # noqa: E402
+from services.embeddings_index import FaissIndexManager  # noqa: E402
+from services.file_reader import extract_text_from_pdf, extract_text_from_docx, extract_text_from_csv  # noqa: E402
+from services.rag import rag_answer, _unique_lines_across_chunks  # noqa: E402
+from services.summarize import generate_summary_json  # noqa: E402
+from services import transcript_store  # noqa: E402
+
+from benchmarks import corpora  # noqa: E402
+from benchmarks.harness import measure, load_baseline, save_baseline, compare, format_table  # noqa: E402
+
+BENCHMARKS = ("chunking", "timestamps", "build_index", "search", "dedup_lines", "pdf", "docx", "csv", "rag_answer",
+              "summarize", "transcript_json", "transcript_tsz", "csv_chunks", "docx_chunks")
+
+
+def _repeat_for(size: str, base: int) -> int:
+    return max(3, base // {"small": 1, "medium": 4, "large": 20}[size])
+
+
+def run_size(size: str, selected, workdir: str):
+    results = {}
+    n = corpora.SIZES[size]
+    segments = corpora.make_segments(n)
+    chunks = chunk_text_from_segments(segments)
+    metadatas = map_chunks_to_timestamps(segments, chunks)
+    questions = corpora.make_questions(50)
+    doc_id = f"bench_{size}"
+
+    def record(name, **kwargs):
+        results[f"{name}[{size}]"] = measure(**kwargs)
+
+    if "chunking" in selected:
+        record("chunking", fn=lambda: chunk_text_from_segments(segments), repeat=_repeat_for(size, 40), items=len(segments))
+    if "timestamps" in selected:
+        record("timestamps", fn=lambda: map_chunks_to_timestamps(segments, chunks), repeat=_repeat_for(size, 40), items=len(chunks))
+
+    if "transcript_json" in selected or "transcript_tsz" in selected:
+        result = corpora.make_whisper_result(segments)
+        json_path = os.path.join(workdir, f"transcript_{size}.json")
+        tsz_path = os.path.join(workdir, f"transcript_{size}.tsz")
+
+        def json_roundtrip():
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)["segments"]
+
+        def tsz_roundtrip():
+            transcript_store.write_transcript(tsz_path, result)
+            return transcript_store.read_transcript(tsz_path)["segments"]
+
+        if "transcript_json" in selected:
+            record("transcript_json", fn=json_roundtrip, repeat=_repeat_for(size, 20), items=len(segments))
+        if "transcript_tsz" in selected:
+            record("transcript_tsz", fn=tsz_roundtrip, repeat=_repeat_for(size, 20), items=len(segments))
+
+    fm = FaissIndexManager(index_dir=os.path.join(workdir, "faiss_index"))
+    if "build_index" in selected:
+        record("build_index", fn=lambda: fm.build_index(doc_id, chunks, metadatas), repeat=_repeat_for(size, 20), items=len(chunks))
+    else:
+        fm.build_index(doc_id, chunks, metadatas)
+
+    if "search" in selected:
+        it = iter(range(10 ** 9))
+        record("search", fn=lambda: fm.search(doc_id, questions[next(it) % len(questions)], top_k=5), repeat=100, items=1)
+
+    if "dedup_lines" in selected:
+        retrieved = corpora.make_retrieved(max(5, n // 50))
+        record("dedup_lines", fn=lambda: _unique_lines_across_chunks(retrieved, max_chars=10 ** 9), repeat=_repeat_for(size, 200), items=len(retrieved))
+
+    wanted_files = {"pdf", "docx", "csv", "csv_chunks", "docx_chunks"} & set(selected)
+    if wanted_files:
+        files = corpora.write_corpus_files(os.path.join(workdir, "files"), size)
+        dims = corpora.file_sizes(size)
+        if "pdf" in selected:
+            record("pdf", fn=lambda: extract_text_from_pdf(files["pdf"]), repeat=_repeat_for(size, 10), items=dims["pdf_pages"])
+        if "docx" in selected:
+            record("docx", fn=lambda: extract_text_from_docx(files["docx"]), repeat=_repeat_for(size, 10), items=dims["docx_paragraphs"])
+        if "csv" in selected:
+            record("csv", fn=lambda: extract_text_from_csv(files["csv"]), repeat=_repeat_for(size, 10), items=dims["csv_rows"])
+        if "csv_chunks" in selected:
+            record("csv_chunks", fn=lambda: sum(1 for _ in document_chunks(files["csv"])), repeat=_repeat_for(size, 10), items=dims["csv_rows"])
+        if "docx_chunks" in selected:
+            record("docx_chunks", fn=lambda: sum(1 for _ in document_chunks(files["docx"])), repeat=_repeat_for(size, 10), items=dims["docx_paragraphs"])
+
+    if "rag_answer" in selected or "summarize" in selected:
+        # rag_answer / summaries use the default index location, so build it relative to the workdir cwd.
+        FaissIndexManager().build_index(doc_id, chunks, metadatas)
+    if "rag_answer" in selected:
+        it = iter(range(10 ** 9))
+        record("rag_answer", fn=lambda: rag_answer(doc_id, questions[next(it) % len(questions)]), repeat=50, items=1)
+    if "summarize" in selected:
+        record("summarize", fn=lambda: generate_summary_json(doc_id), repeat=_repeat_for(size, 10), items=len(chunks))
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (stub models, synthetic corpora)")
+    parser.add_argument("--sizes", default=",".join(corpora.SIZES), help="comma-separated size classes")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated benchmark names")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write results to this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    selected = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+                results.update(run_size(size, selected, workdir))
+        finally:
+            os.chdir(cwd)
+
+    baseline = load_baseline(args.baseline)
+    print(format_table(results, baseline))
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for key, b, c, ratio in regressions:
+                print(f"  {key}: p50 {b:.2f} ms -> {c:.2f} ms ({ratio:.2f}x)")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
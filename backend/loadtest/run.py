@@ -0,0 +1,201 @@
+# loadtest/run.py
+"""
+Load generator for the FastAPI app: drives a concurrent mix of
+/youtube/process, /rag/query and /summarize/{id} and reports throughput,
+latency percentiles and error rates per endpoint.
+
+Against a running server (start it with DOWNLOAD_BACKEND=fixture
+WHISPER_BACKEND=fixture to avoid YouTube and real Whisper):
+
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --duration 60 --concurrency 16
+
+Fully in-process, with fixture download/Whisper and stub models:
+
+    python -m loadtest.run --in-process --duration 30 --mix process=1,query=8,summarize=2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.harness import percentile
+
+DEFAULT_MIX = "process=1,query=8,summarize=2"
+ENDPOINTS = {
+    "process": "POST /youtube/process",
+    "query": "POST /rag/query",
+    "summarize": "GET /summarize/{video_id}",
+}
+QUESTIONS = [
+    "What is the main topic of the video?",
+    "What examples does the speaker give?",
+    "How does the speaker conclude?",
+    "What are the key steps mentioned?",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown workload '{name}' (expected one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _fixture_video_ids() -> List[str]:
+    root = os.environ.get("FIXTURE_TRANSCRIPTS", os.path.join("api", "transcripts"))
+    if not os.path.isdir(root):
+        return ["fixture"]
+    return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) or ["fixture"]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.codes: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, op: str, seconds: float, status: int):
+        self.latencies[op].append(seconds)
+        self.codes[op][status] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        out = {}
+        for op, samples in sorted(self.latencies.items()):
+            codes = self.codes[op]
+            errors = sum(n for code, n in codes.items() if not 200 <= code < 300)
+            out[ENDPOINTS[op]] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples) if samples else 0.0,
+                "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p90_ms": percentile(samples, 90) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "max_ms": max(samples) * 1000 if samples else 0.0,
+                "status_codes": {str(k): v for k, v in sorted(codes.items())},
+            }
+        return out
+
+
+async def _request(client: httpx.AsyncClient, op: str, video_id: str, rng: random.Random) -> int:
+    if op == "process":
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        r = await client.post("/youtube/process", params={"youtube_url": url})
+    elif op == "query":
+        r = await client.post("/rag/query", json={"video_id": video_id, "question": rng.choice(QUESTIONS)})
+    else:
+        r = await client.get(f"/summarize/{video_id}")
+    return r.status_code
+
+
+async def _worker(client, mix, video_ids, recorder, deadline, budget, seed):
+    rng = random.Random(seed)
+    ops, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline and budget["left"] > 0:
+        budget["left"] -= 1
+        op = rng.choices(ops, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = await _request(client, op, rng.choice(video_ids), rng)
+        except httpx.HTTPError:
+            status = 599
+        recorder.add(op, time.perf_counter() - start, status)
+
+
+async def run_load(client, mix, video_ids, concurrency, duration, max_requests, seed=0, seed_indexes=True):
+    if seed_indexes and ("query" in mix or "summarize" in mix):
+        # make sure every document has an index before the timed run
+        for vid in video_ids:
+            await _request(client, "process", vid, random.Random(seed))
+
+    recorder = Recorder()
+    budget = {"left": max_requests or float("inf")}
+    start = time.monotonic()
+    deadline = start + duration
+    await asyncio.gather(*[
+        _worker(client, mix, video_ids, recorder, deadline, budget, seed + i) for i in range(concurrency)
+    ])
+    return recorder.report(time.monotonic() - start)
+
+
+def format_report(report: Dict[str, Dict]) -> str:
+    header = f"{'endpoint':<28} {'reqs':>6} {'err%':>6} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    lines = [header, "-" * len(header)]
+    for name, r in report.items():
+        lines.append(
+            f"{name:<28} {r['requests']:>6} {r['error_rate'] * 100:>5.1f}% {r['throughput_rps']:>8.2f} "
+            f"{r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}"
+        )
+        if r["errors"]:
+            lines.append(f"{'':<28} status codes: {r['status_codes']}")
+    return "\n".join(lines)
+
+
+def _in_process_app(workdir: str):
+    """Import the app with fixture download/Whisper and stub models, writing artifacts under workdir."""
+    os.environ.setdefault("DOWNLOAD_BACKEND", "fixture")
+    os.environ.setdefault("WHISPER_BACKEND", "fixture")
+    os.environ.setdefault("MODEL_BACKEND", "stub")
+    os.environ.setdefault("FIXTURE_TRANSCRIPTS", os.path.abspath(os.path.join("api", "transcripts")))
+    backend_dir = os.getcwd()
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    os.chdir(workdir)
+    from api.main import app
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent mixed-workload load generator")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="URL of a running API server")
+    target.add_argument("--in-process", action="store_true", help="drive the app in-process with fixture backends")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted workload mix (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--video-ids", help="comma-separated ids (default: fixture transcript ids)")
+    parser.add_argument("--no-seed", action="store_true", help="skip processing every video before the run")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    video_ids = args.video_ids.split(",") if args.video_ids else _fixture_video_ids()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    async def _go():
+        if args.in_process:
+            app = _in_process_app(tempfile.mkdtemp(prefix="loadtest_"))
+            transport = httpx.ASGITransport(app=app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+        else:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        async with client:
+            return await run_load(
+                client, mix, video_ids, args.concurrency, args.duration, args.requests,
+                seed=args.seed, seed_indexes=not args.no_seed,
+            )
+
+    report = asyncio.run(_go())
+    print(format_report(report))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
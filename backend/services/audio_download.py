@@ -1,26 +1,161 @@
-import yt_dlp
 import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
 
-def download_audio(youtube_url, out_dir="tmp"):
-    os.makedirs(out_dir, exist_ok=True)
+import numpy as np
+
+from services.logging_setup import get_logger
+from services.metrics import track_stage
+
+logger = get_logger(__name__)
+
+# "ytdlp" (default) or "fixture" (local audio, see services/fixture_backends.py)
+DOWNLOAD_BACKEND = os.environ.get("DOWNLOAD_BACKEND", "ytdlp").lower()
+
+# Whisper's native input: 16 kHz mono float32
+SAMPLE_RATE = 16000
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN", "ffmpeg")
+# Decoded audio longer than this is spilled to a memory-mapped file instead of RAM
+AUDIO_MMAP_SECONDS = float(os.environ.get("AUDIO_MMAP_SECONDS", "600"))
+
+
+def _ytdlp_download(youtube_url, out_dir="tmp", convert=True):
+    """
+    convert=True  -> legacy path, FFmpegExtractAudio to a WAV file
+    convert=False -> keep the downloaded stream as-is (webm/m4a) for open_audio
+    """
+    import yt_dlp
 
     ydl_opts = {
         'format': 'bestaudio/best',
         'outtmpl': os.path.join(out_dir, '%(id)s.%(ext)s'),
-        'postprocessors': [{
+        'quiet': True,
+        'noprogress': True,
+    }
+    if convert:
+        ydl_opts['postprocessors'] = [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': 'wav',
             'preferredquality': '192',
-        }],
-    }
+        }]
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(youtube_url, download=True)
         filename = ydl.prepare_filename(info)
-        base, _ = os.path.splitext(filename)
-        wav_path = base + ".wav"
-        return wav_path, {
+        if convert:
+            base, _ = os.path.splitext(filename)
+            path = base + ".wav"
+        else:
+            downloads = info.get("requested_downloads") or []
+            path = downloads[0].get("filepath", filename) if downloads else filename
+        return path, {
             "title": info.get("title"),
             "duration": info.get("duration"),
             "id": info.get("id"),
         }
+
+
+_backends: Dict[str, Callable[..., Tuple[str, Dict]]] = {"ytdlp": _ytdlp_download}
+
+
+def register_backend(name: str, fn: Callable[..., Tuple[str, Dict]]):
+    _backends[name] = fn
+
+
+def download_audio(youtube_url, out_dir="tmp"):
+    os.makedirs(out_dir, exist_ok=True)
+    backend = _backends[DOWNLOAD_BACKEND]
+
+    with track_stage("download") as stage:
+        wav_path, info = backend(youtube_url, out_dir)
+        stage.items = 1
+
+    logger.info("audio_downloaded", extra={"video_id": info.get("id"), "duration": info.get("duration"), "path": wav_path, "backend": DOWNLOAD_BACKEND})
+    return wav_path, info
+
+
+# ======================================================
+# 🎚️ Decode straight to 16 kHz mono float32
+# ======================================================
+def _decode_wav(path: str) -> np.ndarray:
+    """ffmpeg-free fallback for PCM16 WAV input (fixtures, tests)."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise RuntimeError(f"ffmpeg not found and {path} is not 16-bit PCM")
+        channels, rate = w.getnchannels(), w.getframerate()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    audio = pcm.reshape(-1, channels).mean(axis=1, dtype="float32") / 32768.0
+    if rate != SAMPLE_RATE and len(audio):
+        n = int(len(audio) * SAMPLE_RATE / rate)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio).astype("float32")
+    return audio
+
+
+def decode_audio(src_path: str, spill_path: str = None) -> np.ndarray:
+    """
+    Decode any container/codec to 16 kHz mono float32 with a single ffmpeg
+    process. With `spill_path` the samples go to that file and come back as
+    a copy-on-write memmap instead of an in-memory buffer.
+    """
+    if shutil.which(FFMPEG_BIN) is None:
+        if src_path.lower().endswith(".wav"):
+            return _decode_wav(src_path)
+        raise RuntimeError("ffmpeg is required to decode audio")
+
+    cmd = [
+        FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+        "-i", src_path,
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        spill_path or "-",
+    ]
+    if spill_path:
+        cmd.insert(1, "-y")
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {proc.stderr.decode(errors='replace').strip()}")
+
+    if spill_path:
+        if os.path.getsize(spill_path) == 0:
+            return np.zeros(0, dtype="float32")
+        return np.memmap(spill_path, dtype="float32", mode="c")
+    return np.frombuffer(proc.stdout, dtype="float32")
+
+
+@contextmanager
+def open_audio(youtube_url, out_dir="tmp") -> Iterator[Tuple[np.ndarray, Dict]]:
+    """
+    Download the compressed audio stream, decode it once to a 16 kHz mono
+    float32 array and yield (audio, info). Everything written for this job
+    lives in its own directory under `out_dir`, removed when the block exits.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    backend = _backends[DOWNLOAD_BACKEND]
+    job_dir = tempfile.mkdtemp(prefix="audio_", dir=out_dir)
+    try:
+        with track_stage("download") as stage:
+            src_path, info = backend(youtube_url, job_dir, convert=False)
+            stage.items = 1
+
+        duration = info.get("duration") or 0
+        spill = os.path.join(job_dir, "audio.f32") if duration > AUDIO_MMAP_SECONDS else None
+        with track_stage("decode") as stage:
+            audio = decode_audio(src_path, spill)
+            stage.items = 1
+        os.remove(src_path)  # compressed source is no longer needed
+
+        logger.info("audio_decoded", extra={
+            "video_id": info.get("id"), "duration": duration, "samples": len(audio),
+            "mmap": spill is not None, "backend": DOWNLOAD_BACKEND,
+        })
+        yield audio, info
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+if DOWNLOAD_BACKEND == "fixture":
+    from services import fixture_backends
+    fixture_backends.install_download_backend()
@@ -0,0 +1,505 @@
+# services/bulk_ingest.py
+"""
+Bulk ingestion of playlists, channels, URL lists and document folders.
+
+Items flow through three overlapping stages, so downloads, transcription
+and embedding of different items run at the same time:
+
+    fetch   BULK_FETCH_WORKERS threads     download + decode audio to a raw
+                                           float32 file (documents pass through)
+    parse   BULK_PARSE_WORKERS processes   Whisper / text extraction + chunking
+                                           (0 = one in-process thread)
+    embed   the job's own thread           chunks of several documents are
+                                           encoded together (BULK_EMBED_BATCH
+                                           chunks), then each index is published
+
+At most BULK_MAX_IN_FLIGHT items are between fetch and embed, so downloads
+cannot run ahead and fill the disk. Every finished item is appended to a
+journal (data/bulk/<job_id>.jsonl); running a job again with the same id
+skips what is already indexed, so an interrupted run resumes where it stopped.
+
+    python -m services.bulk_ingest --playlist "https://www.youtube.com/playlist?list=..."
+    python -m services.bulk_ingest --dir ./papers --parse-workers 3
+    python -m services.bulk_ingest --urls urls.txt --job nightly     # same --job resumes
+
+Parse workers load Whisper from the environment (MODEL_BACKEND,
+WHISPER_BACKEND) and keep it for the whole job, so size BULK_PARSE_WORKERS
+to the RAM available for that many models.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from services import audio_download
+from services.logging_setup import get_logger
+from services.memory_governor import governor
+from services.metrics import track_stage
+from services.storage import artifacts, TMP_DIR, TRANSCRIPTS_DIR
+
+logger = get_logger(__name__)
+
+MB = 1024 ** 2
+
+BULK_FETCH_WORKERS = int(os.environ.get("BULK_FETCH_WORKERS", "4"))
+BULK_PARSE_WORKERS = int(os.environ.get("BULK_PARSE_WORKERS", "2"))
+BULK_EMBED_BATCH = int(os.environ.get("BULK_EMBED_BATCH", "512"))
+# Embed a partial batch once nothing new arrived for this long
+BULK_EMBED_WAIT_S = float(os.environ.get("BULK_EMBED_WAIT_S", "2"))
+BULK_MAX_IN_FLIGHT = int(os.environ.get("BULK_MAX_IN_FLIGHT", "8"))
+BULK_MAX_DURATION_S = float(os.environ.get("BULK_MAX_DURATION_S", "7200"))
+# Resident size of one parse worker (interpreter + Whisper), for the memory governor
+BULK_PARSE_WORKER_MB = int(os.environ.get("BULK_PARSE_WORKER_MB", "600"))
+JOURNAL_DIR = os.path.join("data", "bulk")
+# POST /youtube/bulk may only read folders below this one
+BULK_INGEST_ROOT = os.environ.get("BULK_INGEST_ROOT", "uploaded_files")
+
+DOC_EXTS = {"pdf", "docx", "txt", "csv"}
+MEDIA_EXTS = {"mp3", "wav", "m4a", "aac", "ogg", "opus", "flac", "mp4", "mkv", "webm", "mov"}
+
+
+# ======================================================
+# 📋 Sources
+# ======================================================
+def _playlist_urls(url: str) -> List[str]:
+    """Video URLs of a playlist or channel (flat extraction, nothing is downloaded)."""
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": "in_playlist", "skip_download": True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    urls = []
+    for entry in info.get("entries") or []:
+        if entry.get("entries"):  # channel tabs (videos, shorts, ...) nest one level deeper
+            urls.extend(e.get("url") or e.get("webpage_url") for e in entry["entries"])
+        else:
+            urls.append(entry.get("url") or entry.get("webpage_url"))
+    return [u for u in urls if u]
+
+
+def _local_id(path: str, prefix: str) -> str:
+    # stable per path: re-ingesting a changed file publishes a new version of the same document
+    return f"{prefix}_{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]}"
+
+
+def expand_sources(urls: Iterable[str] = (), playlists: Iterable[str] = (), directory: Optional[str] = None) -> List[Dict]:
+    """Work items ({"source", "kind", "doc_id"}) for every video URL, playlist entry and supported file."""
+    items, seen = [], set()
+
+    def add(source, kind, doc_id=None):
+        if source not in seen:
+            seen.add(source)
+            items.append({"source": source, "kind": kind, "doc_id": doc_id})
+
+    for url in urls:
+        add(url.strip(), "video")
+    for playlist in playlists:
+        for url in _playlist_urls(playlist):
+            add(url, "video")
+    if directory:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+                if ext in DOC_EXTS:
+                    add(path, "file", _local_id(path, "file"))
+                elif ext in MEDIA_EXTS:
+                    add(path, "media", _local_id(path, "media"))
+    return [i for i in items if i["source"]]
+
+
+# job ids name files and folders (journal, work dir): no separators, no dots
+_JOB_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def check_job_id(job_id: str) -> str:
+    if not isinstance(job_id, str) or not _JOB_ID.match(job_id):
+        raise ValueError("job_id must be 1-64 letters, digits, '_' or '-'")
+    return job_id
+
+
+def _job_path(root: str, name: str) -> str:
+    """`name` under `root`, refusing anything that resolves outside it."""
+    root = os.path.abspath(root)
+    path = os.path.abspath(os.path.join(root, name))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"{name!r} is not a plain name under {root}")
+    return path
+
+
+def default_job_id(items: List[Dict]) -> str:
+    """Same sources -> same id, so re-running a command resumes it."""
+    digest = hashlib.sha1("\n".join(sorted(i["source"] for i in items)).encode("utf-8")).hexdigest()
+    return f"bulk_{digest[:10]}"
+
+
+# ======================================================
+# 📓 Journal
+# ======================================================
+class Journal:
+    """Append-only JSON-lines record of finished items; the last line per source wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.entries[entry["source"]] = entry
+
+    def done(self, source: str) -> bool:
+        return self.entries.get(source, {}).get("status") == "done"
+
+    def record(self, source: str, status: str, **fields):
+        entry = {"source": source, "status": status, "ts": round(time.time(), 3), **fields}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[source] = entry
+
+
+# ======================================================
+# 📥 Stage 1: fetch (threads)
+# ======================================================
+def _decode_to_file(src_path: str, raw_path: str):
+    audio = audio_download.decode_audio(src_path, raw_path)
+    if not isinstance(audio, np.memmap):  # ffmpeg-less WAV fallback decodes in memory
+        np.asarray(audio, dtype="float32").tofile(raw_path)
+
+
+def _fetch(item: Dict, work_dir: str) -> Dict:
+    if item["kind"] == "file":
+        return item
+    item = dict(item)
+    with track_stage("download") as stage:
+        if item["kind"] == "video":
+            backend = audio_download._backends[audio_download.DOWNLOAD_BACKEND]
+            src_path, info = backend(item["source"], work_dir, convert=False)
+            item["doc_id"] = info.get("id", "unknown")
+            item["title"] = info.get("title")
+            if (info.get("duration") or 0) > BULK_MAX_DURATION_S:
+                os.remove(src_path)
+                raise MemoryError(f"🚫 Video too long (>{int(BULK_MAX_DURATION_S // 60)} min).")
+        else:
+            src_path = item["source"]
+        stage.items = 1
+    raw_path = os.path.join(work_dir, f"{item['doc_id']}.f32")
+    with track_stage("decode") as stage:
+        _decode_to_file(src_path, raw_path)
+        stage.items = 1
+    if src_path != item["source"]:
+        os.remove(src_path)
+    item["audio_path"] = raw_path
+    return item
+
+
+# ======================================================
+# 🧠 Stage 2: parse (worker processes)
+# ======================================================
+def _init_worker():
+    # one process per core: keep each worker's math libraries single-threaded
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = "1"
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def _parse(item: Dict, model_name: str, transcripts_root: str) -> Dict:
+    """Chunks + metadata for one fetched item. Runs in a parse worker."""
+    from services import model_registry, transcript_store, vad
+    from services.chunking import chunk_text_from_segments, map_chunks_to_timestamps
+
+    if item["kind"] == "file":
+        from services.chunking import document_chunks
+        source = os.path.basename(item["source"])
+        metadatas = [{**m, "source": source} for m in document_chunks(item["source"])]
+        return {**item, "chunks": [m["chunk_text"] for m in metadatas], "metadatas": metadatas}
+
+    audio_path = item["audio_path"]
+    if os.path.getsize(audio_path) == 0:
+        raise RuntimeError("❌ Audio stream is empty")
+    audio = np.memmap(audio_path, dtype="float32", mode="c")
+    with governor.admit("transcribe"), track_stage("transcription") as stage:
+        model = model_registry.get_whisper(model_name)
+        result = vad.transcribe_speech(model, audio, verbose=False, fp16=False)
+        stage.items = len(result.get("segments", []))
+    del audio
+
+    segments = result.get("segments", [])
+    if not segments:
+        raise RuntimeError("❌ Whisper failed to generate segments")
+    transcript_store.write_transcript(
+        os.path.join(transcripts_root, item["doc_id"], transcript_store.TSZ_NAME), result
+    )
+    chunks = chunk_text_from_segments(segments)
+    metadatas = map_chunks_to_timestamps(segments, chunks)
+    if item.get("title"):
+        for m in metadatas:
+            m["source"] = item["title"]
+    return {**item, "chunks": chunks, "metadatas": metadatas}
+
+
+# ======================================================
+# 🚚 Pipeline
+# ======================================================
+class BulkJob:
+    def __init__(self, job_id: str, items: List[Dict]):
+        self.job_id = check_job_id(job_id)
+        self.items = items
+        self.state = "queued"  # queued -> running -> done | failed
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.counts = {"total": len(items), "skipped": 0, "fetched": 0, "parsed": 0, "indexed": 0, "failed": 0}
+        self.failures: List[Dict] = []
+
+    def to_dict(self) -> Dict:
+        end = self.finished or time.time()
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "error": self.error,
+            **self.counts,
+            "failures": self.failures[-20:],
+            "elapsed_s": round(end - self.started, 1) if self.started else 0.0,
+        }
+
+
+def _embed_and_publish(batch: List[Dict], job: BulkJob, journal: Journal, owner: Optional[str]):
+    """One embedding call for the whole batch, then one index version per document."""
+    from services.embeddings_index import FaissIndexManager
+
+    if not batch:
+        return
+    fm = FaissIndexManager()
+    vectors = fm._embed([c for item in batch for c in item["chunks"]])
+    offset = 0
+    for item in batch:
+        n = len(item["chunks"])
+        try:
+            fm.build_index(item["doc_id"], item["chunks"], item["metadatas"], vectors=vectors[offset:offset + n])
+            artifacts.register(item["doc_id"], owner=owner, kind="file" if item["kind"] == "file" else "video")
+            journal.record(item["source"], "done", doc_id=item["doc_id"], chunks=n)
+            job.counts["indexed"] += 1
+        except Exception as e:
+            _fail(job, journal, item, e)
+        offset += n
+    logger.info("bulk_batch_indexed", extra={"job_id": job.job_id, "documents": len(batch), "chunks": offset})
+
+
+def _fail(job: BulkJob, journal: Journal, item: Dict, error: BaseException):
+    job.counts["failed"] += 1
+    job.failures.append({"source": item["source"], "error": str(error)})
+    journal.record(item["source"], "failed", doc_id=item.get("doc_id"), error=str(error))
+    logger.warning("bulk_item_failed", extra={"job_id": job.job_id, "source": item["source"], "error": str(error)})
+
+
+def run_bulk(job: BulkJob, owner: Optional[str] = None, model_name: str = "tiny",
+             fetch_workers: int = BULK_FETCH_WORKERS, parse_workers: int = BULK_PARSE_WORKERS,
+             embed_batch: int = BULK_EMBED_BATCH, max_in_flight: int = BULK_MAX_IN_FLIGHT,
+             transcripts_root: str = TRANSCRIPTS_DIR) -> BulkJob:
+    """Run the pipeline over `job.items` in the calling thread; returns the finished job."""
+    job.state, job.started = "running", time.time()
+    journal = Journal(_job_path(JOURNAL_DIR, f"{job.job_id}.jsonl"))
+    todo = [i for i in job.items if not journal.done(i["source"])]
+    job.counts["skipped"] = len(job.items) - len(todo)
+    logger.info("bulk_started", extra={"job_id": job.job_id, "items": len(todo), "skipped": job.counts["skipped"],
+                                       "fetch_workers": fetch_workers, "parse_workers": parse_workers})
+
+    work_dir = _job_path(TMP_DIR, job.job_id)  # removed with rmtree at the end
+    os.makedirs(work_dir, exist_ok=True)
+    governor_name = f"bulk_parse:{job.job_id}"
+    if parse_workers > 0:
+        governor.make_room(parse_workers * BULK_PARSE_WORKER_MB * MB, reason="bulk_parse")
+        governor.track(governor_name, parse_workers * BULK_PARSE_WORKER_MB * MB, kind="model")
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=mp.get_context("spawn"),
+                                         initializer=_init_worker)
+    else:
+        parse_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-parse")
+    fetch_pool = ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="bulk-fetch")
+    ready: "queue.Queue" = queue.Queue()
+
+    def after_parse(future):
+        error = future.exception()
+        ready.put((future.item, None if error else future.result(), error))
+
+    def after_fetch(future):
+        error = future.exception()
+        if error is not None:
+            ready.put((future.item, None, error))
+            return
+        fetched = future.result()
+        job.counts["fetched"] += 1
+        try:
+            parsed = parse_pool.submit(_parse, fetched, model_name, transcripts_root)
+        except RuntimeError as e:  # pool shut down (job interrupted)
+            ready.put((fetched, None, e))
+            return
+        parsed.item = fetched
+        parsed.add_done_callback(after_parse)
+
+    pending = iter(todo)
+    in_flight = 0
+
+    def fill():
+        nonlocal in_flight
+        while in_flight < max_in_flight:
+            item = next(pending, None)
+            if item is None:
+                return
+            future = fetch_pool.submit(_fetch, item, work_dir)
+            future.item = item
+            future.add_done_callback(after_fetch)
+            in_flight += 1
+
+    batch: List[Dict] = []
+    try:
+        fill()
+        while in_flight:
+            try:
+                item, parsed, error = ready.get(timeout=BULK_EMBED_WAIT_S if batch else None)
+            except queue.Empty:
+                _embed_and_publish(batch, job, journal, owner)
+                batch = []
+                continue
+            in_flight -= 1
+            if item.get("audio_path") and os.path.exists(item["audio_path"]):
+                os.remove(item["audio_path"])
+            if error is not None:
+                _fail(job, journal, item, error)
+            elif not parsed["chunks"]:
+                _fail(job, journal, item, ValueError("No readable text"))
+            else:
+                job.counts["parsed"] += 1
+                batch.append(parsed)
+                if sum(len(b["chunks"]) for b in batch) >= embed_batch:
+                    _embed_and_publish(batch, job, journal, owner)
+                    batch = []
+            fill()
+        _embed_and_publish(batch, job, journal, owner)
+        job.state = "done"
+    except BaseException as e:
+        job.state, job.error = "failed", str(e) or type(e).__name__
+        raise
+    finally:
+        fetch_pool.shutdown(wait=job.state == "done", cancel_futures=True)
+        parse_pool.shutdown(wait=job.state == "done", cancel_futures=True)
+        governor.forget(governor_name)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        job.finished = time.time()
+        logger.info("bulk_finished", extra=job.to_dict())
+    return job
+
+
+# ======================================================
+# 🗂️ Background jobs (API)
+# ======================================================
+_jobs: Dict[str, BulkJob] = {}
+_jobs_lock = threading.Lock()
+# one bulk job at a time: each already fans out over its own pools
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk")
+
+
+def get_job(job_id: str) -> Optional[BulkJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _run_background(job: BulkJob, urls, playlists, directory, owner):
+    try:
+        if playlists or directory:
+            job.items = expand_sources(urls, playlists, directory)
+            job.counts["total"] = len(job.items)
+        run_bulk(job, owner=owner)
+    except Exception as e:
+        job.state, job.error = "failed", str(e)
+        logger.error("bulk_failed", extra={"job_id": job.job_id, "error": str(e)})
+
+
+def start_bulk(urls: List[str] = (), playlists: List[str] = (), directory: Optional[str] = None,
+               job_id: Optional[str] = None, owner: Optional[str] = None) -> BulkJob:
+    """Queue a bulk job; playlists and folders are expanded when it starts."""
+    items = [{"source": u.strip(), "kind": "video", "doc_id": None} for u in urls if u.strip()]
+    if not job_id:
+        keys = items + [{"source": p} for p in playlists] + ([{"source": os.path.abspath(directory)}] if directory else [])
+        job_id = default_job_id(keys)
+    check_job_id(job_id)
+    with _jobs_lock:
+        running = _jobs.get(job_id)
+        if running is not None and running.state in ("queued", "running"):
+            return running
+        job = _jobs[job_id] = BulkJob(job_id, items)
+    _executor.submit(_run_background, job, list(urls), list(playlists), directory, owner)
+    return job
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ======================================================
+# 🖥️ CLI
+# ======================================================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest videos, playlists and document folders")
+    parser.add_argument("urls", nargs="*", help="video URLs")
+    parser.add_argument("--urls-file", help="file with one URL per line ('-' for stdin)")
+    parser.add_argument("--playlist", action="append", default=[], help="playlist or channel URL (repeatable)")
+    parser.add_argument("--dir", help="folder of PDF/DOCX/TXT/CSV and audio/video files")
+    parser.add_argument("--job", help="job id (default: derived from the sources; the same id resumes)")
+    parser.add_argument("--fetch-workers", type=int, default=BULK_FETCH_WORKERS)
+    parser.add_argument("--parse-workers", type=int, default=BULK_PARSE_WORKERS)
+    parser.add_argument("--embed-batch", type=int, default=BULK_EMBED_BATCH)
+    parser.add_argument("--model", default="tiny", help="Whisper size")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.urls_file:
+        stream = sys.stdin if args.urls_file == "-" else open(args.urls_file, "r", encoding="utf-8")
+        with stream:
+            urls.extend(line.strip() for line in stream if line.strip() and not line.startswith("#"))
+    items = expand_sources(urls, args.playlist, args.dir)
+    if not items:
+        parser.error("nothing to ingest")
+
+    if args.job:
+        try:
+            check_job_id(args.job)
+        except ValueError as e:
+            parser.error(str(e))
+    job = BulkJob(args.job or default_job_id(items), items)
+    try:
+        run_bulk(job, model_name=args.model, fetch_workers=args.fetch_workers,
+                 parse_workers=args.parse_workers, embed_batch=args.embed_batch)
+    except KeyboardInterrupt:
+        print(f"interrupted; resume with --job {job.job_id}", file=sys.stderr)
+        return 130
+    finally:
+        artifacts.flush()
+        print(json.dumps(job.to_dict(), indent=2))
+    return 0 if job.counts["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
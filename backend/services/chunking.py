@@ -1,8 +1,15 @@
 # services/chunking.py
-from typing import List, Dict
+import os
+from typing import Dict, Iterator, List, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from services.metrics import track_stage
 
-def chunk_text_from_segments(segments: List[Dict], chunk_size: int = 800, chunk_overlap: int = 50) -> List[str]:
+# Production chunking defaults; `python -m benchmarks.retrieval_eval` measures alternatives.
+TRANSCRIPT_CHUNK_SIZE = int(os.environ.get("TRANSCRIPT_CHUNK_SIZE", "800"))
+TRANSCRIPT_CHUNK_OVERLAP = int(os.environ.get("TRANSCRIPT_CHUNK_OVERLAP", "50"))
+
+def chunk_text_from_segments(segments: List[Dict], chunk_size: int = TRANSCRIPT_CHUNK_SIZE,
+                             chunk_overlap: int = TRANSCRIPT_CHUNK_OVERLAP) -> List[str]:
     """
     Build chunk list from whisper segments (each segment has 'text', 'start', 'end').
     If `segments` is empty, return [] and caller may fall back to transcript text splitting.
@@ -11,10 +18,157 @@ def chunk_text_from_segments(segments: List[Dict], chunk_size: int = 800, chunk_
     if not segments:
         return []
 
-    # Join segments into a single text but keep boundaries approximate
-    full_text = " ".join(seg.get("text", "") for seg in segments).strip()
+    with track_stage("chunking") as stage:
+        # Join segments into a single text but keep boundaries approximate
+        full_text = " ".join(seg.get("text", "") for seg in segments).strip()
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    chunks = [c.strip() for c in splitter.split_text(full_text) if c and c.strip()]
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        chunks = [c.strip() for c in splitter.split_text(full_text) if c and c.strip()]
+        stage.items = len(chunks)
 
     return chunks
+
+
+def map_chunks_to_timestamps(segments: List[Dict], chunks: List[str]) -> List[Dict]:
+    """
+    Assign each chunk the [start, end] span of the whisper segments it was built from.
+    Segments are consumed in order, so the walk is linear in the number of segments.
+    """
+    seg_texts = [s["text"] for s in segments]
+    seg_starts = [s["start"] for s in segments]
+    seg_ends = [s["end"] for s in segments]
+
+    metadatas = []
+    seg_ptr = 0
+
+    with track_stage("timestamp_mapping") as stage:
+        for chunk in chunks:
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+
+            start_ts, end_ts = None, None
+            accum = ""
+
+            for i in range(seg_ptr, len(seg_texts)):
+                if start_ts is None:
+                    start_ts = seg_starts[i]
+                end_ts = seg_ends[i]
+
+                accum += " " + seg_texts[i]
+                if len(accum) >= len(chunk):
+                    seg_ptr = i + 1
+                    break
+
+            if start_ts is None:
+                start_ts = 0.0
+            if end_ts is None:
+                end_ts = start_ts
+
+            metadatas.append({
+                "chunk_text": chunk,
+                "start": float(start_ts),
+                "end": float(end_ts)
+            })
+        stage.items = len(metadatas)
+
+    return metadatas
+
+
+# ======================================================
+# 🧱 Structure-aware chunking for uploaded documents
+# Each yields (chunk_text, metadata) lazily, so a file is never held in
+# memory as a whole; metadata records where in the file the chunk came from.
+# ======================================================
+DOC_CHUNK_CHARS = int(os.environ.get("DOC_CHUNK_CHARS", "1000"))
+DOC_CHUNK_OVERLAP = int(os.environ.get("DOC_CHUNK_OVERLAP", "150"))
+
+
+def _csv_record(columns: List[str], row: List[str]) -> str:
+    cells = [f"{c}: {v.strip()}" for c, v in zip(columns, row) if v.strip()]
+    cells += [v.strip() for v in row[len(columns):] if v.strip()]  # ragged rows keep their extra cells
+    return "; ".join(cells)
+
+
+def chunk_csv(path: str, max_chars: int = DOC_CHUNK_CHARS) -> Iterator[Tuple[str, Dict]]:
+    """Rows grouped under their header; every row is rendered as `column: value` pairs."""
+    from services.file_reader import iter_csv_batches
+
+    lines, first, last, columns = [], None, None, []
+    size = 0
+
+    def flush():
+        return "\n".join(lines), {"row_start": first, "row_end": last, "columns": columns}
+
+    for columns, rows in iter_csv_batches(path):
+        for line_no, row in rows:
+            record = _csv_record(columns, row)
+            if lines and size + len(record) > max_chars:
+                yield flush()
+                lines, size = [], 0
+            if not lines:
+                first = line_no
+            lines.append(record)
+            last = line_no
+            size += len(record) + 1
+    if lines:
+        yield flush()
+
+
+def chunk_docx(path: str, max_chars: int = DOC_CHUNK_CHARS) -> Iterator[Tuple[str, Dict]]:
+    """Paragraphs grouped under their heading; a chunk never spans two sections."""
+    from services.file_reader import iter_docx_paragraphs
+
+    headings: List[Tuple[int, str]] = []  # open (level, text) path, outermost first
+    paragraphs, first, last = [], None, None
+    size = 0
+
+    def flush():
+        title = " > ".join(h for _, h in headings)
+        body = "\n".join(paragraphs)
+        return (f"{title}\n{body}" if title else body), {"heading": title, "para_start": first, "para_end": last}
+
+    for n, level, text in iter_docx_paragraphs(path):
+        if level >= 0:
+            if paragraphs:
+                yield flush()
+                paragraphs, size = [], 0
+            headings = [h for h in headings if h[0] < level] + [(level, text)]
+            continue
+        if paragraphs and size + len(text) > max_chars:
+            yield flush()
+            paragraphs, size = [], 0
+        if not paragraphs:
+            first = n
+        paragraphs.append(text)
+        last = n
+        size += len(text) + 1
+    if paragraphs:
+        yield flush()
+
+
+def chunk_plain_text(text: str, max_chars: int = DOC_CHUNK_CHARS, overlap: int = DOC_CHUNK_OVERLAP) -> Iterator[Tuple[str, Dict]]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=min(overlap, max_chars // 2))
+    for chunk in splitter.split_text(text):
+        yield chunk, {}
+
+
+def document_chunks(path: str, max_chars: int = DOC_CHUNK_CHARS, overlap: int = DOC_CHUNK_OVERLAP) -> Iterator[Dict]:
+    """
+    Chunk metadata ({"chunk_text", "start", "end", ...}) for a PDF/DOCX/TXT/CSV
+    file, picked by extension. CSV and DOCX are streamed; `start`/`end` are the
+    chunk's position, as for every uploaded document. `overlap` applies to
+    plain text only (CSV rows and DOCX paragraphs are never split).
+    """
+    from services.file_reader import extract_text
+
+    ext = path.rsplit(".", 1)[-1].lower()
+    if ext == "csv":
+        pieces = chunk_csv(path, max_chars)
+    elif ext == "docx":
+        pieces = chunk_docx(path, max_chars)
+    else:
+        pieces = chunk_plain_text(extract_text(path), max_chars, overlap)
+
+    for i, (text, meta) in enumerate(pieces):
+        yield {"chunk_text": text, "start": i, "end": i + 1, **meta}
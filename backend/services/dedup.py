@@ -0,0 +1,200 @@
+# services/dedup.py
+"""
+Build-time duplicate elimination for index chunks.
+
+Transcripts repeat intros, sponsor reads and catch-phrases; PDFs repeat
+page headers and footers. Each copy used to become its own vector, which
+made indexes bigger, search slower and top-k results repetitive.
+
+Two passes, both incremental so they work across streamed batches and
+against an existing index when chunks are appended:
+
+- exact: chunks whose normalized text (case, punctuation and whitespace
+  ignored) hashes the same as an earlier chunk are dropped before they
+  are embedded.
+- near: after embedding, a chunk whose cosine similarity to a kept chunk
+  is at least DEDUP_SIMILARITY *and* whose word 3-gram overlap (Jaccard)
+  with it is at least DEDUP_MIN_OVERLAP is dropped. The lexical check
+  keeps topically similar but different passages (neighbouring CSV rows,
+  two explanations of one idea) apart.
+
+A dropped chunk is folded into the chunk it duplicates: its location
+(start/end, page, rows, ...) is appended to that chunk's "duplicates"
+list, so sources can still report every place the passage occurs.
+
+    DEDUP_ENABLED=1             0 keeps every chunk
+    DEDUP_SIMILARITY=0.95       cosine similarity for near duplicates
+    DEDUP_MIN_OVERLAP=0.5       word 3-gram Jaccard for near duplicates
+"""
+import hashlib
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import faiss
+import numpy as np
+
+from services.metrics import REGISTRY
+
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "1") == "1"
+DEDUP_SIMILARITY = float(os.environ.get("DEDUP_SIMILARITY", "0.95"))
+DEDUP_MIN_OVERLAP = float(os.environ.get("DEDUP_MIN_OVERLAP", "0.5"))
+
+# metadata fields that say where a chunk came from
+LOCATION_KEYS = ("start", "end", "page", "row_start", "row_end", "heading", "para_start", "para_end")
+# kept chunks compared with each new one (the most similar first)
+_NEAR_CANDIDATES = 4
+# new chunks checked against each other directly (then added to the index) per step
+_NEAR_BLOCK = 256
+
+DROPPED = REGISTRY.counter("index_dedup_dropped_total", "Chunks folded into a duplicate at index build.", ("kind",))
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def text_key(text: str) -> str:
+    """Hash of the text with case, punctuation and whitespace ignored."""
+    return hashlib.sha1(" ".join(_words(text)).encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, n: int = 3) -> Set[Tuple[str, ...]]:
+    words = _words(text)
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def location(m: Dict) -> Dict:
+    return {k: m[k] for k in LOCATION_KEYS if k in m}
+
+
+def fold(kept: Dict, dup: Dict):
+    """Record `dup` (and everything already folded into it) as an occurrence of `kept`."""
+    occurrences = kept.setdefault("duplicates", [])
+    occurrences.append(location(dup))
+    occurrences.extend(dup.pop("duplicates", []))
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class Deduper:
+    """
+    Kept chunks of one document. `existing` records (and their stored
+    vectors, row-aligned) are what the document already holds; they are
+    updated in place when new chunks fold into them.
+    """
+
+    def __init__(self, existing: Sequence[Dict] = (), existing_vectors: Optional[np.ndarray] = None,
+                 similarity: float = DEDUP_SIMILARITY, min_overlap: float = DEDUP_MIN_OVERLAP):
+        self.similarity = similarity
+        self.min_overlap = min_overlap
+        self.dropped = {"exact": 0, "near": 0}
+        self._by_hash: Dict[str, Dict] = {}
+        self._kept: List[Dict] = []          # position in the similarity index -> record
+        self._shingles: List[Optional[Set]] = []
+        self._index = None
+        for m in existing:
+            key = m.get("text_hash") or (text_key(m["chunk_text"]) if m.get("chunk_text") else None)
+            if key:
+                self._by_hash.setdefault(key, m)
+        if existing_vectors is not None and len(existing_vectors):
+            self._add(list(existing), _unit(existing_vectors))
+
+    def _add(self, records: List[Dict], unit: np.ndarray):
+        if self._index is None:
+            self._index = faiss.IndexFlatIP(unit.shape[1])
+        self._index.add(unit)
+        self._kept.extend(records)
+        self._shingles.extend([None] * len(records))  # computed when first compared
+
+    def _shingles_of(self, pos: int) -> Set:
+        if self._shingles[pos] is None:
+            self._shingles[pos] = shingles(self._kept[pos].get("chunk_text") or "")
+        return self._shingles[pos]
+
+    def exact(self, texts: Sequence[str], metadatas: Sequence[Dict]) -> Tuple[List[int], List[Dict]]:
+        """(positions of the inputs to keep, their records with "text_hash" set)."""
+        keep, records = [], []
+        for i, (text, m) in enumerate(zip(texts, metadatas)):
+            key = text_key(text)
+            first = self._by_hash.get(key)
+            if first is not None:
+                fold(first, dict(m))
+                self.dropped["exact"] += 1
+                continue
+            record = {**m, "text_hash": key}
+            self._by_hash[key] = record
+            keep.append(i)
+            records.append(record)
+        if len(keep) < len(texts):
+            DROPPED.inc(len(texts) - len(keep), kind="exact")
+        return keep, records
+
+    def near(self, texts: Sequence[str], records: Sequence[Dict], vectors: np.ndarray) -> List[int]:
+        """Positions of `records` to keep; the rest are folded into a near-identical kept chunk."""
+        if not len(records):
+            return []
+        unit = _unit(vectors)
+        grams = [shingles(t) for t in texts]
+        keep: List[int] = []
+        # blocks: kept chunks join the index after each one, so a whole-document
+        # build costs one index search per block, not a comparison with every kept chunk
+        for lo in range(0, len(records), _NEAR_BLOCK):
+            keep.extend(self._near_block(range(lo, min(lo + _NEAR_BLOCK, len(records))), records, unit, grams))
+        if len(keep) < len(records):
+            DROPPED.inc(len(records) - len(keep), kind="near")
+        return keep
+
+    def _near_block(self, block: range, records: Sequence[Dict], unit: np.ndarray, grams: List[Set]) -> List[int]:
+        keep: List[int] = []
+        if self._index is not None and self._index.ntotal:
+            sims, cands = self._index.search(unit[block.start:block.stop], min(_NEAR_CANDIDATES, self._index.ntotal))
+        else:
+            sims = cands = None
+
+        for row, i in enumerate(block):
+            record = records[i]
+            target = None
+            if sims is not None:
+                for sim, pos in zip(sims[row], cands[row]):
+                    if pos < 0 or sim < self.similarity:
+                        break
+                    if jaccard(grams[i], self._shingles_of(int(pos))) >= self.min_overlap:
+                        target = self._kept[int(pos)]
+                        break
+            if target is None and keep:
+                # chunks kept earlier in this block are not in the index yet (at most _NEAR_BLOCK)
+                block_sims = unit[keep] @ unit[i]
+                for j in np.argsort(-block_sims)[:_NEAR_CANDIDATES]:
+                    if block_sims[j] < self.similarity:
+                        break
+                    if jaccard(grams[i], grams[keep[j]]) >= self.min_overlap:
+                        target = records[keep[j]]
+                        break
+            if target is None:
+                keep.append(i)
+                continue
+            fold(target, record)
+            # later exact copies of this text belong to the chunk it was folded into
+            self._by_hash[record["text_hash"]] = target
+            self.dropped["near"] += 1
+
+        if keep:
+            self._add([records[i] for i in keep], unit[keep])
+            for offset, i in enumerate(keep):
+                self._shingles[len(self._kept) - len(keep) + offset] = grams[i]
+        return keep
@@ -1,19 +1,354 @@
 # services/embeddings_index.py
 import os
 import pickle
+import shutil
+import threading
+import uuid
 import faiss
 import numpy as np
-from datetime import datetime
-from typing import List, Dict, Optional
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from services.logging_setup import get_logger
+from services.metrics import track_stage, record_cache
+from services.memory_governor import governor
+from services import dedup, model_registry, parallel_embed
+from services.storage import artifacts, INDEX_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = get_logger(__name__)
+
+# ======================================================
+# 🗂️ On-disk layout
+#
+#   faiss_index/<id>/CURRENT          name of the live version dir
+#   faiss_index/<id>/v000007/         index.faiss + meta.pkl
+#
+# Writers build a new version in a temp dir, rename it into place and then
+# swap CURRENT atomically, so readers always see a matching index/meta pair.
+# Folders written before versioning (index.faiss + meta.pkl at the top
+# level) are still read, and migrated on their first update.
+# ======================================================
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+META_FILE = "meta.pkl"
+META_FORMAT = 2
+# Older versions kept around for readers that resolved CURRENT just before a swap
+INDEX_KEEP_VERSIONS = int(os.environ.get("INDEX_KEEP_VERSIONS", "2"))
+# Chunks embedded per step when an index is built from a stream (large CSV/DOCX uploads)
+EMBED_STREAM_BATCH = int(os.environ.get("EMBED_STREAM_BATCH", "256"))
+
+
+def _current_dir(folder: str) -> Tuple[str, Optional[str]]:
+    """(directory holding index + meta, version tag or None for the legacy flat layout)."""
+    try:
+        with open(os.path.join(folder, CURRENT_FILE), "r", encoding="utf-8") as f:
+            tag = f.read().strip()
+        return os.path.join(folder, tag), tag
+    except FileNotFoundError:
+        return folder, None
+
+
+def index_exists(folder: str) -> bool:
+    data_dir, _ = _current_dir(folder)
+    return os.path.exists(os.path.join(data_dir, META_FILE))
+
+
+def index_version(folder: str) -> Optional[str]:
+    """Version tag of the live index (changes on every write); None if missing."""
+    data_dir, tag = _current_dir(folder)
+    if tag is not None:
+        # tags restart at v000001 when a document is evicted and ingested again:
+        # the meta file's stamp tells those builds apart
+        try:
+            st = os.stat(os.path.join(data_dir, META_FILE))
+        except FileNotFoundError:
+            return tag
+        return f"{tag}-{st.st_mtime_ns:x}-{st.st_size:x}"
+    try:
+        st = os.stat(os.path.join(data_dir, INDEX_FILE))
+        return f"legacy-{st.st_mtime_ns:x}-{st.st_size:x}"
+    except FileNotFoundError:
+        return None
+
+
+def estimated_nbytes(folder: str) -> int:
+    """Memory a loaded index + metadata will take, from the files on disk (0 if missing)."""
+    data_dir, _ = _current_dir(folder)
+    try:
+        return os.path.getsize(os.path.join(data_dir, INDEX_FILE)) + 2 * os.path.getsize(os.path.join(data_dir, META_FILE))
+    except OSError:
+        return 0
+
+
+def _read_meta(path: str) -> Dict:
+    """Versioned metadata dict; legacy list-of-dicts files are upgraded in memory."""
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    if isinstance(data, dict) and data.get("format") == META_FORMAT:
+        return data
+    chunks = list(data)
+    for i, m in enumerate(chunks):
+        m.setdefault("chunk_id", i)
+    return {"format": META_FORMAT, "version": 0, "next_id": len(chunks), "chunks": chunks}
+
+
+class _Loaded:
+    __slots__ = ("stamp", "index", "meta", "by_id")
+
+    def __init__(self, stamp, index, meta):
+        self.stamp = stamp
+        self.index = index
+        self.meta = meta
+        self.by_id = {m["chunk_id"]: m for m in meta["chunks"]}
+
+    @property
+    def metadatas(self) -> List[Dict]:
+        return self.meta["chunks"]
+
+
+# ======================================================
+# ♻️ Process-wide cache of loaded indexes + metadata
+# Entries are keyed by folder and validated against the live version tag
+# and the index file's mtime/size, so a rebuild (here or in another
+# worker) is picked up.
+# ======================================================
+INDEX_CACHE_SIZE = int(os.environ.get("INDEX_CACHE_SIZE", "8"))
+
+_index_cache: "OrderedDict[str, _Loaded]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+# ======================================================
+# 🔎 Query embedding cache
+# Repeated questions (and the frequent ones api/warmup.py embeds at startup)
+# skip the encoder. Keyed by the registry name, the loaded variant and the
+# exact text; model_registry.unload("embedder") clears it, so vectors never
+# outlive the model that produced them.
+# ======================================================
+QUERY_EMBED_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "1024"))
+
+_query_cache: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def clear_query_cache():
+    with _query_cache_lock:
+        _query_cache.clear()
+
+
+def _query_owner() -> Tuple[str, str]:
+    # id() of the instance could be reused by the next model loaded at the same address
+    return "embedder", model_registry.variant("embedder")
+
+
+def _cached_query_vectors(embedder, queries: List[str]) -> np.ndarray:
+    """(len(queries), d) float32 query vectors, encoding only the ones not cached."""
+    owner = _query_owner()
+    found: Dict[str, np.ndarray] = {}
+    if QUERY_EMBED_CACHE_SIZE > 0:
+        with _query_cache_lock:
+            for q in queries:
+                vec = _query_cache.get((*owner, q))
+                if vec is not None:
+                    _query_cache.move_to_end((*owner, q))
+                    found[q] = vec
+    for q in queries:
+        record_cache("query_embedding", hit=q in found)
+    missing = list(dict.fromkeys(q for q in queries if q not in found))
+    if missing:
+        vectors = np.array(embedder.encode(missing)).astype("float32").reshape(len(missing), -1)
+        found.update(zip(missing, vectors))
+        if QUERY_EMBED_CACHE_SIZE > 0:
+            with _query_cache_lock:
+                for q, vec in zip(missing, vectors):
+                    _query_cache[(*owner, q)] = vec
+                while len(_query_cache) > QUERY_EMBED_CACHE_SIZE:
+                    _query_cache.popitem(last=False)
+    return np.stack([found[q] for q in queries])
+
+
+def _stamp(folder: str) -> Tuple[str, tuple]:
+    data_dir, tag = _current_dir(folder)
+    st = os.stat(os.path.join(data_dir, INDEX_FILE))
+    return data_dir, (tag, st.st_mtime_ns, st.st_size)
+
+
+def _cache_name(folder: str) -> str:
+    return f"index:{folder}"
+
+
+def invalidate_cached_index(folder: str):
+    with _index_cache_lock:
+        _index_cache.pop(folder, None)
+    governor.forget(_cache_name(folder))
+
+
+def _load_entry(folder: str) -> _Loaded:
+    try:
+        return _load_entry_once(folder)
+    except FileNotFoundError:
+        # the version we resolved was pruned by a concurrent writer: resolve again
+        return _load_entry_once(folder)
+
+
+def _load_entry_once(folder: str) -> _Loaded:
+    data_dir, stamp = _stamp(folder)
+    if os.path.normpath(os.path.dirname(folder)) == INDEX_DIR:
+        artifacts.touch(os.path.basename(folder))
+
+    with _index_cache_lock:
+        entry = _index_cache.get(folder)
+        if entry is not None and entry.stamp == stamp:
+            _index_cache.move_to_end(folder)
+    if entry is not None and entry.stamp == stamp:
+        record_cache("faiss_index", hit=True)
+        governor.touch(_cache_name(folder))
+        return entry
+
+    record_cache("faiss_index", hit=False)
+    meta_file = os.path.join(data_dir, META_FILE)
+    with track_stage("index_load"):
+        index = faiss.read_index(os.path.join(data_dir, INDEX_FILE))
+        meta = _read_meta(meta_file)
+    entry = _Loaded(stamp, index, meta)
+
+    nbytes = index.ntotal * index.d * 4 + os.path.getsize(meta_file) * 2
+    governor.make_room(nbytes, reason="index_cache")
+
+    evicted = []
+    with _index_cache_lock:
+        _index_cache[folder] = entry
+        _index_cache.move_to_end(folder)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            evicted.append(_index_cache.popitem(last=False)[0])
+    for old in evicted:
+        governor.forget(_cache_name(old))
+    # unload callback must not take _index_cache_lock (governor may call it while we hold ours)
+    governor.track(_cache_name(folder), nbytes, kind="cache", unload=lambda: _index_cache.pop(folder, None))
+    return entry
+
+
+def _load_cached(folder: str):
+    """Return (index, metadatas) for an index folder, reading from disk only on a miss."""
+    entry = _load_entry(folder)
+    return entry.index, entry.metadatas
+
+
+def load_cached_index(video_id: str, index_dir: str = INDEX_DIR):
+    """(index, metadatas) for a document without constructing a manager (no embedder load)."""
+    return _load_cached(os.path.join(index_dir, video_id))
+
+
+def load_chunk_vectors(video_id: str, index_dir: str = INDEX_DIR) -> Tuple[List[Dict], np.ndarray]:
+    """(metadatas, vectors) with row i holding the stored embedding of metadatas[i]; no embedder call."""
+    entry = _load_entry(os.path.join(index_dir, video_id))
+    return entry.metadatas, _stored_vectors(entry.index, entry.metadatas)
+
+
+def _stored_vectors(index, chunks: List[Dict]) -> np.ndarray:
+    """Embeddings held by `index`, row i belonging to chunks[i]."""
+    if not index.ntotal:
+        return np.zeros((0, index.d), dtype="float32")
+    if isinstance(index, faiss.IndexIDMap2):
+        inner = faiss.downcast_index(index.index)
+        stored = inner.reconstruct_n(0, index.ntotal)
+        position = {int(cid): row for row, cid in enumerate(faiss.vector_to_array(index.id_map))}
+        rows = [position[m["chunk_id"]] for m in chunks]
+        return stored[rows]
+    # legacy flat index: ids are insertion positions
+    return index.reconstruct_n(0, index.ntotal)[[m["chunk_id"] for m in chunks]]
+
+
+def load_coverage(video_id: str, index_dir: str = INDEX_DIR) -> Optional[Dict]:
+    """Coverage record of a progressively built index (None for one-shot builds)."""
+    return _load_entry(os.path.join(index_dir, video_id)).meta.get("coverage")
+
+
+# ======================================================
+# 🔒 Writer side: per-document lock + atomic version swap
+# ======================================================
+_writer_locks: Dict[str, threading.Lock] = {}
+_writer_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _write_lock(folder: str):
+    """Serialise writers of one document (threads here, processes via flock where available)."""
+    with _writer_locks_guard:
+        lock = _writer_locks.setdefault(folder, threading.Lock())
+    with lock:
+        os.makedirs(folder, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(folder, ".lock"), "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _version_dirs(folder: str) -> List[str]:
+    return sorted(d for d in os.listdir(folder) if d.startswith("v") and d[1:].isdigit())
+
+
+def _commit_version(folder: str, index, meta: Dict) -> str:
+    """Write index + meta as the next version and make it live. Caller holds the write lock."""
+    versions = _version_dirs(folder)
+    number = int(versions[-1][1:]) + 1 if versions else 1
+    tag = f"v{number:06d}"
+    meta["version"] = number
+
+    tmp_dir = os.path.join(folder, f".tmp-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp_dir)
+    try:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+        with open(os.path.join(tmp_dir, META_FILE), "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_dir, os.path.join(folder, tag))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(folder, f"{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(tag)
+    os.replace(pointer_tmp, os.path.join(folder, CURRENT_FILE))
+
+    # legacy flat files and versions beyond the keep window are no longer reachable
+    for name in (INDEX_FILE, META_FILE):
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            os.remove(path)
+    for old in _version_dirs(folder)[:-max(1, INDEX_KEEP_VERSIONS)]:
+        shutil.rmtree(os.path.join(folder, old), ignore_errors=True)
+    return tag
+
+
+def _to_id_map(index, ids: Sequence[int]):
+    """Wrap a legacy positional index so chunks can be addressed by id."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return index
+    vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), dtype="float32")
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatL2(index.d))
+    if len(ids):
+        mapped.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    return mapped
+
 
 class FaissIndexManager:
-    def __init__(self, index_dir: str = "faiss_index"):
+    def __init__(self, index_dir: str = INDEX_DIR):
         self.index_dir = index_dir
         os.makedirs(self.index_dir, exist_ok=True)
 
-        # ✅ Local embedding model
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # ✅ Local embedding model (shared, loaded once per process)
+        self.embedder = model_registry.get_embedder()
         self.index = None
         self.current_video_id = None
 
@@ -21,68 +356,267 @@ class FaissIndexManager:
         return os.path.join(self.index_dir, video_id)
 
     def _get_latest_video_id(self) -> Optional[str]:
+        if os.path.normpath(self.index_dir) == INDEX_DIR:
+            latest = artifacts.latest_indexed()
+            if latest:
+                return latest
         subfolders = [os.path.join(self.index_dir, d) for d in os.listdir(self.index_dir) if os.path.isdir(os.path.join(self.index_dir, d))]
         if not subfolders:
             return None
         latest_folder = max(subfolders, key=os.path.getmtime)
         return os.path.basename(latest_folder)
 
-    def build_index(self, video_id: str, chunks: List[str], metadatas: List[Dict]):
-        video_index_path = self._get_video_index_path(video_id)
-        os.makedirs(video_index_path, exist_ok=True)
+    def _embed(self, chunks: List[str], parallel: Optional[bool] = None) -> np.ndarray:
+        """
+        parallel=None picks the worker pool for builds of EMBED_PARALLEL_MIN_CHUNKS
+        or more (when EMBED_WORKERS > 1); True/False force it on/off.
+        """
+        if parallel is None:
+            parallel = len(chunks) >= parallel_embed.EMBED_PARALLEL_MIN_CHUNKS
+        encoder = parallel_embed.get_encoder() if parallel else None
+
+        with governor.admit("embed"), track_stage("embedding") as stage:
+            vectors = None
+            if encoder is not None:
+                try:
+                    vectors = encoder.encode(chunks)
+                except RuntimeError as e:  # BrokenProcessPool, or the pool was evicted and shut down under us
+                    logger.warning("embed_pool_failed", extra={"error": str(e), "chunks": len(chunks)})
+            if vectors is None:
+                with model_registry.use("embedder") as embedder:
+                    vectors = np.array(embedder.encode(chunks, show_progress_bar=False)).astype("float32")
+            stage.items = len(chunks)
+        return vectors
 
-        print(f"🧠 Building FAISS index for {video_id} ...")
+    def _embed_unique(self, deduper: Optional[dedup.Deduper], chunks: List[str], metadatas: List[Dict],
+                      parallel: Optional[bool] = None, vectors: Optional[np.ndarray] = None):
+        """
+        (records, vectors) for the chunks that are not duplicates of ones `deduper`
+        already holds; exact copies are dropped before embedding. `vectors`, when
+        given, are the embeddings of all `chunks`. Records carry no chunk_id yet.
+        """
+        if deduper is None:
+            records = [dict(m) for m in metadatas]
+            return records, vectors if vectors is not None else self._embed(chunks, parallel=parallel)
+        with track_stage("dedup"):
+            keep, records = deduper.exact(chunks, metadatas)
+        if not keep:
+            return [], None
+        texts = [chunks[i] for i in keep]
+        vectors = vectors[keep] if vectors is not None else self._embed(texts, parallel=parallel)
+        with track_stage("dedup") as stage:
+            keep = deduper.near(texts, records, vectors)
+            stage.items = len(chunks)
+        return [records[i] for i in keep], vectors[keep]
 
-        vectors = np.array(self.embedder.encode(chunks, show_progress_bar=True)).astype("float32")
+    def _read_for_update(self, folder: str):
+        """Fresh (index, meta) from disk for a writer; never mutate the cached copy readers use."""
+        data_dir, _ = _current_dir(folder)
+        if not os.path.exists(os.path.join(data_dir, META_FILE)):
+            return None, None
+        index = faiss.read_index(os.path.join(data_dir, INDEX_FILE))
+        meta = _read_meta(os.path.join(data_dir, META_FILE))
+        return _to_id_map(index, [m["chunk_id"] for m in meta["chunks"]]), meta
 
-        d = vectors.shape[1]
-        index = faiss.IndexFlatL2(d)
-        index.add(vectors)
+    def _save(self, folder: str, index, meta: Dict, stage) -> str:
+        tag = _commit_version(folder, index, meta)
+        stage.items = index.ntotal
+        invalidate_cached_index(folder)
+        return tag
 
-        index_path = os.path.join(video_index_path, "index.faiss")
-        meta_path = os.path.join(video_index_path, "meta.pkl")
+    def build_index(self, video_id: str, chunks: List[str], metadatas: List[Dict], parallel: Optional[bool] = None,
+                    extra_meta: Optional[Dict] = None, vectors: Optional[np.ndarray] = None):
+        """
+        Embed all chunks and publish them as a new version of the document's index.
+        `extra_meta` is stored alongside the chunks (e.g. {"coverage": ...});
+        `vectors` skips the embedding step (bulk ingestion encodes several documents at once).
+        """
+        video_index_path = self._get_video_index_path(video_id)
+        logger.info("index_build_started", extra={"video_id": video_id, "chunks": len(chunks)})
+
+        deduper = dedup.Deduper() if dedup.DEDUP_ENABLED else None
+        records, vectors = self._embed_unique(deduper, chunks, metadatas, parallel=parallel, vectors=vectors)
+        ids = np.arange(len(records), dtype="int64")
+        for i, record in zip(ids, records):
+            record["chunk_id"] = int(i)
+        if deduper is not None and len(records) < len(chunks):
+            logger.info("index_dedup", extra={"video_id": video_id, "chunks": len(chunks), **deduper.dropped})
 
-        faiss.write_index(index, index_path)
-        with open(meta_path, "wb") as f:
-            pickle.dump(metadatas, f)
+        with _write_lock(video_index_path), track_stage("index_build") as stage:
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+            index.add_with_ids(vectors, ids)
+            meta = {"format": META_FORMAT, "version": 0, "next_id": len(records), "chunks": records, **(extra_meta or {})}
+            tag = self._save(video_index_path, index, meta, stage)
 
-        print(f"✅ Index saved to {index_path}")
+        logger.info("index_saved", extra={"video_id": video_id, "path": video_index_path, "version": tag, "vectors": index.ntotal})
         return video_index_path
 
-    def load_index(self, video_id: Optional[str] = None):
+    def build_index_streaming(self, video_id: str, metadatas: Iterable[Dict], batch_size: int = EMBED_STREAM_BATCH) -> int:
+        """
+        build_index for a lazy stream of chunk metadatas (each carrying "chunk_text"):
+        chunks are embedded and added `batch_size` at a time, so only the index and
+        its metadata grow with the document. Returns the number of chunks (0 = nothing written).
+        """
+        video_index_path = self._get_video_index_path(video_id)
+        index, records, batch = None, [], []
+        deduper = dedup.Deduper() if dedup.DEDUP_ENABLED else None
+
+        def add(batch):
+            nonlocal index
+            kept, vectors = self._embed_unique(deduper, [m["chunk_text"] for m in batch], batch)
+            if not kept:
+                return
+            if index is None:
+                index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+            ids = np.arange(len(records), len(records) + len(kept), dtype="int64")
+            index.add_with_ids(vectors, ids)
+            for i, record in zip(ids, kept):
+                record["chunk_id"] = int(i)
+            records.extend(kept)
+
+        for m in metadatas:
+            batch.append(m)
+            if len(batch) >= batch_size:
+                add(batch)
+                batch = []
+        if batch:
+            add(batch)
+        if index is None:
+            return 0
+
+        if deduper is not None and any(deduper.dropped.values()):
+            logger.info("index_dedup", extra={"video_id": video_id, "kept": len(records), **deduper.dropped})
+        with _write_lock(video_index_path), track_stage("index_build") as stage:
+            meta = {"format": META_FORMAT, "version": 0, "next_id": len(records), "chunks": records}
+            tag = self._save(video_index_path, index, meta, stage)
+        logger.info("index_saved", extra={"video_id": video_id, "path": video_index_path, "version": tag, "vectors": index.ntotal})
+        return len(records)
+
+    def append_chunks(self, video_id: str, chunks: List[str], metadatas: List[Dict], parallel: Optional[bool] = None,
+                      extra_meta: Optional[Dict] = None) -> List[int]:
+        """
+        Embed only the new chunks and add them to the document's index. Returns the
+        chunk ids of those added (duplicates of stored chunks fold into them instead).
+        """
+        video_index_path = self._get_video_index_path(video_id)
+        if not chunks and not extra_meta:
+            return []
+        vectors = self._embed(chunks, parallel=parallel) if chunks else None
+
+        with _write_lock(video_index_path), track_stage("index_update") as stage:
+            index, meta = self._read_for_update(video_index_path)
+            if index is None:
+                if vectors is not None:
+                    dim = vectors.shape[1]
+                else:
+                    with model_registry.use("embedder") as embedder:
+                        dim = embedder.get_sentence_embedding_dimension()
+                index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+                meta = {"format": META_FORMAT, "version": 0, "next_id": 0, "chunks": []}
+            records = [dict(m) for m in metadatas]
+            if chunks and dedup.DEDUP_ENABLED:
+                # compared with the fresh copy under the lock; duplicates fold into stored chunks
+                deduper = dedup.Deduper(meta["chunks"], _stored_vectors(index, meta["chunks"]))
+                records, vectors = self._embed_unique(deduper, chunks, metadatas, vectors=vectors)
+            first = meta["next_id"]
+            ids = np.arange(first, first + len(records), dtype="int64")
+            if records:
+                index.add_with_ids(vectors, ids)
+            for i, record in zip(ids, records):
+                record["chunk_id"] = int(i)
+            meta["chunks"].extend(records)
+            meta["next_id"] = first + len(records)
+            meta.update(extra_meta or {})
+            tag = self._save(video_index_path, index, meta, stage)
+
+        logger.info("index_appended", extra={"video_id": video_id, "added": len(records), "version": tag, "vectors": index.ntotal})
+        return [int(i) for i in ids]
+
+    def delete_chunks(self, video_id: str, chunk_ids: Sequence[int]) -> int:
+        """Remove chunks by id. Returns how many were removed."""
+        video_index_path = self._get_video_index_path(video_id)
+        with _write_lock(video_index_path), track_stage("index_update") as stage:
+            index, meta = self._read_for_update(video_index_path)
+            if index is None:
+                raise FileNotFoundError(f"No FAISS index found for {video_id}.")
+            wanted = {int(i) for i in chunk_ids}
+            removed = index.remove_ids(np.asarray(sorted(wanted), dtype="int64"))
+            meta["chunks"] = [m for m in meta["chunks"] if m["chunk_id"] not in wanted]
+            tag = self._save(video_index_path, index, meta, stage)
+
+        logger.info("index_chunks_deleted", extra={"video_id": video_id, "removed": int(removed), "version": tag})
+        return int(removed)
+
+    def replace_chunks(self, video_id: str, chunk_ids: Sequence[int], chunks: List[str], metadatas: List[Dict]) -> int:
+        """Re-embed the given chunk ids in place (ids and ordering are kept)."""
+        video_index_path = self._get_video_index_path(video_id)
+        vectors = self._embed(chunks)
+        ids = np.asarray([int(i) for i in chunk_ids], dtype="int64")
+
+        with _write_lock(video_index_path), track_stage("index_update") as stage:
+            index, meta = self._read_for_update(video_index_path)
+            if index is None:
+                raise FileNotFoundError(f"No FAISS index found for {video_id}.")
+            positions = {m["chunk_id"]: pos for pos, m in enumerate(meta["chunks"])}
+            missing = [int(i) for i in ids if int(i) not in positions]
+            if missing:
+                raise KeyError(f"Unknown chunk ids for {video_id}: {missing}")
+            index.remove_ids(ids)
+            index.add_with_ids(vectors, ids)
+            for cid, m in zip(ids, metadatas):
+                meta["chunks"][positions[int(cid)]] = {**m, "chunk_id": int(cid)}
+            tag = self._save(video_index_path, index, meta, stage)
+
+        logger.info("index_chunks_replaced", extra={"video_id": video_id, "replaced": len(ids), "version": tag})
+        return len(ids)
+
+    def _load(self, video_id: Optional[str]) -> _Loaded:
         if video_id is None:
             video_id = self._get_latest_video_id()
             if not video_id:
                 raise FileNotFoundError("No FAISS index found.")
+        entry = _load_entry(self._get_video_index_path(video_id))
+        self.index = entry.index
+        self.current_video_id = video_id
+        return entry
 
-        video_index_path = self._get_video_index_path(video_id)
-        index_file = os.path.join(video_index_path, "index.faiss")
+    def load_index(self, video_id: Optional[str] = None):
+        return self._load(video_id).index
 
-        self.index = faiss.read_index(index_file)
-        self.current_video_id = video_id
-        print(f"✅ Loaded FAISS index for {video_id}")
-        return self.index
+    def load_metadata(self, video_id: str) -> List[Dict]:
+        return self._load(video_id).metadatas
 
-    def search(self, video_id: Optional[str], query: str, top_k: int = 5):
-        if video_id is None:
-            video_id = self._get_latest_video_id()
+    def coverage(self, video_id: Optional[str]) -> Optional[Dict]:
+        """How much of the source is indexed, for documents built progressively (None otherwise)."""
+        return self._load(video_id).meta.get("coverage")
 
-        if self.index is None or self.current_video_id != video_id:
-            self.load_index(video_id)
+    def embed_queries(self, queries: Sequence[str]) -> int:
+        """Put query vectors in the cache ahead of time; returns how many had to be encoded."""
+        with model_registry.use("embedder") as embedder:
+            owner = _query_owner()
+            with _query_cache_lock:
+                missing = [q for q in dict.fromkeys(queries) if (*owner, q) not in _query_cache]
+            if missing:
+                _cached_query_vectors(embedder, missing)
+        return len(missing)
 
-        meta_path = os.path.join(self._get_video_index_path(video_id), "meta.pkl")
-        with open(meta_path, "rb") as f:
-            metadatas = pickle.load(f)
+    def search(self, video_id: Optional[str], query: str, top_k: int = 5):
+        entry = self._load(video_id)
+        video_id = self.current_video_id
 
-        query_vec = np.array(self.embedder.encode([query])).astype("float32")
-        distances, indices = self.index.search(query_vec, top_k)
+        with track_stage("search") as stage:
+            with model_registry.use("embedder") as embedder:
+                query_vec = _cached_query_vectors(embedder, [query])
+            distances, indices = entry.index.search(query_vec, top_k)
 
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(metadatas):
-                m = dict(metadatas[idx])
-                m["distance"] = float(dist)
-                results.append(m)
+            results = []
+            for dist, idx in zip(distances[0], indices[0]):
+                m = entry.by_id.get(int(idx))
+                if m is not None:
+                    m = dict(m)
+                    m["distance"] = float(dist)
+                    results.append(m)
+            stage.items = 1
 
-        print(f"🔍 Found {len(results)} chunks for query '{query}'")
+        logger.info("search_done", extra={"video_id": video_id, "results": len(results), "top_k": top_k})
         return results
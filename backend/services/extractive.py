@@ -0,0 +1,135 @@
+# services/extractive.py
+"""
+Extractive pre-selection for summaries.
+
+Works only on what the index already stores: the chunk texts and their
+embeddings (no model call). Chunks are clustered with k-means on their
+normalised vectors plus a weighted position coordinate, so clusters tend
+to be contiguous sections of the video. From the chunks closest to each
+centroid the sentences that best cover the section's vocabulary are kept,
+up to a character budget shared by all sections. The abstractive model
+then only sees that condensed text, and the sections double as the
+summary outline.
+"""
+import os
+import re
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from services.metrics import track_stage
+
+SUMMARY_SECTIONS = int(os.environ.get("SUMMARY_SECTIONS", "6"))
+# Characters handed to the abstractive model (~1 BART call per 2500)
+SUMMARY_INPUT_CHARS = int(os.environ.get("SUMMARY_INPUT_CHARS", "5000"))
+# Weight of the position coordinate: 0 = pure topic clusters, higher = contiguous sections
+SUMMARY_TIME_WEIGHT = float(os.environ.get("SUMMARY_TIME_WEIGHT", "0.5"))
+# Central chunks per section whose sentences are candidates
+CANDIDATE_CHUNKS = 3
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z']{2,}")
+_STOPWORDS = frozenset("""
+    the and for that this with you are was were have has had not but they them their there what which when
+    who how why will would can could should about into from just like your our out all one also then than
+    its it's i'm we're you're don't can't been being more some any very really so get got going know think
+    because these those here where over only even well much many make made way thing things yeah okay right
+""".split())
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in (m.group(0).lower() for m in _WORD_RE.finditer(text)) if w not in _STOPWORDS]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text.replace("\n", " ")) if len(s.strip()) > 1]
+
+
+def kmeans(points: np.ndarray, k: int, iters: int = 20) -> np.ndarray:
+    """Deterministic k-means (farthest-point init); returns one label per row."""
+    n = len(points)
+    if k >= n:
+        return np.arange(n)
+    centroids = [points[0]]
+    dist = ((points - points[0]) ** 2).sum(1)
+    for _ in range(1, k):
+        centroids.append(points[int(dist.argmax())])
+        dist = np.minimum(dist, ((points - centroids[-1]) ** 2).sum(1))
+    centroids = np.stack(centroids)
+
+    labels = np.full(n, -1)
+    for _ in range(iters):
+        d = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(-1)
+        new = d.argmin(1)
+        if (new == labels).all():
+            break
+        labels = new
+        for c in range(k):
+            members = points[labels == c]
+            if len(members):
+                centroids[c] = members.mean(0)
+    return labels
+
+
+def select_sections(metadatas: List[Dict], vectors: np.ndarray, max_sections: int = SUMMARY_SECTIONS,
+                    budget_chars: int = SUMMARY_INPUT_CHARS, time_weight: float = SUMMARY_TIME_WEIGHT) -> List[Dict]:
+    """
+    Sections in source order: {"start", "end", "chunks", "keywords", "sentences"}.
+    `vectors[i]` must be the stored embedding of `metadatas[i]`.
+    """
+    n = len(metadatas)
+    if n == 0:
+        return []
+    with track_stage("extractive_selection") as stage:
+        order = np.argsort([m.get("start", 0) for m in metadatas], kind="stable")
+        metadatas = [metadatas[i] for i in order]
+        vecs = np.asarray(vectors, dtype="float32")[order]
+        vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        position = (np.arange(n, dtype="float32") / max(1, n - 1))[:, None]
+
+        k = max(1, min(max_sections, int(round(np.sqrt(n))), n))
+        labels = kmeans(np.hstack([vecs, position * time_weight]), k)
+
+        clusters = [np.flatnonzero(labels == c) for c in range(labels.max() + 1)]
+        clusters = sorted((c for c in clusters if len(c)), key=lambda c: c.min())
+        # inverse "section frequency" so keywords describe what sets a section apart
+        vocab = [Counter(w for i in members for w in _words(metadatas[i].get("chunk_text", ""))) for members in clusters]
+        spread = Counter(w for counts in vocab for w in counts)
+        per_section = max(200, budget_chars // len(clusters))
+
+        sections = []
+        for members, counts in zip(clusters, vocab):
+            weights = {w: c * np.log(1 + len(clusters) / spread[w]) for w, c in counts.items()}
+            centroid = vecs[members].mean(0)
+            central = members[np.argsort(-(vecs[members] @ centroid))][:CANDIDATE_CHUNKS]
+
+            candidates = []  # (score, chunk position, sentence index, sentence)
+            for rank, i in enumerate(central):
+                for j, sentence in enumerate(split_sentences(metadatas[i].get("chunk_text", ""))):
+                    words = _words(sentence)
+                    if len(words) < 3:
+                        continue
+                    score = sum(weights.get(w, 0.0) for w in set(words)) / np.sqrt(len(words)) / (1 + 0.25 * rank)
+                    candidates.append((score, int(i), j, sentence))
+
+            picked, seen, used = [], set(), 0
+            for score, i, j, sentence in sorted(candidates, key=lambda c: -c[0]):
+                key = sentence.lower()
+                if key in seen:  # chunk overlap repeats sentences
+                    continue
+                if picked and used + len(sentence) > per_section:
+                    continue
+                seen.add(key)
+                picked.append((i, j, sentence))
+                used += len(sentence) + 1
+
+            sections.append({
+                "start": float(min(metadatas[i].get("start", 0) for i in members)),
+                "end": float(max(metadatas[i].get("end", 0) for i in members)),
+                "chunks": len(members),
+                "keywords": [w for w, _ in sorted(weights.items(), key=lambda kv: (-kv[1], kv[0]))[:3]],
+                "sentences": [s for _, _, s in sorted(picked)],
+            })
+        stage.items = n
+    return sections
@@ -1,7 +1,15 @@
 # services/file_reader.py
+import csv
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Tuple
 import pdfplumber
 import docx
-import csv
+
+# Rows handed to the chunker at a time by iter_csv_batches
+CSV_BATCH_ROWS = int(os.environ.get("CSV_BATCH_ROWS", "1000"))
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
 
 def extract_text_from_pdf(path: str) -> str:
     text = ""
@@ -25,3 +33,88 @@ def extract_text_from_csv(path: str) -> str:
         for row in reader:
             rows.append(" ".join(row))
     return "\n".join(rows)
+
+# ======================================================
+# 🌊 Streaming readers (constant memory in the file size)
+# ======================================================
+def iter_csv_batches(path: str, batch_rows: int = CSV_BATCH_ROWS) -> Iterator[Tuple[List[str], List[Tuple[int, List[str]]]]]:
+    """
+    (columns, [(line_no, row), ...]) batches of at most `batch_rows` non-empty rows.
+    Without a detectable header, columns are named column_1, column_2, ...
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            sniffer = csv.Sniffer()
+            dialect = sniffer.sniff(sample)
+            has_header = sniffer.has_header(sample)
+        except csv.Error:
+            dialect, has_header = csv.excel, True
+        reader = csv.reader(f, dialect)
+
+        columns = None
+        if has_header:
+            columns = [c.strip() or f"column_{i + 1}" for i, c in enumerate(next(reader, []))]
+        batch = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if columns is None:
+                columns = [f"column_{i + 1}" for i in range(len(row))]
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_rows:
+                yield columns, batch
+                batch = []
+        if batch:
+            yield columns, batch
+
+
+def _heading_level(style_id: str) -> int:
+    """1-9 for Heading1..Heading9, 0 for Title, -1 for body text."""
+    style_id = (style_id or "").lower()
+    if style_id == "title":
+        return 0
+    if style_id.startswith("heading") and style_id[7:].isdigit():
+        return int(style_id[7:])
+    return -1
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    (paragraph_no, heading_level, text) for every non-empty paragraph, tables
+    included; heading_level is -1 for body text. Parses word/document.xml
+    incrementally instead of loading the whole document tree.
+    """
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+        depth, body, n = 0, None, 0
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag == W_NS + "body":
+                    body = elem
+                continue
+            depth -= 1
+            if elem.tag == W_NS + "p":
+                text = "".join(t.text or "" for t in elem.iter(W_NS + "t")).strip()
+                if text:
+                    style = elem.find(f"{W_NS}pPr/{W_NS}pStyle")
+                    level = _heading_level(style.get(W_NS + "val") if style is not None else "")
+                    yield n, level, text
+                    n += 1
+            if depth == 2 and body is not None:
+                body.clear()  # finished a top-level block: drop it
+
+EXTRACTORS = {
+    "pdf": extract_text_from_pdf,
+    "docx": extract_text_from_docx,
+    "txt": extract_text_from_txt,
+    "csv": extract_text_from_csv,
+}
+
+def extract_text(path: str) -> str:
+    """Text of a supported document, picked by file extension."""
+    ext = path.rsplit(".", 1)[-1].lower()
+    if ext not in EXTRACTORS:
+        raise ValueError(f"Unsupported file type: .{ext}")
+    return EXTRACTORS[ext](path)
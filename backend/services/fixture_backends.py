@@ -0,0 +1,162 @@
+# services/fixture_backends.py
+"""
+Local stand-ins for yt-dlp downloads and Whisper transcription, used for
+load testing without YouTube or real models.
+
+    DOWNLOAD_BACKEND=fixture   -> download_audio serves local fixture audio
+    WHISPER_BACKEND=fixture    -> the Whisper loader returns FixtureWhisper
+
+Configuration (all optional):
+    FIXTURE_AUDIO              WAV file to serve (default: generated silence)
+    FIXTURE_TRANSCRIPTS        dir of <video_id>/transcript.{tsz,json} (default: api/transcripts)
+    FIXTURE_DOWNLOAD_MS        simulated download latency in ms (default 200)
+    FIXTURE_TRANSCRIBE_MS      simulated transcription latency in ms (default 500)
+"""
+import glob
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import wave
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from services.transcript_store import read_transcript, transcript_path
+
+FIXTURE_AUDIO = os.environ.get("FIXTURE_AUDIO")
+FIXTURE_TRANSCRIPTS = os.environ.get("FIXTURE_TRANSCRIPTS", os.path.join("api", "transcripts"))
+FIXTURE_DOWNLOAD_MS = float(os.environ.get("FIXTURE_DOWNLOAD_MS", "200"))
+FIXTURE_TRANSCRIBE_MS = float(os.environ.get("FIXTURE_TRANSCRIBE_MS", "500"))
+FIXTURE_DURATION_S = 60
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{6,20}$")
+# decoded arrays carry no file name: remember which video this thread fetched last,
+# how long its audio is and how much of it has been transcribed (windowed callers)
+_last_download = threading.local()
+
+
+def video_id_from_url(url: str) -> str:
+    parsed = urlparse(url)
+    vid = parse_qs(parsed.query).get("v", [None])[0]
+    if not vid:
+        vid = parsed.path.rstrip("/").split("/")[-1] or "fixture"
+    return vid if _ID_RE.match(vid) else "fixture"
+
+
+def _write_silence(path: str, seconds: int = FIXTURE_DURATION_S, rate: int = 16000):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack("<h", 0) * rate * seconds)
+
+
+def _transcript_for(video_id: str) -> Optional[Dict]:
+    path = transcript_path(os.path.join(FIXTURE_TRANSCRIPTS, video_id))
+    if path is None:
+        candidates = sorted(filter(None, (
+            transcript_path(d) for d in glob.glob(os.path.join(FIXTURE_TRANSCRIPTS, "*"))
+        )))
+        if not candidates:
+            return None
+        # stable pick so the same id always gets the same transcript
+        path = candidates[sum(map(ord, video_id)) % len(candidates)]
+    return read_transcript(path)
+
+
+def _window_of(transcript: Dict, f0: float, f1: float, window_s: float) -> Dict:
+    """Segments in the [f0, f1) fraction of the transcript, rescaled to a window of window_s seconds."""
+    segments = transcript.get("segments", [])
+    total = segments[-1]["end"] if segments else 0.0
+    lo, hi = f0 * total, f1 * total
+    scale = window_s / (hi - lo) if hi > lo else 1.0
+    picked = [
+        {**s, "start": (s["start"] - lo) * scale, "end": (min(s["end"], hi) - lo) * scale}
+        for s in segments if lo <= s["start"] < hi or (f1 >= 1.0 and s["start"] >= lo)
+    ]
+    return {"text": "".join(s["text"] for s in picked), "segments": picked, "language": transcript.get("language")}
+
+
+def _synthetic_transcript(video_id: str) -> Dict:
+    segments = [
+        {"id": i, "start": i * 5.0, "end": i * 5.0 + 5.0, "text": f" Fixture sentence {i} for video {video_id}."}
+        for i in range(FIXTURE_DURATION_S // 5)
+    ]
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+
+
+# ======================================================
+# 🎬 Download backend
+# ======================================================
+def fixture_download(youtube_url: str, out_dir: str = "tmp", convert: bool = True) -> Tuple[str, Dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    video_id = video_id_from_url(youtube_url)
+    _last_download.video_id = video_id
+    time.sleep(FIXTURE_DOWNLOAD_MS / 1000)
+
+    wav_path = os.path.join(out_dir, f"{video_id}.wav")
+    if FIXTURE_AUDIO:
+        shutil.copyfile(FIXTURE_AUDIO, wav_path)
+    elif not os.path.exists(wav_path):
+        _write_silence(wav_path)
+    with wave.open(wav_path, "rb") as w:
+        _last_download.seconds = w.getnframes() / w.getframerate()
+    _last_download.cursor = 0.0
+
+    transcript = _transcript_for(video_id)
+    duration = transcript["segments"][-1]["end"] if transcript and transcript.get("segments") else FIXTURE_DURATION_S
+    return wav_path, {"title": f"Fixture video {video_id}", "duration": duration, "id": video_id}
+
+
+# ======================================================
+# 🎧 Whisper backend
+# ======================================================
+class FixtureWhisper:
+    """
+    Returns canned transcripts keyed by the audio file name (or the last
+    fixture download), after a fixed delay. Arrays shorter than the
+    downloaded audio are treated as consecutive windows and get the
+    matching slice of the transcript.
+    """
+
+    def __init__(self, size: str = "tiny", latency_ms: float = FIXTURE_TRANSCRIBE_MS):
+        self.size = size
+        self.latency_ms = latency_ms
+
+    def transcribe(self, audio, **kwargs) -> Dict:
+        time.sleep(self.latency_ms / 1000)
+        if isinstance(audio, str):
+            video_id = os.path.splitext(os.path.basename(audio))[0]
+            return _transcript_for(video_id) or _synthetic_transcript(video_id)
+
+        # arrays decoded in another process (bulk ingestion) are memmaps named <video_id>.f32
+        spilled = getattr(audio, "filename", None)
+        video_id = getattr(_last_download, "video_id", None) or (
+            os.path.splitext(os.path.basename(spilled))[0] if spilled else "fixture"
+        )
+        transcript = _transcript_for(video_id) or _synthetic_transcript(video_id)
+        total = getattr(_last_download, "seconds", 0.0)
+        cursor = getattr(_last_download, "cursor", 0.0)
+        window_s = len(audio) / 16000
+        _last_download.cursor = cursor + window_s
+        if not total or (cursor == 0 and window_s >= total - 0.01):
+            return transcript
+        return _window_of(transcript, cursor / total, min(1.0, (cursor + window_s) / total), window_s)
+
+    def parameters(self):
+        return iter(())
+
+    def buffers(self):
+        return iter(())
+
+
+def install_download_backend():
+    from services import audio_download
+    audio_download.register_backend("fixture", fixture_download)
+
+
+def install_whisper_backend():
+    from services import model_registry
+    model_registry.override("whisper", FixtureWhisper)
@@ -0,0 +1,249 @@
+# services/memory_governor.py
+"""
+Runtime memory governor.
+
+Tracks the resident size of every loaded model and cached index, admits
+heavy requests against a RAM budget (queueing them while there is no
+headroom), evicts least-recently-used models/caches under pressure and
+picks smaller model variants when the preferred one does not fit.
+Decisions are kept in a ring buffer and exposed on /system/memory.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+MB = 1024 ** 2
+
+# Budget for everything the governor tracks (models + caches + in-flight requests).
+MEMORY_BUDGET_MB = int(os.environ.get("MEMORY_BUDGET_MB", "0")) or int(psutil.virtual_memory().total * 0.75 / MB)
+# Always leave at least this much RAM free on the host, whatever the budget says.
+MEMORY_RESERVE_MB = int(os.environ.get("MEMORY_RESERVE_MB", "512"))
+ADMISSION_TIMEOUT_S = float(os.environ.get("ADMISSION_TIMEOUT_S", "60"))
+
+# Working-set estimates for one in-flight request of each kind (bytes).
+REQUEST_ESTIMATES = {
+    "transcribe": int(os.environ.get("EST_TRANSCRIBE_MB", "768")) * MB,
+    "summarize": int(os.environ.get("EST_SUMMARIZE_MB", "384")) * MB,
+    "rag": int(os.environ.get("EST_RAG_MB", "192")) * MB,
+    "embed": int(os.environ.get("EST_EMBED_MB", "256")) * MB,
+}
+
+TRACKED_BYTES = REGISTRY.gauge("memory_governor_tracked_bytes", "Bytes held by tracked models and caches.", ("kind",))
+RESERVED_BYTES = REGISTRY.gauge("memory_governor_reserved_bytes", "Bytes reserved by admitted in-flight requests.")
+BUDGET_BYTES = REGISTRY.gauge("memory_governor_budget_bytes", "Configured memory budget.")
+WAITING = REGISTRY.gauge("memory_governor_waiting_requests", "Requests queued for memory admission.")
+EVICTIONS = REGISTRY.counter("memory_governor_evictions_total", "Models or caches unloaded under pressure.", ("kind",))
+DOWNGRADES = REGISTRY.counter("memory_governor_downgrades_total", "Smaller model variants chosen for lack of memory.", ("model",))
+
+
+class AdmissionTimeout(RuntimeError):
+    """Raised when a request could not be admitted within the timeout."""
+
+    def __init__(self, label: str, retry_after: int = 5):
+        super().__init__(f"Not enough memory to run '{label}' right now, retry later")
+        self.label = label
+        self.retry_after = retry_after
+
+
+class _Tracked:
+    __slots__ = ("name", "kind", "nbytes", "unload", "last_used", "pinned")
+
+    def __init__(self, name, kind, nbytes, unload):
+        self.name = name
+        self.kind = kind
+        self.nbytes = nbytes
+        self.unload = unload
+        self.last_used = time.monotonic()
+        self.pinned = 0
+
+
+class MemoryGovernor:
+    def __init__(self, budget_bytes: int, reserve_bytes: int = MEMORY_RESERVE_MB * MB):
+        self.budget = budget_bytes
+        self.reserve = reserve_bytes
+        self._items: "OrderedDict[str, _Tracked]" = OrderedDict()  # LRU order, oldest first
+        self._reserved = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.decisions = deque(maxlen=200)
+        BUDGET_BYTES.set(budget_bytes)
+
+    # --------------------------------------------------
+    # bookkeeping
+    # --------------------------------------------------
+    def _decide(self, action: str, **fields):
+        entry = {"ts": time.time(), "action": action, **fields}
+        self.decisions.append(entry)
+        logger.info(f"governor_{action}", extra=fields)
+
+    def _publish(self):
+        by_kind: Dict[str, int] = {}
+        for item in self._items.values():
+            by_kind[item.kind] = by_kind.get(item.kind, 0) + item.nbytes
+        for kind in ("model", "cache"):
+            TRACKED_BYTES.set(by_kind.get(kind, 0), kind=kind)
+        RESERVED_BYTES.set(self._reserved)
+        WAITING.set(self._waiting)
+
+    def tracked_bytes(self) -> int:
+        return sum(i.nbytes for i in self._items.values())
+
+    def headroom(self) -> int:
+        """Bytes that can still be committed: min of budget slack and real free RAM."""
+        budget_free = self.budget - self.tracked_bytes() - self._reserved
+        system_free = psutil.virtual_memory().available - self.reserve
+        return min(budget_free, system_free)
+
+    def track(self, name: str, nbytes: int, kind: str = "model", unload: Optional[Callable[[], None]] = None):
+        with self._cond:
+            self._items[name] = _Tracked(name, kind, int(nbytes), unload)
+            self._items.move_to_end(name)
+            self._publish()
+
+    def touch(self, name: str):
+        with self._cond:
+            item = self._items.get(name)
+            if item is not None:
+                item.last_used = time.monotonic()
+                self._items.move_to_end(name)
+
+    def forget(self, name: str):
+        with self._cond:
+            if self._items.pop(name, None) is not None:
+                self._publish()
+                self._cond.notify_all()
+
+    @contextmanager
+    def pin(self, name: str):
+        """Keep `name` from being evicted while it is in use."""
+        with self._cond:
+            item = self._items.get(name)
+            if item is not None:
+                item.pinned += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                item = self._items.get(name)
+                if item is not None:
+                    item.pinned -= 1
+                    item.last_used = time.monotonic()
+
+    # --------------------------------------------------
+    # eviction
+    # --------------------------------------------------
+    def _evict_until(self, needed: int, reason: str) -> bool:
+        """Unload LRU unpinned items until `needed` bytes fit. Caller holds the lock."""
+        for name in list(self._items):
+            if self.headroom() >= needed:
+                return True
+            item = self._items[name]
+            if item.pinned or item.unload is None:
+                continue
+            del self._items[name]
+            try:
+                item.unload()
+            except Exception as e:
+                logger.warning("governor_unload_failed", extra={"item": name, "error": str(e)})
+            EVICTIONS.inc(kind=item.kind)
+            self._decide("evict", item=name, kind=item.kind, bytes=item.nbytes, reason=reason)
+        self._publish()
+        return self.headroom() >= needed
+
+    def make_room(self, needed: int, reason: str) -> bool:
+        with self._cond:
+            return self._evict_until(needed, reason)
+
+    # --------------------------------------------------
+    # admission
+    # --------------------------------------------------
+    @contextmanager
+    def admit(self, label: str, estimate: Optional[int] = None, timeout: float = ADMISSION_TIMEOUT_S):
+        """
+        Reserve `estimate` bytes for the duration of a heavy request.
+        Waits (FIFO-ish via the condition variable) for headroom, evicting
+        cold models/caches first; raises AdmissionTimeout after `timeout`.
+        """
+        need = REQUEST_ESTIMATES.get(label, 0) if estimate is None else estimate
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            queued = False
+            while not self._evict_until(need, reason=f"admit:{label}"):
+                # never wait forever on an empty system: admit if nothing else is running
+                if self._reserved == 0:
+                    self._decide("admit_over_budget", request=label, bytes=need)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._decide("reject", request=label, bytes=need)
+                    raise AdmissionTimeout(label)
+                if not queued:
+                    queued = True
+                    self._waiting += 1
+                    self._publish()
+                    self._decide("queue", request=label, bytes=need)
+                self._cond.wait(min(remaining, 1.0))
+            if queued:
+                self._waiting -= 1
+            self._reserved += need
+            self._publish()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._reserved -= need
+                self._publish()
+                self._cond.notify_all()
+
+    # --------------------------------------------------
+    # model variants
+    # --------------------------------------------------
+    def choose_variant(self, role: str, variants: List[Tuple[str, int]]) -> str:
+        """
+        Pick the first (largest / preferred) variant whose estimated size fits,
+        evicting cold items if that makes it fit; fall back to the smallest.
+        """
+        with self._cond:
+            for i, (name, est) in enumerate(variants):
+                if self._evict_until(est, reason=f"load:{role}"):
+                    if i > 0:
+                        DOWNGRADES.inc(model=role)
+                        self._decide("downgrade", role=role, preferred=variants[0][0], chosen=name, estimate=est)
+                    return name
+            name = variants[-1][0]
+            DOWNGRADES.inc(model=role)
+            self._decide("downgrade", role=role, preferred=variants[0][0], chosen=name, estimate=variants[-1][1], note="nothing fits")
+            return name
+
+    def status(self) -> Dict:
+        with self._cond:
+            items = [
+                {"name": i.name, "kind": i.kind, "bytes": i.nbytes, "pinned": i.pinned,
+                 "idle_s": round(time.monotonic() - i.last_used, 1)}
+                for i in reversed(self._items.values())
+            ]
+            vm = psutil.virtual_memory()
+            return {
+                "budget_bytes": self.budget,
+                "tracked_bytes": self.tracked_bytes(),
+                "reserved_bytes": self._reserved,
+                "waiting_requests": self._waiting,
+                "headroom_bytes": self.headroom(),
+                "system_available_bytes": vm.available,
+                "process_rss_bytes": psutil.Process(os.getpid()).memory_info().rss,
+                "items": items,
+                "decisions": list(self.decisions)[-50:],
+            }
+
+
+governor = MemoryGovernor(MEMORY_BUDGET_MB * MB)
@@ -0,0 +1,332 @@
+# services/metrics.py
+"""
+In-process metrics registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format served on /metrics.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: Optional[Dict] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs += [f'{n}="{_escape(v)}"' for n, v in extra.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelvalues, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("_total" if not self.name.endswith("_total") else "", k, None, v) for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        self._callback: Optional[Callable[[], Dict[Tuple, float]]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def remove(self, **labels):
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def set_callback(self, fn: Callable[[], Dict[Tuple, float]]):
+        """Compute the gauge at scrape time; fn returns {label_values_tuple: value}."""
+        self._callback = fn
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                values = self._callback()
+            except Exception:
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [("", k, None, v) for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple, list] = {}
+        self._sums: Dict[Tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            keys = sorted(self._counts)
+            snapshot = {k: (list(self._counts[k]), self._sums[k]) for k in keys}
+        for key in keys:
+            counts, total = snapshot[key]
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                out.append(("_bucket", key, {"le": _format_value(bound)}, cumulative))
+            out.append(("_sum", key, None, total))
+            out.append(("_count", key, None, cumulative))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames=(), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# ======================================================
+# 📊 Standard metrics
+# ======================================================
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds",
+    "Wall-clock time spent in a pipeline stage.",
+    ("stage",),
+)
+STAGE_ITEMS = REGISTRY.counter(
+    "pipeline_stage_items_total",
+    "Items (segments, chunks, vectors, queries) processed by a pipeline stage.",
+    ("stage",),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "pipeline_stage_errors_total",
+    "Pipeline stage invocations that raised.",
+    ("stage",),
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+)
+MODEL_MEMORY = REGISTRY.gauge(
+    "model_resident_bytes",
+    "Approximate resident size of loaded models (parameters and buffers).",
+    ("model",),
+)
+CACHE_HITS = REGISTRY.counter("cache_hits_total", "Cache lookups that hit.", ("cache",))
+CACHE_MISSES = REGISTRY.counter("cache_misses_total", "Cache lookups that missed.", ("cache",))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "cache_hit_ratio",
+    "Fraction of cache lookups that hit since process start.",
+    ("cache",),
+)
+PROCESS_RSS = REGISTRY.gauge("process_resident_memory_bytes", "Resident set size of this process.")
+
+
+def _cache_hit_ratios():
+    ratios = {}
+    hits_by_key = dict(CACHE_HITS._values)
+    misses_by_key = dict(CACHE_MISSES._values)
+    for key in set(hits_by_key) | set(misses_by_key):
+        hits = hits_by_key.get(key, 0.0)
+        total = hits + misses_by_key.get(key, 0.0)
+        ratios[key] = hits / total if total else 0.0
+    return ratios
+
+
+def _process_rss():
+    try:
+        import psutil
+        return {(): float(psutil.Process(os.getpid()).memory_info().rss)}
+    except Exception:
+        return {}
+
+
+CACHE_HIT_RATIO.set_callback(_cache_hit_ratios)
+PROCESS_RSS.set_callback(_process_rss)
+
+
+# ======================================================
+# 🧰 Helpers used by services
+# ======================================================
+class _StageTimer:
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items = 0
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time a pipeline stage. Set `.items` on the yielded object to count
+    throughput (e.g. chunks embedded) for the stage.
+    """
+    timer = _StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        if timer.items:
+            STAGE_ITEMS.inc(timer.items, stage=stage)
+
+
+def record_cache(cache: str, hit: bool):
+    (CACHE_HITS if hit else CACHE_MISSES).inc(cache=cache)
+
+
+def model_nbytes(model) -> int:
+    """Best-effort size of a torch module (or a HF pipeline wrapping one)."""
+    module = getattr(model, "model", model)
+    total = 0
+    try:
+        for p in module.parameters():
+            total += p.numel() * p.element_size()
+        for b in module.buffers():
+            total += b.numel() * b.element_size()
+    except Exception:
+        return 0
+    return total
+
+
+def record_model_memory(name: str, model) -> int:
+    nbytes = model_nbytes(model)
+    MODEL_MEMORY.set(nbytes, model=name)
+    return nbytes
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
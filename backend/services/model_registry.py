@@ -0,0 +1,245 @@
+# services/model_registry.py
+"""
+Single place where heavy models are loaded. Models are created lazily on
+first use and shared by every caller in the process, and any of them can
+be swapped for a stand-in with `override()` (benchmarks, load tests) or
+with MODEL_BACKEND=stub / WHISPER_BACKEND=fixture. With MODEL_SERVERS set,
+the embedder, RAG and summarizer kinds are proxies to model-server
+processes (services/model_server.py) instead of local copies.
+"""
+import gc
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+from services.logging_setup import get_logger
+from services.metrics import track_stage, record_model_memory, MODEL_MEMORY
+from services.memory_governor import governor
+
+logger = get_logger(__name__)
+
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "all-MiniLM-L6-v2")
+RAG_MODEL = os.environ.get("RAG_MODEL", "google/flan-t5-base")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "real").lower()
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "real").lower()
+MODEL_SERVERS = os.environ.get("MODEL_SERVERS", "").strip()
+
+MB = 1024 ** 2
+
+# ======================================================
+# ⚙️ Model variants, preferred first, with load-size estimates.
+# The memory governor picks the first one that fits at load time.
+# ======================================================
+def _summarizer_variants():
+    if os.environ.get("SUM_MODEL"):
+        return [(os.environ["SUM_MODEL"], 1700 * MB)]
+    return [
+        ("facebook/bart-large-cnn", 1700 * MB),
+        ("sshleifer/distilbart-cnn-12-6", 1250 * MB),
+        ("facebook/bart-base", 600 * MB),
+    ]
+
+
+def _rag_variants():
+    variants = [(RAG_MODEL, 1000 * MB)]
+    if RAG_MODEL != "google/flan-t5-small":
+        variants.append(("google/flan-t5-small", 320 * MB))
+    return variants
+
+
+_WHISPER_SIZES = [("medium", 3000 * MB), ("small", 1000 * MB), ("base", 300 * MB), ("tiny", 160 * MB)]
+
+
+def _whisper_variants(size: str):
+    names = [n for n, _ in _WHISPER_SIZES]
+    if size not in names:
+        return [(size, 1000 * MB)]
+    return _WHISPER_SIZES[names.index(size):]
+
+
+def _variants_for(kind: str, args) -> List[Tuple[str, int]]:
+    if kind in _remote_kinds:
+        return [("remote", 0)]  # a proxy: the weights live in the model server
+    if kind == "summarizer":
+        return _summarizer_variants()
+    if kind == "rag":
+        return _rag_variants()
+    if kind == "whisper":
+        return _whisper_variants(args[0] if args else "tiny")
+    if kind == "embedder":
+        return [(EMBED_MODEL, 100 * MB)]
+    return [(kind, 0)]
+
+
+# ======================================================
+# ⚙️ Default (real) factories — heavy imports stay inside
+# ======================================================
+def _load_embedder(variant: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(variant)
+
+
+def _load_rag(variant: str):
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    return AutoTokenizer.from_pretrained(variant), AutoModelForSeq2SeqLM.from_pretrained(variant)
+
+
+def _load_summarizer(variant: str):
+    from transformers import pipeline
+    return pipeline("summarization", model=variant)
+
+
+def _load_whisper(variant: str):
+    import whisper
+    return whisper.load_model(variant)
+
+
+_factories: Dict[str, Callable[[str], Any]] = {
+    "embedder": _load_embedder,
+    "rag": _load_rag,
+    "summarizer": _load_summarizer,
+    "whisper": _load_whisper,
+}
+_remote_kinds = set()
+_instances: Dict[str, Any] = {}
+_variant_of: Dict[str, str] = {}
+_lock = threading.RLock()
+
+
+def _split(name: str):
+    """'whisper:tiny' -> ('whisper', ('tiny',))"""
+    kind, _, arg = name.partition(":")
+    return kind, ((arg,) if arg else ())
+
+
+def _memory_target(kind: str, instance):
+    if kind == "rag":
+        return instance[1]
+    return instance
+
+
+def get(name: str):
+    """Return the shared instance for `name`, loading it on first use."""
+    instance = _instances.get(name)
+    if instance is not None:
+        governor.touch(name)
+        return instance
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            kind, args = _split(name)
+            factory = _factories[kind]
+            variants = _variants_for(kind, args)
+            variant = governor.choose_variant(kind, variants)
+            estimate = dict(variants)[variant]
+            logger.info("model_loading", extra={"model": name, "variant": variant, "estimate_bytes": estimate})
+            with track_stage("model_load"):
+                instance = factory(variant)
+            _instances[name] = instance
+            _variant_of[name] = variant
+            nbytes = record_model_memory(name, _memory_target(kind, instance))
+            # stand-ins report 0 bytes; real models without torch params fall back to the estimate
+            if not nbytes and MODEL_BACKEND != "stub" and kind not in _remote_kinds:
+                nbytes = estimate
+            governor.track(name, nbytes, kind="model", unload=lambda n=name: unload(n))
+            logger.info("model_loaded", extra={"model": name, "variant": variant, "bytes": nbytes})
+    return instance
+
+
+@contextmanager
+def use(name: str):
+    """
+    The shared instance for `name`, pinned for the duration of the block so
+    the governor cannot evict it mid-call (the memory would not be freed while
+    we hold it, and the next get() would load a second copy).
+    """
+    while True:
+        instance = get(name)
+        with governor.pin(name):
+            # evicted between get() and pin(): load it again
+            if _instances.get(name) is instance:
+                yield instance
+                return
+
+
+def override(kind: str, factory: Callable[[str], Any], remote: bool = False):
+    """
+    Replace the factory for a model kind and drop any loaded instances of it.
+    `remote=True` marks the instances as proxies that hold no model memory here.
+    """
+    with _lock:
+        _factories[kind] = factory
+        if remote:
+            _remote_kinds.add(kind)
+        else:
+            _remote_kinds.discard(kind)
+        for name in [n for n in _instances if _split(n)[0] == kind]:
+            unload(name)
+
+
+def is_remote(kind: str) -> bool:
+    """True when instances of `kind` are proxies to a model server."""
+    return kind in _remote_kinds
+
+
+def unload(name: str) -> bool:
+    # No registry lock here: the governor calls this while evicting, and
+    # dict.pop is atomic, so taking _lock would only risk lock inversion.
+    instance = _instances.pop(name, None)
+    variant = _variant_of.pop(name, None)
+    if instance is None:
+        return False
+    del instance
+    index_module = sys.modules.get("services.embeddings_index")  # imports this module; not loaded = nothing cached
+    if name == "embedder" and index_module is not None:
+        index_module.clear_query_cache()
+    governor.forget(name)
+    MODEL_MEMORY.remove(model=name)
+    gc.collect()
+    logger.info("model_unloaded", extra={"model": name, "variant": variant})
+    return True
+
+
+def variant(name: str) -> str:
+    """Variant `name` runs as: the loaded one, else the one a load would try first."""
+    return _variant_of.get(name) or _variants_for(name, ())[0][0]
+
+
+def loaded() -> Dict[str, Dict]:
+    """Resident models with the variant actually loaded and its recorded size."""
+    return {
+        name: {"variant": _variant_of.get(name), "bytes": MODEL_MEMORY.get(model=name)}
+        for name in list(_instances)
+    }
+
+
+def get_embedder():
+    return get("embedder")
+
+
+def get_rag():
+    """(tokenizer, model) pair used for answer generation."""
+    return get("rag")
+
+
+def get_summarizer():
+    return get("summarizer")
+
+
+def get_whisper(size: str = "tiny"):
+    return get(f"whisper:{size}")
+
+
+if MODEL_BACKEND == "stub":
+    from services import stub_models
+    stub_models.install()
+
+if WHISPER_BACKEND == "fixture":
+    from services import fixture_backends
+    fixture_backends.install_whisper_backend()
+
+if MODEL_SERVERS:
+    from services import model_server
+    model_server.install_clients(MODEL_SERVERS)
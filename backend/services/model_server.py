@@ -0,0 +1,563 @@
+# services/model_server.py
+"""
+Local model-server processes.
+
+Every uvicorn worker that loads the embedder, flan-t5 and BART itself
+multiplies RAM with the worker count. With MODEL_SERVERS set, the model
+registry in API workers hands out thin proxies instead, and inference runs
+in a few dedicated processes started with
+
+    python -m services.model_server --replicas 2            # prints MODEL_SERVERS + MODEL_SERVER_AUTHKEY
+    MODEL_SERVERS=/tmp/ytqa-models-0.sock,/tmp/ytqa-models-1.sock MODEL_SERVER_AUTHKEY=... \
+        uvicorn api.main:app --workers 4
+
+Requests travel over multiprocessing connections (Unix socket, Windows
+named pipe, or host:port), which unpickle what they receive, so every
+connection must pass the MODEL_SERVER_AUTHKEY handshake. There is no
+default key: without one the launcher generates a random key per launch
+and prints it, and clients refuse to start. host:port addresses are only
+accepted with an explicitly configured key; Unix sockets are created 0600. Embedding results large enough to matter
+(MODEL_SERVER_SHM_MIN_BYTES) come back through a shared-memory block the
+caller allocates, instead of being pickled through the socket.
+
+Inside a server, concurrent requests for the same model are coalesced:
+a batcher waits up to MODEL_SERVER_BATCH_WAIT_MS for more work and runs
+up to MODEL_SERVER_MAX_BATCH inputs in one model call. Each client call
+goes to the replica with the fewest requests in flight. Connections are
+accepted with a MODEL_SERVER_BACKLOG-deep queue and authenticated on their
+own thread (MODEL_SERVER_HANDSHAKE_S), so one slow client cannot hold up
+the others; a request gets MODEL_SERVER_REQUEST_TIMEOUT_S to finish.
+
+Whisper stays in the API/ingest processes (it reads local media files).
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import queue
+from concurrent.futures import Future
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+MODEL_SERVERS = os.environ.get("MODEL_SERVERS", "").strip()
+# no default: a key from the public repo would let anyone reaching the socket run code in the server
+MODEL_SERVER_AUTHKEY = os.environ.get("MODEL_SERVER_AUTHKEY", "")
+MODEL_SERVER_MAX_BATCH = int(os.environ.get("MODEL_SERVER_MAX_BATCH", "32"))
+MODEL_SERVER_BATCH_WAIT_MS = float(os.environ.get("MODEL_SERVER_BATCH_WAIT_MS", "5"))
+MODEL_SERVER_SHM_MIN_BYTES = int(os.environ.get("MODEL_SERVER_SHM_MIN_BYTES", str(64 * 1024)))
+MODEL_SERVER_BACKLOG = int(os.environ.get("MODEL_SERVER_BACKLOG", "64"))
+MODEL_SERVER_HANDSHAKE_S = float(os.environ.get("MODEL_SERVER_HANDSHAKE_S", "5"))
+MODEL_SERVER_REQUEST_TIMEOUT_S = float(os.environ.get("MODEL_SERVER_REQUEST_TIMEOUT_S", "600"))
+# Kinds served remotely when MODEL_SERVERS is set
+REMOTE_KINDS = ("embedder", "rag", "summarizer")
+
+BATCH_SIZE = REGISTRY.histogram("model_server_batch_inputs", "Inputs per model call inside a model server.", ("op",),
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+REMOTE_SECONDS = REGISTRY.histogram("model_server_call_seconds", "Round trip of a model-server call.", ("op",))
+
+
+class RemoteModelError(RuntimeError):
+    """The model server ran the request and it failed."""
+
+
+# ======================================================
+# 🔌 Addresses + shared memory
+# ======================================================
+def parse_address(text: str):
+    """'host:port' -> TCP tuple; anything else is a socket path or pipe name."""
+    text = text.strip()
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit() and "/" not in text and "\\" not in text:
+        return host or "127.0.0.1", int(port)
+    return text
+
+
+def _family(address) -> str:
+    if isinstance(address, tuple):
+        return "AF_INET"
+    return "AF_PIPE" if address.startswith("\\\\.\\pipe\\") else "AF_UNIX"
+
+
+def _require_authkey(authkey) -> bytes:
+    if isinstance(authkey, str):
+        authkey = authkey.encode("utf-8")
+    if not authkey:
+        raise ValueError("MODEL_SERVER_AUTHKEY must be set to talk to model servers")
+    return authkey
+
+
+def default_addresses(replicas: int) -> List[str]:
+    if sys.platform == "win32":
+        return [f"\\\\.\\pipe\\ytqa-models-{i}" for i in range(replicas)]
+    return [os.path.join(tempfile.gettempdir(), f"ytqa-models-{i}.sock") for i in range(replicas)]
+
+
+def _attach(name: str) -> SharedMemory:
+    """Open a block the caller created and will unlink; do not let our resource tracker claim it."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class _Deadline:
+    """Connection view whose reads give up at a deadline (for the auth handshake)."""
+
+    def __init__(self, conn, timeout: float):
+        self.conn = conn
+        self.deadline = time.monotonic() + timeout
+
+    def send_bytes(self, *args):
+        self.conn.send_bytes(*args)
+
+    def recv_bytes(self, *args):
+        if not self.conn.poll(max(0.0, self.deadline - time.monotonic())):
+            raise TimeoutError("auth handshake timed out")
+        return self.conn.recv_bytes(*args)
+
+
+# ======================================================
+# 🧺 Server side: per-model batchers
+# ======================================================
+class _Batcher:
+    """Collects concurrent requests for one op and runs them as one model call."""
+
+    def __init__(self, op: str, run: Callable[[List[Dict]], List[Any]],
+                 max_batch: int = MODEL_SERVER_MAX_BATCH, wait_ms: float = MODEL_SERVER_BATCH_WAIT_MS):
+        self.op = op
+        self.run = run
+        self.max_batch = max_batch
+        self.wait_s = wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[Dict, Future]]" = queue.Queue()
+        threading.Thread(target=self._loop, name=f"batch-{op}", daemon=True).start()
+
+    def submit(self, payload: Dict, timeout: float = MODEL_SERVER_REQUEST_TIMEOUT_S) -> Any:
+        future: Future = Future()
+        self._queue.put((payload, future))
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            future.cancel()  # timed out while still queued: the batcher skips it
+
+    def _size(self, item: Tuple[Dict, Future]) -> Optional[int]:
+        """Inputs in a queued request; None when it was cancelled or is malformed (its future then fails)."""
+        payload, future = item
+        if not future.set_running_or_notify_cancel():
+            return None
+        try:
+            return len(payload["inputs"])
+        except Exception as e:
+            future.set_exception(ValueError(f"malformed {self.op} request: {type(e).__name__}: {e}"))
+            return None
+
+    def _loop(self):
+        while True:
+            batch, size = [], 0
+            item = self._queue.get()
+            deadline = time.monotonic() + self.wait_s
+            while True:
+                n = self._size(item)
+                if n is not None:
+                    batch.append(item)
+                    size += n
+                remaining = deadline - time.monotonic()
+                if size >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            try:
+                results = self.run([payload for payload, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def _grouped(payloads: List[Dict], call: Callable[[List, Dict], List]) -> List[List]:
+    """Run `call(inputs, kwargs)` once per distinct kwargs and split the outputs back per request."""
+    out: List[Optional[List]] = [None] * len(payloads)
+    groups: Dict[Tuple, List[int]] = {}
+    for i, p in enumerate(payloads):
+        groups.setdefault(tuple(sorted(p.get("kwargs", {}).items())), []).append(i)
+    for key, members in groups.items():
+        inputs = [x for i in members for x in payloads[i]["inputs"]]
+        results = call(inputs, dict(key))
+        offset = 0
+        for i in members:
+            n = len(payloads[i]["inputs"])
+            out[i] = list(results[offset:offset + n])
+            offset += n
+    return out
+
+
+def _run_embed(payloads: List[Dict]) -> List[np.ndarray]:
+    from services import model_registry
+
+    texts = [t for p in payloads for t in p["inputs"]]
+    BATCH_SIZE.observe(len(texts), op="embed")
+    with model_registry.use("embedder") as embedder:
+        vectors = np.asarray(embedder.encode(texts, batch_size=64, show_progress_bar=False), dtype="float32")
+    out, offset = [], 0
+    for p in payloads:
+        out.append(vectors[offset:offset + len(p["inputs"])])
+        offset += len(p["inputs"])
+    return out
+
+
+def _run_summarize(payloads: List[Dict]) -> List[List[Dict]]:
+    from services import model_registry
+    from services.summary_engine import summarize_bucketed
+
+    def call(texts, kwargs):
+        BATCH_SIZE.observe(len(texts), op="summarize")
+        with model_registry.use("summarizer") as summarizer:
+            results = summarize_bucketed(summarizer, texts, kwargs)
+        return [{"error": f"{type(r).__name__}: {r}"} if isinstance(r, Exception) else r for r in results]
+
+    return _grouped(payloads, call)
+
+
+def _run_generate(payloads: List[Dict]) -> List[List[str]]:
+    from services import model_registry
+
+    def call(prompts, kwargs):
+        BATCH_SIZE.observe(len(prompts), op="generate")
+        max_length = kwargs.pop("max_input_tokens", 2048)
+        with model_registry.use("rag") as (tokenizer, model):
+            inputs = tokenizer(prompts, return_tensors="pt", truncation=True, max_length=max_length, padding=True)
+            out = model.generate(**inputs, **kwargs)
+            return [t.strip() for t in tokenizer.batch_decode(out, skip_special_tokens=True)]
+
+    return _grouped(payloads, call)
+
+
+class ModelServer:
+    """Serves embed / summarize / generate requests on one address."""
+
+    def __init__(self, address, authkey: bytes,
+                 max_batch: int = MODEL_SERVER_MAX_BATCH, wait_ms: float = MODEL_SERVER_BATCH_WAIT_MS):
+        self._authkey = _require_authkey(authkey)
+        family = _family(address)
+        if family == "AF_UNIX":
+            if os.path.exists(address):
+                os.remove(address)  # stale socket from a previous run
+            old = os.umask(0o177)  # socket is created 0600: only this user can connect
+            try:
+                self.listener = Listener(address, family=family, backlog=MODEL_SERVER_BACKLOG)
+            finally:
+                os.umask(old)
+            os.chmod(address, 0o600)
+        else:
+            self.listener = Listener(address, family=family, backlog=MODEL_SERVER_BACKLOG)
+        self.address = self.listener.address
+        self._closed = False
+        self._batchers = {
+            "embed": _Batcher("embed", _run_embed, max_batch, wait_ms),
+            "summarize": _Batcher("summarize", _run_summarize, max_batch, wait_ms),
+            "generate": _Batcher("generate", _run_generate, max_batch, wait_ms),
+        }
+
+    def _info(self) -> Dict:
+        from services import model_registry
+        return {
+            "pid": os.getpid(),
+            "embed_dim": int(model_registry.get_embedder().get_sentence_embedding_dimension()),
+            "models": model_registry.loaded(),
+        }
+
+    def _handle(self, op: str, payload: Dict) -> Any:
+        if op == "info":
+            return self._info()
+        if op == "embed":
+            vectors = self._batchers["embed"].submit(payload)
+            if payload.get("shm"):
+                shm = _attach(payload["shm"])
+                try:
+                    view = np.ndarray(vectors.shape, dtype="float32", buffer=shm.buf)
+                    view[:] = vectors
+                    del view
+                finally:
+                    shm.close()
+                return {"shape": vectors.shape}
+            return {"vectors": vectors}
+        if op in ("summarize", "generate"):
+            return self._batchers[op].submit(payload)
+        raise ValueError(f"unknown op {op!r}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            try:  # what Listener(authkey=...) would do inside accept(), but off the accept loop
+                deadline = _Deadline(conn, MODEL_SERVER_HANDSHAKE_S)
+                deliver_challenge(deadline, self._authkey)
+                answer_challenge(deadline, self._authkey)
+            except Exception as e:  # wrong key, timeout, client went away
+                logger.warning("model_server_handshake_failed", extra={"error": f"{type(e).__name__}: {e}"})
+                return
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ("ok", self._handle(op, payload))
+                except Exception as e:
+                    logger.warning("model_server_request_failed", extra={"op": op, "error": str(e)})
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        logger.info("model_server_listening", extra={"address": str(self.address), "pid": os.getpid()})
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            except Exception as e:
+                logger.warning("model_server_accept_failed", extra={"error": str(e)})
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self._closed = True
+        self.listener.close()
+
+
+# ======================================================
+# 📞 Client side
+# ======================================================
+class _Replica:
+    def __init__(self, address):
+        self.address = address
+        self.in_flight = 0
+        self.idle: List[Any] = []
+
+
+class ModelClient:
+    """Connection pool over one or more model-server replicas."""
+
+    def __init__(self, addresses: Sequence, authkey: bytes = MODEL_SERVER_AUTHKEY,
+                 shm_min_bytes: int = MODEL_SERVER_SHM_MIN_BYTES):
+        self.replicas = [_Replica(a if isinstance(a, tuple) else parse_address(a)) for a in addresses]
+        if not self.replicas:
+            raise ValueError("no model server addresses")
+        self.authkey = _require_authkey(authkey)
+        self.shm_min_bytes = shm_min_bytes
+        self._lock = threading.Lock()
+        self._info: Optional[Dict] = None
+
+    def _checkout(self, exclude=None):
+        with self._lock:
+            candidates = [r for r in self.replicas if r is not exclude] or self.replicas
+            replica = min(candidates, key=lambda r: r.in_flight)
+            replica.in_flight += 1
+            conn = replica.idle.pop() if replica.idle else None
+        if conn is None:
+            try:
+                conn = Client(replica.address, family=_family(replica.address), authkey=self.authkey)
+            except Exception:
+                with self._lock:
+                    replica.in_flight -= 1
+                raise
+        return replica, conn
+
+    def _checkin(self, replica: _Replica, conn, healthy: bool):
+        with self._lock:
+            replica.in_flight -= 1
+            if healthy:
+                replica.idle.append(conn)
+                return
+        conn.close()
+
+    def call(self, op: str, payload: Optional[Dict] = None) -> Any:
+        start = time.perf_counter()
+        failed = None
+        for _ in range(2):  # one retry on another replica if the connection broke
+            replica, conn = self._checkout(exclude=failed)
+            healthy = False
+            try:
+                conn.send((op, payload or {}))
+                status, result = conn.recv()
+                healthy = True
+            except (EOFError, OSError, ConnectionError) as e:
+                logger.warning("model_server_connection_lost", extra={"address": str(replica.address), "error": str(e)})
+                failed = replica
+                continue
+            finally:
+                # anything else (unpicklable payload, interrupt) leaves the stream mid-message: drop it
+                self._checkin(replica, conn, healthy=healthy)
+            REMOTE_SECONDS.observe(time.perf_counter() - start, op=op)
+            if status == "error":
+                raise RemoteModelError(result)
+            return result
+        raise ConnectionError(f"model servers unreachable ({op})")
+
+    def info(self) -> Dict:
+        if self._info is None:
+            self._info = self.call("info")
+        return self._info
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        nbytes = len(texts) * self.info()["embed_dim"] * 4
+        if nbytes < self.shm_min_bytes:
+            return self.call("embed", {"inputs": texts})["vectors"]
+        shm = SharedMemory(create=True, size=max(1, nbytes))
+        try:
+            shape = tuple(self.call("embed", {"inputs": texts, "shm": shm.name})["shape"])
+            view = np.ndarray(shape, dtype="float32", buffer=shm.buf)
+            vectors = view.copy()
+            del view
+            return vectors
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def summarize(self, texts: List[str], **kwargs) -> List[Dict]:
+        return self.call("summarize", {"inputs": texts, "kwargs": kwargs})
+
+    def generate(self, prompts: List[str], **kwargs) -> List[str]:
+        return self.call("generate", {"inputs": prompts, "kwargs": kwargs})
+
+    def close(self):
+        with self._lock:
+            for replica in self.replicas:
+                for conn in replica.idle:
+                    conn.close()
+                replica.idle.clear()
+
+
+# ======================================================
+# 🪞 Proxies handed out by the model registry
+# ======================================================
+class RemoteEmbedder:
+    """SentenceTransformer-shaped proxy."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.client.info()["embed_dim"]
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        vectors = self.client.embed([sentences] if single else list(sentences))
+        return vectors[0] if single else vectors
+
+
+class RemoteSummarizer:
+    """HF summarization-pipeline-shaped proxy."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def __call__(self, inputs, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        kwargs.pop("batch_size", None)  # the server buckets by length itself
+        results = self.client.summarize(texts, **kwargs)
+        failed = [r["error"] for r in results if "error" in r]
+        if failed:
+            raise RemoteModelError(failed[0])
+        return results
+
+
+class RemoteGenerator:
+    """Stands in for the (tokenizer, model) pair; tokenization happens next to the model."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        return self.client.generate([prompt], **kwargs)[0]
+
+
+def install_clients(addresses: str = MODEL_SERVERS) -> ModelClient:
+    """Point the model registry at the servers for every kind in REMOTE_KINDS."""
+    from services import model_registry
+
+    client = ModelClient([a for a in addresses.split(",") if a.strip()])
+    model_registry.override("embedder", lambda variant: RemoteEmbedder(client), remote=True)
+    model_registry.override("rag", lambda variant: (None, RemoteGenerator(client)), remote=True)
+    model_registry.override("summarizer", lambda variant: RemoteSummarizer(client), remote=True)
+    logger.info("model_server_clients_installed", extra={"replicas": len(client.replicas)})
+    return client
+
+
+# ======================================================
+# 🖥️ CLI
+# ======================================================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run local model-server processes")
+    parser.add_argument("--address", action="append", default=[],
+                        help="socket path, pipe name or host:port (repeatable; one replica each)")
+    parser.add_argument("--replicas", type=int, default=1, help="replicas on default addresses when --address is not given")
+    parser.add_argument("--preload", default="embedder", help="comma-separated kinds to load before serving")
+    args = parser.parse_args(argv)
+
+    addresses = args.address or default_addresses(args.replicas)
+    authkey = os.environ.get("MODEL_SERVER_AUTHKEY", "")
+    if not authkey:
+        if any(isinstance(parse_address(a), tuple) for a in addresses):
+            parser.error("host:port addresses need an explicit MODEL_SERVER_AUTHKEY")
+        authkey = secrets.token_hex(32)  # per launch; replicas inherit it through the environment
+        os.environ["MODEL_SERVER_AUTHKEY"] = authkey
+        print(f"MODEL_SERVER_AUTHKEY={authkey}", flush=True)
+    if len(addresses) > 1:
+        # one process per replica, each with its own model copies
+        procs = [subprocess.Popen([sys.executable, "-m", "services.model_server", "--address", a, "--preload", args.preload])
+                 for a in addresses]
+        print(f"MODEL_SERVERS={','.join(addresses)}", flush=True)
+        try:
+            return max(p.wait() for p in procs)
+        except KeyboardInterrupt:
+            for p in procs:
+                p.terminate()
+            return 130
+
+    # a server must load real models, never proxy to itself
+    os.environ.pop("MODEL_SERVERS", None)
+    from services import model_registry
+
+    for kind in [k.strip() for k in args.preload.split(",") if k.strip()]:
+        model_registry.get(kind)
+    server = ModelServer(parse_address(addresses[0]), authkey=authkey)
+    if not args.address:
+        print(f"MODEL_SERVERS={addresses[0]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# services/parallel_embed.py
+"""
+Multi-process chunk encoding for large index builds.
+
+A pool of worker processes each keeps its own resident embedder (loaded
+once through the model registry). Chunks are sorted by length and cut
+into batches, so each batch holds texts of similar length (less padding
+waste); the batches are spread over the workers and the vectors are put
+back in the original chunk order.
+
+    EMBED_WORKERS=4                 enable with 4 processes (0 = off, "auto" = cores - 1)
+    EMBED_PARALLEL_MIN_CHUNKS=1000  smaller builds stay in-process
+    EMBED_BATCH_SIZE=64             chunks per task
+    EMBED_MP_START=spawn            multiprocessing start method
+
+Workers load the embedder from the environment (EMBED_MODEL,
+MODEL_BACKEND), so with the default "spawn" start method in-process
+`model_registry.override()` calls are not seen by the workers.
+"""
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from services.logging_setup import get_logger
+from services.memory_governor import governor
+
+logger = get_logger(__name__)
+
+MB = 1024 ** 2
+
+
+def _workers_from_env() -> int:
+    value = os.environ.get("EMBED_WORKERS", "0").strip().lower()
+    if value == "auto":
+        return max(1, (os.cpu_count() or 2) - 1)
+    return int(value or 0)
+
+
+EMBED_WORKERS = _workers_from_env()
+EMBED_PARALLEL_MIN_CHUNKS = int(os.environ.get("EMBED_PARALLEL_MIN_CHUNKS", "1000"))
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+EMBED_MP_START = os.environ.get("EMBED_MP_START", "spawn")
+# Resident size of one worker (interpreter + embedder), for the memory governor
+EMBED_WORKER_MB = int(os.environ.get("EMBED_WORKER_MB", "400"))
+
+
+def length_sorted_batches(texts: Sequence[str], batch_size: int) -> List[np.ndarray]:
+    """Index batches over `texts`, longest first, each holding similar-length texts."""
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+# ======================================================
+# 👷 Worker side
+# ======================================================
+_worker_embedder = None
+
+
+def _init_worker():
+    global _worker_embedder
+    # one process per core: keep each worker's math libraries single-threaded
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = "1"
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    from services import model_registry
+    _worker_embedder = model_registry.get_embedder()
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    vectors = _worker_embedder.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    return np.asarray(vectors, dtype="float32")
+
+
+# ======================================================
+# 🏊 Pool
+# ======================================================
+class ParallelEncoder:
+    def __init__(self, workers: int, batch_size: int = EMBED_BATCH_SIZE, start_method: str = EMBED_MP_START):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _governor_name(self) -> str:
+        return f"embed_pool:{id(self)}"
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                governor.make_room(self.workers * EMBED_WORKER_MB * MB, reason="embed_pool")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=mp.get_context(self.start_method),
+                    initializer=_init_worker,
+                )
+                # unload callback must not take self._lock (see memory_governor lock ordering)
+                governor.track(self._governor_name, self.workers * EMBED_WORKER_MB * MB, kind="model", unload=self._drop_pool)
+                logger.info("embed_pool_started", extra={"workers": self.workers, "start_method": self.start_method})
+            return self._pool
+
+    def _drop_pool(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectors for `texts` in their original order."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        batches = length_sorted_batches(texts, self.batch_size)
+        pool = self._ensure_pool()
+        governor.touch(self._governor_name)
+        with governor.pin(self._governor_name):
+            try:
+                results = pool.map(_encode_batch, [[texts[i] for i in idx] for idx in batches])
+                out = None
+                for idx, vectors in zip(batches, results):
+                    if out is None:
+                        out = np.empty((len(texts), vectors.shape[1]), dtype="float32")
+                    out[idx] = vectors
+            except BrokenProcessPool:
+                # a worker died (e.g. could not load the model): start fresh next time
+                self.shutdown()
+                raise
+            except CancelledError as e:
+                # the governor dropped the pool mid-map (cancel_futures); map() itself raises
+                # RuntimeError("cannot schedule new futures after shutdown") when it was first
+                raise RuntimeError("embedding pool was shut down") from e
+        return out
+
+    def shutdown(self):
+        with self._lock:
+            self._drop_pool()
+        governor.forget(self._governor_name)
+
+
+_encoder: Optional[ParallelEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder(workers: int = EMBED_WORKERS) -> Optional[ParallelEncoder]:
+    """Shared pool (created on first use); None when parallel encoding is off."""
+    global _encoder
+    if workers <= 1:
+        return None
+    with _encoder_lock:
+        if _encoder is None or _encoder.workers != workers:
+            if _encoder is not None:
+                _encoder.shutdown()
+            _encoder = ParallelEncoder(workers)
+        return _encoder
+
+
+def shutdown():
+    global _encoder
+    with _encoder_lock:
+        if _encoder is not None:
+            _encoder.shutdown()
+            _encoder = None
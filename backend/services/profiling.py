@@ -0,0 +1,328 @@
+# services/profiling.py
+"""
+On-demand profiling for a running worker (served under /system/profile,
+admin only). Nothing here costs anything until it is switched on.
+
+- Stack sampling: `sample_stacks(seconds)` walks every thread's stack every
+  few milliseconds for a while and returns the samples in the collapsed
+  format flamegraph.pl / speedscope read ("root;caller;leaf count").
+- Per-request cProfile: `request_profiler.arm(route=..., header=...)` makes
+  the next matching requests run their endpoint under cProfile; the last
+  PROFILE_KEEP profiles are kept for download. Disarmed, the middleware
+  does a single attribute check.
+- Memory: tracemalloc snapshots that can be diffed, to see which lines
+  keep allocating (model / index caches that never shrink).
+
+    PROFILE_MAX_SECONDS=60      longest stack-sampling window
+    PROFILE_KEEP=20             request profiles kept in memory
+    PROFILE_MAX_SNAPSHOTS=8     tracemalloc snapshots kept in memory
+"""
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+from services.logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+PROFILE_MAX_SNAPSHOTS = int(os.environ.get("PROFILE_MAX_SNAPSHOTS", "8"))
+
+
+# ======================================================
+# 🔥 Stack sampling (collapsed stacks for flamegraphs)
+# ======================================================
+# leaf frames of threads that are parked rather than working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"), ("queue.py", "get"), ("socket.py", "accept"),
+}
+
+
+def _label(code, cache: Dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        cache[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def sample_stacks(seconds: float, interval_s: float = 0.005, include_idle: bool = False) -> Counter:
+    """
+    Sample all threads of this process for `seconds`; returns a Counter of
+    "thread;outer;...;leaf" stacks. Parked threads are skipped unless
+    `include_idle`.
+    """
+    seconds = max(0.0, min(seconds, PROFILE_MAX_SECONDS))
+    me = threading.get_ident()
+    names: Dict = {}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while True:
+        threads = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (not include_idle and _is_idle(frame)):
+                continue
+            parts = []
+            while frame is not None:
+                parts.append(_label(frame.f_code, names))
+                frame = frame.f_back
+            parts.append(threads.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(parts))] += 1
+        if time.monotonic() >= deadline:
+            return stacks
+        time.sleep(interval_s)
+
+
+def collapsed(stacks: Counter) -> str:
+    """Counter from `sample_stacks` as flamegraph.pl input."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# ======================================================
+# ⏱️ Per-request cProfile
+# ======================================================
+_current: "contextvars.ContextVar[Optional[cProfile.Profile]]" = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfiler:
+    """
+    One armed rule at a time: requests whose path starts with `route`
+    and/or that carry `header` are profiled, `count` of them at most,
+    until `ttl_s` passes.
+    """
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.armed = False
+        self._rule: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.profiles: Deque[Dict] = deque(maxlen=keep)
+
+    def arm(self, route: Optional[str] = None, header: Optional[str] = None,
+            count: int = 10, ttl_s: float = 300.0) -> Dict:
+        if not route and not header:
+            raise ValueError("give a route prefix, a header, or both")
+        with self._lock:
+            self._rule = {
+                "route": route, "header": header.lower() if header else None,
+                "remaining": max(1, count), "expires": time.time() + ttl_s,
+            }
+            self.armed = True
+        logger.info("request_profiling_armed", extra={"route": route, "header": header, "count": count})
+        return self.status()
+
+    def disarm(self):
+        with self._lock:
+            self._rule = None
+            self.armed = False
+
+    def claim(self, path: str, headers: Dict[str, str]) -> bool:
+        """True (and one fewer remaining) when this request should be profiled."""
+        with self._lock:
+            rule = self._rule
+            if rule is None:
+                return False
+            if time.time() > rule["expires"]:
+                self._rule, self.armed = None, False
+                return False
+            if rule["route"] and not path.startswith(rule["route"]):
+                return False
+            if rule["header"] and rule["header"] not in headers:
+                return False
+            rule["remaining"] -= 1
+            if rule["remaining"] <= 0:
+                self._rule, self.armed = None, False
+            return True
+
+    def record(self, profile: cProfile.Profile, method: str, path: str, status: int, seconds: float) -> Dict:
+        try:
+            stats = pstats.Stats(profile)
+        except TypeError:  # the endpoint never ran (404, rejected by a dependency)
+            stats = pstats.Stats()
+        entry = {
+            "id": next(self._ids),
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_s": round(seconds, 4),
+            "at": time.time(),
+            "calls": stats.total_calls,
+            "stats": stats,
+        }
+        self.profiles.append(entry)
+        return entry
+
+    def get(self, profile_id: int) -> Optional[Dict]:
+        for entry in self.profiles:
+            if entry["id"] == profile_id:
+                return entry
+        return None
+
+    def status(self) -> Dict:
+        with self._lock:
+            rule = dict(self._rule) if self._rule else None
+        return {
+            "armed": rule,
+            "profiles": [{k: v for k, v in e.items() if k != "stats"} for e in self.profiles],
+        }
+
+
+def render_profile(entry: Dict, sort: str = "cumulative", limit: int = 40) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(stream=out)
+    stats.add(entry["stats"])  # a copy: strip_dirs / sort_stats mutate
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def dump_profile(entry: Dict) -> bytes:
+    """The profile in the .prof format snakeviz / pstats.Stats(path) load."""
+    return marshal.dumps(entry["stats"].stats)
+
+
+def start_request_profile() -> cProfile.Profile:
+    """Create the profile the endpoint of the current request will run under."""
+    profile = cProfile.Profile()
+    _current.set(profile)
+    return profile
+
+
+def _profiled(fn):
+    """Run `fn` under the current request's profile, if there is one."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await fn(*args, **kwargs)
+            # the event loop interleaves other requests while this one awaits
+            profile.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return run_async
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        # cProfile hooks one thread; sync endpoints run in the threadpool,
+        # so the profile is switched on in the thread that does the work
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+    return run
+
+
+def instrument(app) -> int:
+    """Wrap every route endpoint of `app` so armed requests can profile it."""
+    wrapped = 0
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is None or dependant.call is None or getattr(dependant.call, "__wrapped__", None):
+            continue
+        dependant.call = _profiled(dependant.call)
+        wrapped += 1
+    return wrapped
+
+
+request_profiler = RequestProfiler()
+
+
+# ======================================================
+# 🧠 tracemalloc snapshots
+# ======================================================
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+class MemoryTracer:
+    def __init__(self, keep: int = PROFILE_MAX_SNAPSHOTS):
+        self.keep = keep
+        self.snapshots: Dict[str, Dict] = {}  # label -> {"snapshot", "at", "traced"}
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> Dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, frames))
+            logger.info("tracemalloc_started", extra={"frames": frames})
+        return self.status()
+
+    def stop(self) -> Dict:
+        """Stop tracing; stored snapshots stay available for diffing."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc_stopped")
+        return self.status()
+
+    def snapshot(self, label: Optional[str] = None) -> Dict:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        traced, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            label = label or f"s{len(self.snapshots) + 1}-{int(time.time())}"
+            self.snapshots.pop(label, None)
+            self.snapshots[label] = {"snapshot": snap, "at": time.time(), "traced": traced}
+            while len(self.snapshots) > self.keep:
+                self.snapshots.pop(next(iter(self.snapshots)))
+        return {"label": label, "traced_bytes": traced}
+
+    def diff(self, base: str, current: str, top: int = 25, group_by: str = "lineno") -> List[Dict]:
+        """Largest allocation changes from snapshot `base` to `current`."""
+        with self._lock:
+            try:
+                old, new = self.snapshots[base]["snapshot"], self.snapshots[current]["snapshot"]
+            except KeyError as e:
+                raise KeyError(f"unknown snapshot {e.args[0]!r}") from None
+        rows = []
+        for stat in new.compare_to(old, group_by)[:top]:
+            rows.append({
+                "where": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            })
+        return rows
+
+    def status(self) -> Dict:
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = [{"label": k, "at": v["at"], "traced_bytes": v["traced"]} for k, v in self.snapshots.items()]
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "snapshots": snapshots,
+        }
+
+
+memory_tracer = MemoryTracer()
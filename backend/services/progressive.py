@@ -0,0 +1,263 @@
+# services/progressive.py
+"""
+Progressive (streaming) ingestion for long videos.
+
+The decoded audio is transcribed in windows of PROGRESSIVE_WINDOW_S
+seconds, cut at the quietest point near each boundary so words are not
+split. Windows the voice-activity pass (services/vad.py) finds no speech
+in are not sent to Whisper at all. Every window's segments are chunked, embedded and appended to the
+document's index as soon as they are ready, so QA works after the first
+window instead of after the whole file. The index metadata carries a
+coverage record ({"covered_s", "duration_s", "percent", "complete"}) that
+QA and summary responses report.
+
+Jobs run on a small thread pool (PROGRESSIVE_WORKERS); their state is kept
+in memory for GET /youtube/status/{video_id or job_id}. Only one job runs
+per video: a request for a URL or video id that is already being ingested
+gets the running job back.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.audio_download import open_audio, SAMPLE_RATE
+from services.chunking import chunk_text_from_segments, map_chunks_to_timestamps
+from services.embeddings_index import FaissIndexManager
+from services.logging_setup import get_logger
+from services.memory_governor import governor
+from services.metrics import track_stage, REGISTRY
+from services import model_registry, vad
+from services.storage import artifacts
+from services.transcript_store import TranscriptWriter, TSZ_NAME
+
+logger = get_logger(__name__)
+
+PROGRESSIVE_WINDOW_S = float(os.environ.get("PROGRESSIVE_WINDOW_S", "120"))
+# How far back from a window boundary to look for a quiet cut point
+PROGRESSIVE_SEEK_S = float(os.environ.get("PROGRESSIVE_SEEK_S", "3"))
+PROGRESSIVE_WORKERS = int(os.environ.get("PROGRESSIVE_WORKERS", "2"))
+MAX_DURATION_S = float(os.environ.get("PROGRESSIVE_MAX_DURATION_S", "7200"))
+JOB_HISTORY = 200
+
+TIME_TO_FIRST_CHUNK = REGISTRY.histogram(
+    "progressive_time_to_first_chunk_seconds", "Job start until the first chunks are queryable."
+)
+
+
+def split_points(audio: np.ndarray, window_s: float = PROGRESSIVE_WINDOW_S, seek_s: float = PROGRESSIVE_SEEK_S) -> List[int]:
+    """Sample offsets where windows end, each moved to the quietest 20 ms frame just before the nominal cut."""
+    window = int(window_s * SAMPLE_RATE)
+    seek = int(seek_s * SAMPLE_RATE)
+    frame = SAMPLE_RATE // 50
+    cuts, pos = [], 0
+    while len(audio) - pos > window:
+        target = pos + window
+        lo = max(pos + frame, target - seek)
+        span = np.asarray(audio[lo:target], dtype="float32")
+        usable = len(span) // frame * frame
+        if usable:
+            energy = np.square(span[:usable]).reshape(-1, frame).mean(axis=1)
+            target = lo + int(np.argmin(energy)) * frame
+        cuts.append(target)
+        pos = target
+    cuts.append(len(audio))
+    return cuts
+
+
+def _coverage(covered_s: float, duration_s: float, complete: bool) -> Dict:
+    return {
+        "covered_s": round(covered_s, 2),
+        "duration_s": round(duration_s, 2),
+        "percent": round(100.0 * covered_s / duration_s, 1) if duration_s else 100.0,
+        "complete": complete,
+    }
+
+
+class IngestJob:
+    def __init__(self, url: str):
+        self.url = url
+        self.job_id = f"job_{uuid.uuid4().hex[:12]}"
+        self.video_id: Optional[str] = None
+        self.duplicate_of: Optional["IngestJob"] = None
+        self.state = "queued"  # queued -> downloading -> indexing -> done | failed (| duplicate)
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self.first_chunk_s: Optional[float] = None
+        self.windows_done = 0
+        self.windows_total = 0
+        self.chunks = 0
+        self.coverage = _coverage(0.0, 0.0, False)
+        self.ready = threading.Event()  # set once the video id is known (or the job failed)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "video_id": self.video_id,
+            "state": self.state,
+            "error": self.error,
+            "windows": f"{self.windows_done}/{self.windows_total}",
+            "chunks": self.chunks,
+            "coverage": self.coverage,
+            "time_to_first_chunk_s": self.first_chunk_s,
+            "elapsed_s": round(time.time() - self.started, 1),
+        }
+
+
+_jobs: Dict[str, IngestJob] = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=PROGRESSIVE_WORKERS, thread_name_prefix="progressive")
+
+
+_ACTIVE = ("queued", "downloading", "indexing")
+
+
+def _store(job: IngestJob, key: str):
+    """Caller holds _jobs_lock."""
+    _jobs[key] = job
+    while len(_jobs) > JOB_HISTORY:
+        _jobs.pop(next(iter(_jobs)))
+
+
+def _remember(job: IngestJob, key: str):
+    with _jobs_lock:
+        _store(job, key)
+
+
+def _claim(job: IngestJob) -> Optional[IngestJob]:
+    """Register `job` under its video id, or return the job already ingesting that video."""
+    with _jobs_lock:  # check and insert in one hold: two requests cannot both claim a video
+        running = _jobs.get(job.video_id)
+        if running is not None and running is not job and running.state in _ACTIVE:
+            job.duplicate_of = running
+            _store(job, job.job_id)  # its caller may poll this id: get_job resolves it to `running`
+            return running
+        _store(job, job.video_id)
+    return None
+
+
+def get_job(key: str) -> Optional[IngestJob]:
+    """Job by video id or by job id (before its video id was known)."""
+    with _jobs_lock:
+        job = _jobs.get(key)
+    return job.duplicate_of or job if job is not None else None
+
+
+def run_progressive(job: IngestJob, model_name: str = "tiny", transcripts_root: str = "transcripts",
+                    window_s: float = PROGRESSIVE_WINDOW_S, owner: Optional[str] = None) -> IngestJob:
+    """Transcribe window by window, growing the index after each one. Runs in the calling thread."""
+    writer = None
+    try:
+        job.state = "downloading"
+        with open_audio(job.url) as (audio, info):
+            job.video_id = info.get("id", "unknown")
+            running = _claim(job)
+            if running is not None:
+                # another job is already writing this index and transcript
+                job.state = "duplicate"
+                logger.info("progressive_duplicate", extra={"video_id": job.video_id, "running": running.job_id})
+                return job
+            duration = len(audio) / SAMPLE_RATE
+            if duration > MAX_DURATION_S:
+                raise MemoryError(f"🚫 Video too long (>{int(MAX_DURATION_S // 60)} min).")
+            job.state = "indexing"
+            job.coverage = _coverage(0.0, duration, False)
+            job.ready.set()
+
+            cuts = split_points(audio, window_s)
+            job.windows_total = len(cuts)
+            # speech found once over the whole recording; windows without any are not transcribed
+            regions = None
+            if vad.VAD_ENABLED:
+                with track_stage("vad"):
+                    regions = vad.speech_regions(audio) or None  # none at all: let Whisper decide
+            fm = FaissIndexManager()
+            writer = TranscriptWriter(os.path.join(transcripts_root, job.video_id, TSZ_NAME))
+            language, start, first = None, 0, True
+
+            for end in cuts:
+                offset = start / SAMPLE_RATE
+                with governor.admit("transcribe"), track_stage("transcription") as stage:
+                    model = model_registry.get_whisper(model_name)
+                    window = np.ascontiguousarray(audio[start:end])
+                    if regions is None:
+                        result = model.transcribe(window, verbose=False, fp16=False)
+                    else:
+                        result = vad.transcribe_speech(model, window, regions=vad.clip(regions, start, end),
+                                                       verbose=False, fp16=False)
+                    stage.items = len(result.get("segments", []))
+                language = language or result.get("language")
+                segments = [
+                    {**s, "start": s["start"] + offset, "end": s["end"] + offset}
+                    for s in result.get("segments", []) if (s.get("text") or "").strip()
+                ]
+                writer.extend(segments)
+
+                chunks = chunk_text_from_segments(segments)
+                metadatas = map_chunks_to_timestamps(segments, chunks)
+                complete = end == cuts[-1]
+                coverage = {"coverage": _coverage(end / SAMPLE_RATE, duration, complete)}
+                if first and chunks:
+                    # a fresh version: a re-run must not append to an older index of the same video
+                    fm.build_index(job.video_id, chunks, metadatas, extra_meta=coverage)
+                    first = False
+                elif not first:
+                    fm.append_chunks(job.video_id, chunks, metadatas, extra_meta=coverage)
+
+                job.chunks += len(chunks)
+                job.windows_done += 1
+                job.coverage = coverage["coverage"]
+                if job.first_chunk_s is None and job.chunks:
+                    job.first_chunk_s = round(time.time() - job.started, 2)
+                    TIME_TO_FIRST_CHUNK.observe(job.first_chunk_s)
+                logger.info("progressive_window_indexed", extra={
+                    "video_id": job.video_id, "window": job.windows_done, "of": job.windows_total,
+                    "chunks": len(chunks), "percent": job.coverage["percent"],
+                })
+                start = end
+
+        if first:
+            raise RuntimeError("❌ Whisper failed to generate segments")
+        writer.close(language=language)
+        writer = None
+        artifacts.register(job.video_id, owner=owner, kind="video")
+        job.state = "done"
+        logger.info("progressive_done", extra=job.to_dict())
+    except Exception as e:
+        job.state = "failed"
+        job.error = str(e)
+        logger.error("progressive_failed", extra={"url": job.url, "video_id": job.video_id, "error": str(e)})
+    finally:
+        if writer is not None:
+            writer.abort()
+        job.ready.set()
+    return job
+
+
+def start_progressive(url: str, model_name: str = "tiny", owner: Optional[str] = None,
+                      wait_for_id_s: float = 0.0) -> IngestJob:
+    """
+    Queue a progressive job; download, decode and indexing run in the
+    background. Returns the running job instead when the URL is already
+    being ingested (a different URL for the same video is caught once its
+    id is known). Until then the job is polled by job_id. `wait_for_id_s`
+    optionally blocks until the video id is known.
+    """
+    with _jobs_lock:
+        for running in _jobs.values():
+            if running.url == url and running.state in _ACTIVE:
+                return running
+        job = IngestJob(url)
+        _store(job, job.job_id)
+    _executor.submit(run_progressive, job, model_name=model_name, owner=owner)
+    if wait_for_id_s > 0:
+        job.ready.wait(wait_for_id_s)
+    return job.duplicate_of or job
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
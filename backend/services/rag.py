@@ -1,15 +1,17 @@
 # services/rag.py
 import os
 from typing import Dict, Any, List
-import psutil
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from services.embeddings_index import FaissIndexManager
+from services.logging_setup import get_logger
+from services.metrics import track_stage
+from services import model_registry
+from services.memory_governor import governor, AdmissionTimeout
 
-MODEL_NAME = os.environ.get("RAG_MODEL", "google/flan-t5-base")
-print(f"🔧 Loading RAG model: {MODEL_NAME} (Free RAM: {psutil.virtual_memory().available/1024**3:.2f} GB)")
+logger = get_logger(__name__)
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+MODEL_NAME = model_registry.RAG_MODEL
+# chunks retrieved per question; `python -m benchmarks.retrieval_eval` measures alternatives
+RAG_TOP_K = int(os.environ.get("RAG_TOP_K", "5"))
 
 def _unique_lines_across_chunks(retrieved: List[Dict], max_chars: int = 1800) -> str:
     seen = set()
@@ -32,30 +34,48 @@ def _unique_lines_across_chunks(retrieved: List[Dict], max_chars: int = 1800) ->
             total_chars += len(snippet)
     return "\n".join(parts)
 
+def _source(r: Dict) -> Dict:
+    source = {"start": r.get("start"), "end": r.get("end"), "text": (r.get("chunk_text") or "")[:200]}
+    if r.get("duplicates"):
+        # the same passage elsewhere in the document (folded into this chunk at index build)
+        source["also_at"] = [{"start": d.get("start"), "end": d.get("end")} for d in r["duplicates"]]
+    return source
+
 def _generate_from_prompt(prompt: str, max_new_tokens: int = 200) -> str:
-    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=2048)
-    out = model.generate(
-        **inputs,
-        max_new_tokens=max_new_tokens,
-        num_beams=4,
-        no_repeat_ngram_size=3,
-        early_stopping=True
-    )
-    return tokenizer.decode(out[0], skip_special_tokens=True).strip()
-
-def rag_answer(video_id: str, question: str, top_k: int = 5) -> Dict[str, Any]:
+    with model_registry.use("rag") as (tokenizer, model):
+        if tokenizer is None:  # model server: tokenization and decoding happen next to the model
+            with track_stage("generation") as stage:
+                answer = model.generate_text(prompt, max_new_tokens=max_new_tokens, num_beams=4,
+                                             no_repeat_ngram_size=3, early_stopping=True)
+                stage.items = 1
+            return answer
+        with track_stage("generation") as stage:
+            inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=2048)
+            out = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                num_beams=4,
+                no_repeat_ngram_size=3,
+                early_stopping=True
+            )
+            stage.items = 1
+        return tokenizer.decode(out[0], skip_special_tokens=True).strip()
+
+def rag_answer(video_id: str, question: str, top_k: int = RAG_TOP_K) -> Dict[str, Any]:
     try:
         fm = FaissIndexManager()
         fm.load_index(video_id)
+        # partial while a progressive ingest is still running (None for one-shot builds)
+        coverage = fm.coverage(video_id)
 
         retrieved = fm.search(video_id, question, top_k=top_k)
         if not retrieved:
-            return {"answer": "No relevant information found.", "sources": []}
+            return {"answer": "No relevant information found.", "sources": [], "coverage": coverage}
 
         # Build a deduplicated context across chunks (avoid repeating same lines)
         context = _unique_lines_across_chunks(retrieved, max_chars=1800)
         if not context or len(context.strip()) < 20:
-            return {"answer": "No relevant information found.", "sources": []}
+            return {"answer": "No relevant information found.", "sources": [], "coverage": coverage}
 
         prompt = f"""
 You are an assistant answering questions using ONLY the CONTEXT below.
@@ -71,15 +91,16 @@ QUESTION:
 Answer (short and factual):
 """.strip()
 
-        answer = _generate_from_prompt(prompt, max_new_tokens=200)
+        with governor.admit("rag"):
+            answer = _generate_from_prompt(prompt, max_new_tokens=200)
 
         return {
             "answer": answer,
-            "sources": [
-                {"start": r.get("start"), "end": r.get("end"), "text": (r.get("chunk_text") or "")[:200]}
-                for r in retrieved
-            ]
+            "sources": [_source(r) for r in retrieved],
+            "coverage": coverage,
         }
 
+    except (AdmissionTimeout, FileNotFoundError):
+        raise
     except Exception as e:
         raise RuntimeError(f"RAG error: {e}")
@@ -1,44 +1,46 @@
 # services/run_day5.py
-import json, os
-from services.chunking import chunk_text_from_segments
+# Index one saved transcript and run a test query against it.
+# For many videos / files at once use `python -m services.bulk_ingest`.
+import os
+import sys
+from services.chunking import chunk_text_from_segments, map_chunks_to_timestamps
 from services.embeddings_index import FaissIndexManager
+from services.rag import RAG_TOP_K
+from services.transcript_store import read_transcript
 
 TRANSCRIPT_PATH = "transcripts/sample_transcript.json"  # replace with actual transcript path
 
-def load_transcript(path):
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    # Expecting whisper-style result: data["segments"] = list of {start,end,text}
-    return data
-
-def main():
-    if not os.path.exists(TRANSCRIPT_PATH):
-        print("Transcript file not found:", TRANSCRIPT_PATH)
+def main(path=TRANSCRIPT_PATH):
+    if not os.path.exists(path):
+        print("Transcript file not found:", path)
         return
 
-    data = load_transcript(TRANSCRIPT_PATH)
+    # .tsz or legacy whisper-style .json: data["segments"] = list of {start,end,text}
+    data = read_transcript(path)
     segments = data.get("segments", [])
     if not segments:
         print("No segments in transcript.")
         return
 
     print("Chunking text...")
-    chunks, metadatas = chunk_text_from_segments(segments, chunk_size=1000, chunk_overlap=200)
+    chunks = chunk_text_from_segments(segments)
+    metadatas = map_chunks_to_timestamps(segments, chunks)
     print(f"Created {len(chunks)} chunks.")
 
     print("Building FAISS index (this may take a while)...")
-    manager = FaissIndexManager(model_name="all-MiniLM-L6-v2", index_path="faiss.index", meta_path="index_meta.pkl")
-    manager.build_index(chunks, metadatas, batch_size=64)
-    print("Index built and saved.")
+    video_id = os.path.basename(os.path.dirname(os.path.abspath(path))) or "sample"
+    manager = FaissIndexManager()
+    folder = manager.build_index(video_id, chunks, metadatas)
+    print("Index built and saved to", folder)
 
     # test query
     question = "What does the video say about model deployment?"
     print("\nQuerying index with:", question)
-    results = manager.query(question, k=4)
+    results = manager.search(video_id, question, top_k=RAG_TOP_K)
     for r in results:
         print("----")
         print("start:", r.get("start"), "end:", r.get("end"))
-        print("preview:", r.get("text_preview")[:300])
+        print("preview:", (r.get("chunk_text") or "")[:300])
 
 if __name__ == "__main__":
-    main()
+    main(*sys.argv[1:2])
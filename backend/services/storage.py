@@ -0,0 +1,459 @@
+# services/storage.py
+"""
+Artifact lifecycle manager.
+
+Every document (video or uploaded file) owns a set of artifacts spread over
+the working directories:
+
+    faiss_index/<id>/          index + metadata        (durable)
+    transcripts/<id>/          Whisper output          (durable)
+    summaries/<id>_summary.json                        (durable, regenerable)
+    uploaded_files/<id>.<ext>  raw upload              (intermediate)
+    tmp/                       downloads / decode jobs (intermediate)
+
+The manager keeps a small catalog (owner, created, last access) in
+data/artifacts.json, deletes intermediates once indexing succeeded, and a
+background thread enforces per-user and global disk quotas by evicting the
+least recently accessed documents. `collect(dry_run=True)` returns the same
+plan without touching the disk.
+
+The catalog is shared by every worker process: each one re-reads it when
+the file changes, writes only its own changes (merged into the current file
+under a lock), and a collection pass runs in one process at a time.
+"""
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = get_logger(__name__)
+
+MB = 1024 ** 2
+
+INDEX_DIR = "faiss_index"
+TRANSCRIPTS_DIR = "transcripts"
+SUMMARIES_DIR = "summaries"
+UPLOAD_DIR = "uploaded_files"
+TMP_DIR = "tmp"
+
+CATALOG_PATH = os.environ.get("STORAGE_CATALOG", os.path.join("data", "artifacts.json"))
+# 0 = unlimited
+STORAGE_QUOTA_MB = int(os.environ.get("STORAGE_QUOTA_MB", "0"))
+STORAGE_USER_QUOTA_MB = int(os.environ.get("STORAGE_USER_QUOTA_MB", "0"))
+STORAGE_GC_INTERVAL_S = float(os.environ.get("STORAGE_GC_INTERVAL_S", "900"))
+# Documents touched more recently than this are never evicted (in-flight work)
+STORAGE_MIN_IDLE_S = float(os.environ.get("STORAGE_MIN_IDLE_S", "600"))
+# Leftovers in tmp/ older than this are orphans from crashed jobs
+TMP_MAX_AGE_S = float(os.environ.get("TMP_MAX_AGE_S", "3600"))
+KEEP_INTERMEDIATES = os.environ.get("KEEP_INTERMEDIATES", "0") == "1"
+# Access times are written back at most this often
+CATALOG_FLUSH_S = 30.0
+
+ANONYMOUS = "anonymous"
+
+STORAGE_BYTES = REGISTRY.gauge("storage_bytes", "Disk used by artifacts.", ("area",))
+STORAGE_DOCUMENTS = REGISTRY.gauge("storage_documents", "Documents with artifacts on disk.")
+STORAGE_EVICTIONS = REGISTRY.counter("storage_evictions_total", "Documents deleted by the storage manager.", ("reason",))
+STORAGE_FREED = REGISTRY.counter("storage_freed_bytes_total", "Bytes deleted by the storage manager.", ("reason",))
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _path_mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def doc_paths(doc_id: str) -> Dict[str, List[str]]:
+    """Existing artifact paths of a document, grouped by area."""
+    found = {
+        "index": [os.path.join(INDEX_DIR, doc_id)],
+        "transcripts": [os.path.join(TRANSCRIPTS_DIR, doc_id)],
+        "summaries": [os.path.join(SUMMARIES_DIR, f"{doc_id}_summary.json")],
+        "uploads": glob.glob(os.path.join(UPLOAD_DIR, glob.escape(doc_id) + ".*")),
+    }
+    return {area: [p for p in paths if os.path.exists(p)] for area, paths in found.items()}
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """Exclusive lock across processes; yields False when non-blocking and already held."""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _merge_entry(disk: Optional[Dict], mine: Dict) -> Dict:
+    """One worker's entry merged over the file's: earliest creation, latest access, a known owner wins."""
+    if not disk:
+        return dict(mine)
+    merged = {**disk, **mine}
+    for key, pick in (("created", min), ("last_access", max)):
+        values = [e[key] for e in (disk, mine) if e.get(key) is not None]
+        if values:
+            merged[key] = pick(values)
+    if mine.get("owner") == ANONYMOUS and disk.get("owner"):
+        merged["owner"] = disk["owner"]
+    return merged
+
+
+def _scan_doc_ids() -> set:
+    ids = set()
+    for root in (INDEX_DIR, TRANSCRIPTS_DIR):
+        if os.path.isdir(root):
+            ids.update(d.name for d in os.scandir(root) if d.is_dir())
+    if os.path.isdir(SUMMARIES_DIR):
+        ids.update(f.name[: -len("_summary.json")] for f in os.scandir(SUMMARIES_DIR) if f.name.endswith("_summary.json"))
+    if os.path.isdir(UPLOAD_DIR):
+        ids.update(os.path.splitext(f.name)[0] for f in os.scandir(UPLOAD_DIR) if f.is_file())
+    return ids
+
+
+class ArtifactManager:
+    def __init__(self, catalog_path: str = CATALOG_PATH, quota_bytes: int = STORAGE_QUOTA_MB * MB,
+                 user_quota_bytes: int = STORAGE_USER_QUOTA_MB * MB, min_idle_s: float = STORAGE_MIN_IDLE_S):
+        self.catalog_path = catalog_path
+        self.quota_bytes = quota_bytes
+        self.user_quota_bytes = user_quota_bytes
+        self.min_idle_s = min_idle_s
+        self._docs: Optional[Dict[str, Dict]] = None
+        self._stamp = None  # (mtime_ns, size) of the catalog file _docs was read from
+        self._changes: Dict[str, Optional[Dict]] = {}  # doc_id -> entry (None = removed) not yet written
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_flush = 0.0
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.last_report: Optional[Dict] = None
+
+    # --------------------------------------------------
+    # catalog
+    # --------------------------------------------------
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.catalog_path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read_disk(self) -> Dict[str, Dict]:
+        try:
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("documents", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _catalog(self) -> Dict[str, Dict]:
+        """This process's view: the file as other workers last wrote it, plus our unwritten changes."""
+        stamp = self._file_stamp()
+        if self._docs is None or stamp != self._stamp:
+            docs = self._read_disk()
+            for doc_id, entry in self._changes.items():
+                if entry is None:
+                    docs.pop(doc_id, None)
+                else:
+                    docs[doc_id] = _merge_entry(docs.get(doc_id), entry)
+            self._docs, self._stamp = docs, stamp
+        return self._docs
+
+    def _changed(self, doc_id: str):
+        self._changes[doc_id] = dict(self._docs[doc_id]) if doc_id in self._docs else None
+        self._dirty = True
+
+    def _flush(self, force: bool = False):
+        if not self._dirty or (not force and time.time() - self._last_flush < CATALOG_FLUSH_S):
+            return
+        os.makedirs(os.path.dirname(self.catalog_path) or ".", exist_ok=True)
+        with _file_lock(self.catalog_path + ".lock"):
+            # merge into what other workers wrote since we last read it
+            docs = self._read_disk()
+            for doc_id, entry in self._changes.items():
+                if entry is None:
+                    docs.pop(doc_id, None)
+                else:
+                    docs[doc_id] = _merge_entry(docs.get(doc_id), entry)
+            tmp = f"{self.catalog_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"documents": docs}, f)
+            os.replace(tmp, self.catalog_path)
+            self._docs, self._stamp = docs, self._file_stamp()
+        self._changes = {}
+        self._dirty = False
+        self._last_flush = time.time()
+
+    def register(self, doc_id: str, owner: Optional[str] = None, kind: str = "video"):
+        """Record a freshly indexed document and drop its intermediates."""
+        now = time.time()
+        with self._lock:
+            entry = self._catalog().setdefault(doc_id, {"created": now})
+            entry.update({"owner": owner or entry.get("owner") or ANONYMOUS, "kind": kind,
+                          "indexed_at": now, "last_access": now})
+            self._changed(doc_id)
+            self._flush(force=True)
+        self.discard_intermediates(doc_id)
+        if self.quota_bytes or self.user_quota_bytes:
+            self._wake.set()  # let the collector enforce quotas soon
+
+    def touch(self, doc_id: str):
+        with self._lock:
+            entry = self._catalog().get(doc_id)
+            if entry is None:
+                entry = self._catalog()[doc_id] = {"created": time.time(), "owner": ANONYMOUS}
+            entry["last_access"] = time.time()
+            self._changed(doc_id)
+            self._flush()
+
+    def latest_indexed(self) -> Optional[str]:
+        """Most recently indexed document whose index still exists (no directory scan)."""
+        with self._lock:
+            ranked = sorted(self._catalog().items(), key=lambda kv: kv[1].get("indexed_at", 0), reverse=True)
+        for doc_id, entry in ranked:
+            if entry.get("indexed_at") and os.path.isdir(os.path.join(INDEX_DIR, doc_id)):
+                return doc_id
+        return None
+
+    def recently_accessed(self, limit: int) -> List[str]:
+        """Up to `limit` documents with an index, most recently used (or indexed) first."""
+        with self._lock:
+            ranked = sorted(self._catalog().items(),
+                            key=lambda kv: kv[1].get("last_access") or kv[1].get("indexed_at", 0), reverse=True)
+        return [doc_id for doc_id, _ in ranked if os.path.isdir(os.path.join(INDEX_DIR, doc_id))][:limit]
+
+    def discard_intermediates(self, doc_id: str) -> int:
+        """Delete the raw upload of an indexed document (no-op with KEEP_INTERMEDIATES=1)."""
+        if KEEP_INTERMEDIATES:
+            return 0
+        freed = 0
+        for path in doc_paths(doc_id)["uploads"]:
+            freed += _path_size(path)
+            _remove(path)
+        if freed:
+            STORAGE_FREED.inc(freed, reason="intermediate")
+            logger.info("intermediates_deleted", extra={"doc_id": doc_id, "bytes": freed})
+        return freed
+
+    # --------------------------------------------------
+    # usage + collection
+    # --------------------------------------------------
+    def usage(self) -> Dict[str, Dict]:
+        """Per-document sizes, owners and access times, reconciled with what is on disk."""
+        docs = {}
+        with self._lock:
+            catalog = self._catalog()
+            for doc_id in _scan_doc_ids() | set(catalog):
+                paths = doc_paths(doc_id)
+                sizes = {area: sum(_path_size(p) for p in ps) for area, ps in paths.items()}
+                if not any(paths.values()):
+                    if catalog.pop(doc_id, None) is not None:
+                        self._changed(doc_id)
+                    continue
+                entry = catalog.get(doc_id, {})
+                last_access = entry.get("last_access") or max(_path_mtime(p) for ps in paths.values() for p in ps)
+                docs[doc_id] = {
+                    "owner": entry.get("owner", ANONYMOUS),
+                    "kind": entry.get("kind", "file" if doc_id.startswith("file_") else "video"),
+                    "last_access": last_access,
+                    "bytes": sum(sizes.values()),
+                    "areas": sizes,
+                }
+        return docs
+
+    def _orphaned_tmp(self, now: float) -> List[Dict]:
+        if not os.path.isdir(TMP_DIR):
+            return []
+        return [
+            {"path": e.path, "bytes": _path_size(e.path)}
+            for e in os.scandir(TMP_DIR)
+            if now - _path_mtime(e.path) > TMP_MAX_AGE_S
+        ]
+
+    def plan(self, now: Optional[float] = None) -> Dict:
+        """Work out what a collection pass would delete, without deleting anything."""
+        now = now or time.time()
+        docs = self.usage()
+        evictable = sorted(
+            (d for d in docs.items() if now - d[1]["last_access"] >= self.min_idle_s),
+            key=lambda d: d[1]["last_access"],
+        )
+        actions, evicted = [], set()
+
+        def evict(doc_id, info, reason):
+            evicted.add(doc_id)
+            actions.append({"doc_id": doc_id, "owner": info["owner"], "bytes": info["bytes"],
+                            "idle_s": round(now - info["last_access"]), "reason": reason})
+
+        per_user: Dict[str, int] = {}
+        for info in docs.values():
+            per_user[info["owner"]] = per_user.get(info["owner"], 0) + info["bytes"]
+
+        if self.user_quota_bytes:
+            for doc_id, info in evictable:
+                owner = info["owner"]
+                if per_user[owner] > self.user_quota_bytes:
+                    per_user[owner] -= info["bytes"]
+                    evict(doc_id, info, "user_quota")
+
+        total = sum(per_user.values())
+        if self.quota_bytes:
+            for doc_id, info in evictable:
+                if total <= self.quota_bytes:
+                    break
+                if doc_id not in evicted:
+                    total -= info["bytes"]
+                    evict(doc_id, info, "global_quota")
+
+        tmp = self._orphaned_tmp(now)
+        by_owner: Dict[str, int] = {}
+        for info in docs.values():
+            by_owner[info["owner"]] = by_owner.get(info["owner"], 0) + info["bytes"]
+        return {
+            "generated_at": now,
+            "documents": len(docs),
+            "total_bytes": sum(i["bytes"] for i in docs.values()),
+            "quota_bytes": self.quota_bytes,
+            "user_quota_bytes": self.user_quota_bytes,
+            "by_owner": by_owner,
+            "evict": actions,
+            "orphaned_tmp": tmp,
+            "reclaimable_bytes": sum(a["bytes"] for a in actions) + sum(t["bytes"] for t in tmp),
+        }
+
+    def evict(self, doc_id: str, reason: str = "manual") -> int:
+        from services.embeddings_index import invalidate_cached_index
+
+        freed = 0
+        for paths in doc_paths(doc_id).values():
+            for path in paths:
+                freed += _path_size(path)
+                _remove(path)
+        invalidate_cached_index(os.path.join(INDEX_DIR, doc_id))
+        with self._lock:
+            self._catalog().pop(doc_id, None)
+            self._changed(doc_id)
+        STORAGE_EVICTIONS.inc(reason=reason)
+        STORAGE_FREED.inc(freed, reason=reason)
+        logger.info("document_evicted", extra={"doc_id": doc_id, "bytes": freed, "reason": reason})
+        return freed
+
+    def collect(self, dry_run: bool = False) -> Dict:
+        """One GC pass: enforce quotas and clear orphaned tmp files. Returns the report."""
+        report = self.plan()
+        report["dry_run"] = dry_run
+        if not dry_run:
+            freed = 0
+            for action in report["evict"]:
+                freed += self.evict(action["doc_id"], reason=action["reason"])
+            for item in report["orphaned_tmp"]:
+                _remove(item["path"])
+                freed += item["bytes"]
+            if report["orphaned_tmp"]:
+                STORAGE_FREED.inc(sum(i["bytes"] for i in report["orphaned_tmp"]), reason="orphaned_tmp")
+            report["freed_bytes"] = freed
+            with self._lock:
+                self._flush(force=True)
+        self._publish(report)
+        self.last_report = report
+        logger.info("storage_collected", extra={
+            "dry_run": dry_run, "documents": report["documents"], "total_bytes": report["total_bytes"],
+            "evict": len(report["evict"]), "reclaimable_bytes": report["reclaimable_bytes"],
+        })
+        return report
+
+    def _publish(self, report: Dict):
+        STORAGE_DOCUMENTS.set(report["documents"])
+        areas: Dict[str, int] = {}
+        for doc_id in _scan_doc_ids():
+            for area, paths in doc_paths(doc_id).items():
+                areas[area] = areas.get(area, 0) + sum(_path_size(p) for p in paths)
+        areas["tmp"] = _path_size(TMP_DIR) if os.path.isdir(TMP_DIR) else 0
+        for area, nbytes in areas.items():
+            STORAGE_BYTES.set(nbytes, area=area)
+
+    # --------------------------------------------------
+    # background collector
+    # --------------------------------------------------
+    def _run(self, interval: float):
+        while not self._stopping.is_set():
+            try:
+                # one worker collects at a time; the others skip this round
+                with _file_lock(self.catalog_path + ".gc.lock", blocking=False) as acquired:
+                    if acquired:
+                        self.collect()
+            except Exception as e:
+                logger.warning("storage_collect_failed", extra={"error": str(e)})
+            self._wake.wait(interval)
+            self._wake.clear()
+        with self._lock:
+            self._flush(force=True)
+
+    def start(self, interval: float = STORAGE_GC_INTERVAL_S):
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+artifacts = ArtifactManager()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report or reclaim artifact storage")
+    parser.add_argument("--apply", action="store_true", help="delete what the report lists (default: dry run)")
+    args = parser.parse_args()
+    print(json.dumps(artifacts.collect(dry_run=not args.apply), indent=2))
@@ -0,0 +1,117 @@
+# services/stub_models.py
+"""
+Deterministic tiny stand-ins for the heavy models. They expose the same
+call surface the services use (SentenceTransformer.encode, HF tokenizer +
+generate, summarization pipeline) so benchmarks and tests run offline on
+CPU without torch or downloaded weights.
+"""
+import re
+import time
+import zlib
+from typing import Dict, List, Union
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class StubEmbedder:
+    """Hashed bag-of-words vectors, L2-normalised (same dim as MiniLM)."""
+
+    def __init__(self, dim: int = 384, delay_per_item: float = 0.0):
+        self.dim = dim
+        self.delay_per_item = delay_per_item
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        items = [sentences] if single else list(sentences)
+        out = np.zeros((len(items), self.dim), dtype="float32")
+        for row, text in enumerate(items):
+            for word in _WORD.findall(text.lower()):
+                h = zlib.crc32(word.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+            norm = np.linalg.norm(out[row])
+            if norm:
+                out[row] /= norm
+        if self.delay_per_item:
+            time.sleep(self.delay_per_item * len(items))
+        return out[0] if single else out
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with a growing vocabulary."""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self.inverse: List[str] = []
+
+    def _id(self, word: str) -> int:
+        if word not in self.vocab:
+            self.vocab[word] = len(self.inverse)
+            self.inverse.append(word)
+        return self.vocab[word]
+
+    def __call__(self, text, return_tensors=None, truncation=False, max_length=None, padding=False, **kwargs):
+        texts = [text] if isinstance(text, str) else list(text)
+        ids = []
+        for t in texts:
+            row = [self._id(w) for w in t.split()]
+            if truncation and max_length:
+                row = row[:max_length]
+            ids.append(row)
+        return {"input_ids": ids}
+
+    def decode(self, ids, skip_special_tokens: bool = True) -> str:
+        return " ".join(self.inverse[i] for i in ids)
+
+    def batch_decode(self, batch, skip_special_tokens: bool = True) -> List[str]:
+        return [self.decode(ids) for ids in batch]
+
+
+class StubSeq2Seq:
+    """'Generates' by echoing the tail of the prompt (the question and answer cue)."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def generate(self, input_ids=None, max_new_tokens: int = 200, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        return [row[-min(len(row), max_new_tokens, 24):] for row in input_ids]
+
+    def parameters(self):
+        return iter(())
+
+    def buffers(self):
+        return iter(())
+
+
+class StubSummarizer:
+    """Lead-N extractive summary with the HF pipeline calling convention."""
+
+    def __init__(self, sentences: int = 2, delay: float = 0.0):
+        self.sentences = sentences
+        self.delay = delay
+        self.tokenizer = StubTokenizer()
+
+    def _summarize(self, text: str, max_length: int) -> Dict[str, str]:
+        parts = [p.strip() for p in re.split(r"(?<=[.!?])\s+", text) if p.strip()]
+        words = " ".join(parts[: self.sentences]).split()[:max_length]
+        return {"summary_text": " ".join(words)}
+
+    def __call__(self, inputs: Union[str, List[str]], max_length: int = 200, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        return [self._summarize(t, max_length) for t in texts]
+
+
+def install(delay: float = 0.0):
+    """Point the model registry at the stand-ins."""
+    from services import model_registry
+    model_registry.override("embedder", lambda variant: StubEmbedder(delay_per_item=delay / 100))
+    model_registry.override("rag", lambda variant: (StubTokenizer(), StubSeq2Seq(delay=delay)))
+    model_registry.override("summarizer", lambda variant: StubSummarizer(delay=delay))
@@ -1,30 +1,14 @@
 # services/summarize.py
 import os
 import json
-import pickle
-import psutil
-from transformers import pipeline
 from fastapi import HTTPException
+from services.embeddings_index import load_chunk_vectors, load_coverage, index_exists
+from services.extractive import select_sections, SUMMARY_SECTIONS, SUMMARY_INPUT_CHARS
+from services.memory_governor import governor
+from services.logging_setup import get_logger
+from services.summary_engine import engine as summary_engine
 
-# ======================================================
-# ⚙️ Adaptive lightweight summarization model
-# ======================================================
-available_gb = psutil.virtual_memory().available / (1024 ** 3)
-
-if available_gb < 4:
-    SUM_MODEL = "sshleifer/distilbart-cnn-12-6"  # ✅ very small
-elif available_gb < 8:
-    SUM_MODEL = "facebook/bart-base"
-else:
-    SUM_MODEL = "facebook/bart-large-cnn"
-
-print(f"🔧 Loading summarization model: {SUM_MODEL} (RAM: {available_gb:.2f} GB)")
-
-try:
-    summarizer = pipeline("summarization", model=SUM_MODEL)
-    print(f"✅ Summarizer loaded successfully: {SUM_MODEL}")
-except Exception as e:
-    raise RuntimeError(f"❌ Failed to load summarization model: {str(e)}")
+logger = get_logger(__name__)
 
 
 def _chunk_text(text: str, max_chars: int = 2500):
@@ -44,44 +28,55 @@ def _chunk_text(text: str, max_chars: int = 2500):
     return paragraphs
 
 
-def generate_summary_json(video_id: str, max_chunks: int = 30):
+def _clock(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rest = divmod(seconds, 3600)
+    return f"{h}:{rest // 60:02d}:{rest % 60:02d}" if h else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+def _span(video_id: str, start: float, end: float) -> str:
+    if video_id.startswith("file_"):
+        # document chunks carry their position, not a time
+        return f"Part {int(start) + 1}–{int(end)}"
+    return f"{_clock(start)}–{_clock(end)}"
+
+
+def generate_summary_json(video_id: str, max_sections: int = SUMMARY_SECTIONS, input_chars: int = SUMMARY_INPUT_CHARS):
     """
     Offline summarization using lightweight BART models.
-    Automatically adapts to low-RAM environments.
+    The stored chunk vectors are clustered into sections first and only their
+    central sentences (about `input_chars`) go through the abstractive model.
     """
     base = os.path.join("faiss_index", video_id)
-    meta_path = os.path.join(base, "meta.pkl")
 
-    if not os.path.exists(meta_path):
+    if not index_exists(base):
         raise FileNotFoundError(f"Metadata not found for video {video_id}.")
 
-    with open(meta_path, "rb") as f:
-        meta = pickle.load(f)
-
-    # Combine transcript text
-    text_segments = []
-    for m in meta[:max_chunks]:
-        txt = m.get("chunk_text", "")
-        start, end = m.get("start", 0), m.get("end", 0)
-        text_segments.append(f"[{start:.1f}s–{end:.1f}s] {txt}")
+    meta, vectors = load_chunk_vectors(video_id)
+    sections = select_sections(meta, vectors, max_sections=max_sections, budget_chars=input_chars)
 
-    full_text = " ".join(text_segments).strip()
-    if not full_text:
+    condensed = " ".join(s for section in sections for s in section["sentences"]).strip()
+    if not condensed:
+        # nothing sentence-like (e.g. CSV rows): fall back to the leading chunks
+        condensed = " ".join(m.get("chunk_text", "") for m in meta)[:input_chars].strip()
+    if not condensed:
         raise HTTPException(status_code=400, detail="No transcript content found.")
 
-    print(f"🧩 Splitting long transcript for summarization...")
-    chunks = _chunk_text(full_text, max_chars=2500)
-    print(f"✂️ Created {len(chunks)} safe summarization chunks.")
+    chunks = _chunk_text(condensed, max_chars=2500)
+    logger.info("summary_chunks_created", extra={
+        "video_id": video_id, "chunks": len(chunks), "sections": len(sections),
+        "source_chars": sum(len(m.get("chunk_text", "")) for m in meta), "input_chars": len(condensed),
+    })
 
     summaries = []
-    for i, chunk in enumerate(chunks, 1):
-        print(f"🧠 Summarizing chunk {i}/{len(chunks)} ...")
-        try:
-            result = summarizer(chunk, max_length=200, min_length=60, do_sample=False)
-            summaries.append(result[0]["summary_text"].strip())
-        except Exception as e:
-            print(f"⚠️ Skipping chunk {i} due to error: {e}")
+    with governor.admit("summarize"):
+        # batched with the chunks of every other in-flight summary request
+        results = summary_engine.summarize(chunks, max_length=200, min_length=60, do_sample=False)
+    for i, result in enumerate(results, 1):
+        if isinstance(result, Exception):
+            logger.warning("summary_chunk_skipped", extra={"video_id": video_id, "chunk": i, "error": str(result)})
             continue
+        summaries.append(result["summary_text"].strip())
 
     if not summaries:
         raise HTTPException(status_code=500, detail="All summarization chunks failed.")
@@ -91,10 +86,11 @@ def generate_summary_json(video_id: str, max_chunks: int = 30):
 
     outline = [
         {
-            "topic": "Main Highlights",
-            "bullets": combined_summary.split(". ")[:3],
-            "timestamp": "00:00–End",
+            "topic": " · ".join(w.capitalize() for w in section["keywords"]) or f"Section {n}",
+            "bullets": section["sentences"][:3],
+            "timestamp": _span(video_id, section["start"], section["end"]),
         }
+        for n, section in enumerate(sections, 1)
     ]
 
     quiz = [
@@ -111,6 +107,10 @@ def generate_summary_json(video_id: str, max_chunks: int = 30):
         "summary": combined_summary,
         "quiz": quiz,
     }
+    coverage = load_coverage(video_id)
+    if coverage is not None:
+        # summarised while a progressive ingest was still running
+        summary_json["coverage"] = coverage
 
     os.makedirs("summaries", exist_ok=True)
     output_path = os.path.join("summaries", f"{video_id}_summary.json")
@@ -118,5 +118,5 @@ def generate_summary_json(video_id: str, max_chunks: int = 30):
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(summary_json, f, indent=2, ensure_ascii=False)
 
-    print(f"✅ [summarize] Saved summary at {output_path}")
+    logger.info("summary_saved", extra={"video_id": video_id, "path": output_path})
     return summary_json
@@ -0,0 +1,192 @@
+# services/summary_engine.py
+"""
+Cross-request batched summarization.
+
+Every chunk to summarize, from any in-flight request, goes into one queue.
+A single engine thread waits up to SUMMARY_BATCH_WAIT_MS after the first
+item for more work, then sorts what it collected by token length and cuts
+it into buckets of similar-length texts (at most SUMMARY_BATCH_SIZE texts
+and SUMMARY_BATCH_TOKENS padded tokens each), so one `generate` pass serves
+several requests with little padding. Results are routed back to each
+caller's future; if a batched call fails, its texts are retried one by one
+so only the offending chunk fails.
+
+    SUMMARY_BATCH_SIZE=8          texts per model call
+    SUMMARY_BATCH_TOKENS=4096     padded tokens per model call (longest x count)
+    SUMMARY_BATCH_WAIT_MS=20      how long the first item waits for company
+    SUMMARY_TIMEOUT_S=600         how long summarize() waits for all its texts
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Dict, List, Sequence, Tuple
+
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY, track_stage
+from services import model_registry
+
+logger = get_logger(__name__)
+
+SUMMARY_BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_BATCH_TOKENS = int(os.environ.get("SUMMARY_BATCH_TOKENS", "4096"))
+SUMMARY_BATCH_WAIT_MS = float(os.environ.get("SUMMARY_BATCH_WAIT_MS", "20"))
+SUMMARY_TIMEOUT_S = float(os.environ.get("SUMMARY_TIMEOUT_S", "600"))
+
+BATCH_TEXTS = REGISTRY.histogram("summary_batch_texts", "Texts per batched summarizer call.",
+                                 buckets=(1, 2, 4, 8, 16, 32))
+BATCH_PADDING = REGISTRY.histogram("summary_batch_padding_ratio", "Padded tokens / real tokens per batch.",
+                                   buckets=(1.0, 1.1, 1.25, 1.5, 2.0, 3.0, 5.0))
+
+
+def token_lengths(summarizer, texts: Sequence[str]) -> List[int]:
+    """Tokens per text with the model's tokenizer (word count for proxies without one)."""
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            return [len(ids) for ids in tokenizer(list(texts))["input_ids"]]
+        except Exception:
+            pass
+    return [max(1, int(len(t.split()) * 1.3)) for t in texts]
+
+
+def length_buckets(lengths: Sequence[int], max_texts: int = SUMMARY_BATCH_SIZE,
+                   max_tokens: int = SUMMARY_BATCH_TOKENS) -> List[List[int]]:
+    """Index buckets, longest first; each is padded to its first (longest) member."""
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    buckets: List[List[int]] = []
+    for i in order:
+        bucket = buckets[-1] if buckets else None
+        if bucket and len(bucket) < max_texts and lengths[bucket[0]] * (len(bucket) + 1) <= max_tokens:
+            bucket.append(i)
+        else:
+            buckets.append([i])
+    return buckets
+
+
+def summarize_bucketed(summarizer, texts: Sequence[str], kwargs: Dict,
+                       max_texts: int = SUMMARY_BATCH_SIZE, max_tokens: int = SUMMARY_BATCH_TOKENS) -> List[Any]:
+    """
+    Summaries for `texts` in input order. Each entry is the pipeline's
+    {"summary_text": ...} dict, or the exception raised for that text.
+    """
+    lengths = token_lengths(summarizer, texts)
+    out: List[Any] = [None] * len(texts)
+    for bucket in length_buckets(lengths, max_texts, max_tokens):
+        batch = [texts[i] for i in bucket]
+        real = sum(lengths[i] for i in bucket)
+        BATCH_TEXTS.observe(len(bucket))
+        BATCH_PADDING.observe(lengths[bucket[0]] * len(bucket) / max(1, real))
+        with track_stage("summarization") as stage:
+            try:
+                results = summarizer(batch, batch_size=len(batch), **kwargs)
+                for i, result in zip(bucket, results):
+                    out[i] = result
+                stage.items = len(bucket)
+                continue
+            except Exception as e:
+                if len(bucket) == 1:
+                    out[bucket[0]] = e
+                    continue
+                logger.warning("summary_batch_failed", extra={"texts": len(bucket), "error": str(e)})
+        for i in bucket:  # isolate the failing text
+            try:
+                out[i] = summarizer(texts[i], **kwargs)[0]
+            except Exception as e:
+                out[i] = e
+    return out
+
+
+class SummaryEngine:
+    def __init__(self, wait_ms: float = SUMMARY_BATCH_WAIT_MS, max_texts: int = SUMMARY_BATCH_SIZE,
+                 max_tokens: int = SUMMARY_BATCH_TOKENS):
+        self.wait_s = wait_ms / 1000.0
+        self.max_texts = max_texts
+        self.max_tokens = max_tokens
+        self._queue: "queue.Queue[Tuple[str, Dict, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # a forked worker (api/prefork.py) does not inherit the parent's thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="summary-engine", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str, **kwargs) -> Future:
+        """Future resolving to the summary dict of `text`."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, kwargs, future))
+        return future
+
+    def summarize(self, texts: Sequence[str], timeout: float = SUMMARY_TIMEOUT_S, **kwargs) -> List[Any]:
+        """
+        Summary dicts in order; a failed chunk yields its exception instead,
+        and one still unfinished after `timeout` seconds a TimeoutError.
+        """
+        futures = [self.submit(t, **kwargs) for t in texts]
+        deadline = time.monotonic() + timeout
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except TimeoutError as e:
+                future.cancel()  # still queued: the engine skips it
+                results.append(e)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _collect(self) -> List[Tuple[str, Dict, Future]]:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.wait_s
+        # bounded, so a steady stream of work cannot hold back the first caller
+        while len(items) < self.max_texts * 8:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self._queue.get(timeout=max(0.0, remaining)) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            groups: Dict[Tuple, List[Tuple[str, Dict, Future]]] = {}
+            try:
+                for item in items:
+                    if not item[2].set_running_or_notify_cancel():
+                        continue  # the caller gave up waiting
+                    try:
+                        groups.setdefault(tuple(sorted(item[1].items())), []).append(item)
+                    except TypeError as e:  # unhashable kwarg value (a list, a dict, ...)
+                        item[2].set_exception(e)
+                if not groups:
+                    continue
+                # pinned for the whole batch so the governor cannot unload it mid-call
+                with model_registry.use("summarizer") as summarizer:
+                    for group in groups.values():
+                        try:
+                            results = summarize_bucketed(summarizer, [t for t, _, _ in group], group[0][1],
+                                                         self.max_texts, self.max_tokens)
+                        except Exception as e:
+                            results = [e] * len(group)
+                        for (_, _, future), result in zip(group, results):
+                            if isinstance(result, Exception):
+                                future.set_exception(result)
+                            else:
+                                future.set_result(result)
+            except Exception as e:  # the model could not be loaded
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+engine = SummaryEngine()
@@ -1,8 +1,17 @@
 # services/transcribe.py
 import os
 import json
-import whisper
-from services.audio_download import download_audio
+from services.audio_download import open_audio
+from services.logging_setup import get_logger
+from services.metrics import track_stage
+from services import model_registry
+from services.memory_governor import governor
+from services import transcript_store, vad
+
+# "tsz" (compact columnar store, see services/transcript_store.py) or "json" (full Whisper output)
+TRANSCRIPT_FORMAT = os.environ.get("TRANSCRIPT_FORMAT", "tsz").lower()
+
+logger = get_logger(__name__)
 
 
 def transcribe_and_index(
@@ -11,27 +20,30 @@ def transcribe_and_index(
     transcripts_root: str = "transcripts"
 ):
     """
-    Step 1: Download audio
-    Step 2: Transcribe using Whisper
+    Step 1: Download audio and decode it in memory (no intermediate WAV)
+    Step 2: Transcribe the speech regions using Whisper
     Step 3: Save transcript
     RETURN ONLY transcript — FAISS is built later in youtube/process route.
     """
 
-    # Download audio
-    print(f"🎬 Downloading audio: {youtube_url}")
-    wav_path, info = download_audio(youtube_url)
-    video_id = info.get("id", "unknown")
+    # Download + decode to 16 kHz mono float32 (tmp/ job dir is removed on exit)
+    logger.info("download_started", extra={"url": youtube_url})
+    with open_audio(youtube_url) as (audio, info):
+        video_id = info.get("id", "unknown")
 
-    # Block long videos
-    if info.get("duration") and info["duration"] > 1200:
-        raise MemoryError("🚫 Video too long (>20 min).")
+        # Block long videos
+        if info.get("duration") and info["duration"] > 1200:
+            raise MemoryError("🚫 Video too long (>20 min).")
 
-    # Transcribe
-    print("🎧 Transcribing audio (Whisper tiny)...")
-    model = whisper.load_model(model_name)
-    result = model.transcribe(wav_path, verbose=False, fp16=False)
+        # Transcribe
+        logger.info("transcription_started", extra={"video_id": video_id, "model": model_name})
+        with governor.admit("transcribe"), track_stage("transcription") as stage:
+            model = model_registry.get_whisper(model_name)
+            # silence / music beds are skipped; segment times stay in original-audio seconds
+            result = vad.transcribe_speech(model, audio, verbose=False, fp16=False)
+            segments = result.get("segments", [])
+            stage.items = len(segments)
 
-    segments = result.get("segments", [])
     if not segments:
         raise RuntimeError("❌ Whisper failed to generate segments")
 
@@ -39,11 +51,17 @@ def transcribe_and_index(
     video_tr_dir = os.path.join(transcripts_root, video_id)
     os.makedirs(video_tr_dir, exist_ok=True)
 
-    transcript_path = os.path.join(video_tr_dir, "transcript.json")
-    with open(transcript_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    with track_stage("transcript_write"):
+        if TRANSCRIPT_FORMAT == "json":
+            transcript_path = os.path.join(video_tr_dir, transcript_store.JSON_NAME)
+            with open(transcript_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+        else:
+            transcript_path = transcript_store.write_transcript(
+                os.path.join(video_tr_dir, transcript_store.TSZ_NAME), result
+            )
 
-    print(f"✅ Transcript saved: {transcript_path}")
+    logger.info("transcript_saved", extra={"video_id": video_id, "path": transcript_path, "segments": len(segments)})
 
     # Return ONLY basic info
     return {
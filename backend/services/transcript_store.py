@@ -0,0 +1,278 @@
+# services/transcript_store.py
+"""
+Compact transcript storage (transcript.tsz).
+
+Only what the pipeline reads is kept: per-segment start, end and text.
+Segments are written in blocks; each block is stored column-wise
+
+    int32 start_ms[n] | int32 end_ms[n] | uint32 text_offsets[n + 1] | utf-8 text
+
+and compressed on its own (zstd when `zstandard` is installed, zlib
+otherwise), so readers can stream one block at a time and skip blocks
+outside a time range. A JSON footer holds the block table:
+
+    b"TSZ1" | block ... | footer json | uint32 footer_len | b"TSZ1"
+
+Convert existing transcript.json files with:
+
+    python -m services.transcript_store convert transcripts [--remove-json]
+"""
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from services.logging_setup import get_logger
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib keeps the format usable without it
+    zstandard = None
+
+logger = get_logger(__name__)
+
+MAGIC = b"TSZ1"
+VERSION = 1
+BLOCK_SEGMENTS = 512
+TSZ_NAME = "transcript.tsz"
+JSON_NAME = "transcript.json"
+ZSTD_LEVEL = int(os.environ.get("TRANSCRIPT_ZSTD_LEVEL", "10"))
+
+
+# ======================================================
+# 🗜️ Codecs
+# ======================================================
+def _default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("transcript was written with zstd; install `zstandard` to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _encode_block(starts: List[int], ends: List[int], texts: List[str]) -> bytes:
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return (
+        np.asarray(starts, dtype="<i4").tobytes()
+        + np.asarray(ends, dtype="<i4").tobytes()
+        + offsets.tobytes()
+        + b"".join(encoded)
+    )
+
+
+def _decode_block(raw: bytes, count: int):
+    n4 = count * 4
+    starts = np.frombuffer(raw, dtype="<i4", count=count, offset=0)
+    ends = np.frombuffer(raw, dtype="<i4", count=count, offset=n4)
+    offsets = np.frombuffer(raw, dtype="<u4", count=count + 1, offset=2 * n4)
+    blob = raw[3 * n4 + 4:]
+    return starts, ends, offsets, blob
+
+
+# ======================================================
+# ✍️ Writer
+# ======================================================
+class TranscriptWriter:
+    """
+    Append segments, then close(). Writes to `<path>.tmp` and renames on
+    close, so readers never see a half-written file.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None, block_segments: int = BLOCK_SEGMENTS):
+        self.path = path
+        self.codec = codec or _default_codec()
+        self.block_segments = block_segments
+        self._tmp = path + ".tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(self._tmp, "wb")
+        self._f.write(MAGIC)
+        self._blocks = []
+        self._starts, self._ends, self._texts = [], [], []
+        self.count = 0
+
+    def add(self, start: float, end: float, text: str):
+        self._starts.append(int(round(float(start) * 1000)))
+        self._ends.append(int(round(float(end) * 1000)))
+        self._texts.append(text or "")
+        self.count += 1
+        if len(self._texts) >= self.block_segments:
+            self._flush_block()
+
+    def extend(self, segments: Iterable[Dict]):
+        for seg in segments:
+            self.add(seg.get("start", 0.0), seg.get("end", 0.0), seg.get("text", ""))
+
+    def _flush_block(self):
+        if not self._texts:
+            return
+        payload = _compress(_encode_block(self._starts, self._ends, self._texts), self.codec)
+        offset = self._f.tell()
+        self._f.write(payload)
+        self._blocks.append([offset, len(payload), len(self._texts), self._starts[0], max(self._ends)])
+        self._starts, self._ends, self._texts = [], [], []
+
+    def close(self, language: Optional[str] = None, **extra) -> str:
+        self._flush_block()
+        footer = json.dumps({
+            "version": VERSION,
+            "codec": self.codec,
+            "count": self.count,
+            "language": language,
+            "blocks": self._blocks,
+            "extra": extra,
+        }).encode("utf-8")
+        self._f.write(footer)
+        self._f.write(struct.pack("<I", len(footer)))
+        self._f.write(MAGIC)
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        self._f.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            if not self._f.closed:
+                self.close()
+        else:
+            self.abort()
+
+
+def write_transcript(path: str, result: Dict, codec: Optional[str] = None) -> str:
+    """Store a Whisper result (only segment start/end/text and the language are kept)."""
+    writer = TranscriptWriter(path, codec=codec)
+    try:
+        writer.extend(result.get("segments", []))
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close(language=result.get("language"))
+
+
+# ======================================================
+# 📖 Readers
+# ======================================================
+def read_footer(path: str) -> Dict:
+    with open(path, "rb") as f:
+        f.seek(-8, os.SEEK_END)
+        footer_len, magic = struct.unpack("<I4s", f.read(8))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a transcript store file")
+        f.seek(-8 - footer_len, os.SEEK_END)
+        return json.loads(f.read(footer_len).decode("utf-8"))
+
+
+def iter_segments(path: str, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Stream segments as {"id", "start", "end", "text"} dicts, one compressed
+    block in memory at a time. With start/end only overlapping segments are
+    returned and blocks entirely outside the range are not decompressed.
+    """
+    footer = read_footer(path)
+    lo = None if start is None else int(round(start * 1000))
+    hi = None if end is None else int(round(end * 1000))
+    seg_id = 0
+    with open(path, "rb") as f:
+        for offset, length, count, first_ms, last_ms in footer["blocks"]:
+            if (hi is not None and first_ms > hi) or (lo is not None and last_ms < lo):
+                seg_id += count
+                continue
+            f.seek(offset)
+            starts, ends, offsets, blob = _decode_block(_decompress(f.read(length), footer["codec"]), count)
+            for i in range(count):
+                s, e = int(starts[i]), int(ends[i])
+                if (hi is None or s <= hi) and (lo is None or e >= lo):
+                    yield {
+                        "id": seg_id + i,
+                        "start": s / 1000.0,
+                        "end": e / 1000.0,
+                        "text": blob[offsets[i]:offsets[i + 1]].decode("utf-8"),
+                    }
+            seg_id += count
+
+
+def read_transcript(path: str) -> Dict:
+    """{"text", "segments", "language"} from a .tsz or legacy .json transcript."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {"text": data.get("text", ""), "segments": data.get("segments", []), "language": data.get("language")}
+    segments = list(iter_segments(path))
+    return {
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": read_footer(path).get("language"),
+    }
+
+
+def transcript_path(video_dir: str) -> Optional[str]:
+    """The transcript file inside a transcripts/<id>/ folder, preferring the compact store."""
+    for name in (TSZ_NAME, JSON_NAME):
+        path = os.path.join(video_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# ======================================================
+# 🔁 Converter for existing transcript.json files
+# ======================================================
+def convert_json(json_path: str, remove_json: bool = False, codec: Optional[str] = None) -> str:
+    with open(json_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    out = write_transcript(os.path.join(os.path.dirname(json_path), TSZ_NAME), result, codec=codec)
+    before, after = os.path.getsize(json_path), os.path.getsize(out)
+    logger.info("transcript_converted", extra={"path": out, "json_bytes": before, "tsz_bytes": after, "segments": len(result.get("segments", []))})
+    if remove_json:
+        os.remove(json_path)
+    return out
+
+
+def convert_tree(root: str, remove_json: bool = False) -> List[str]:
+    converted = []
+    for dirpath, _, files in os.walk(root):
+        if JSON_NAME in files:
+            converted.append(convert_json(os.path.join(dirpath, JSON_NAME), remove_json=remove_json))
+    return converted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact transcript store tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="convert every transcript.json under a folder")
+    conv.add_argument("root", nargs="?", default="transcripts")
+    conv.add_argument("--remove-json", action="store_true", help="delete the JSON files after converting")
+    info = sub.add_parser("info", help="print the footer of a .tsz file")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        for path in convert_tree(args.root, remove_json=args.remove_json):
+            print(path)
+    else:
+        footer = read_footer(args.path)
+        footer["blocks"] = len(footer["blocks"])
+        print(json.dumps(footer, indent=2))
@@ -0,0 +1,208 @@
+# services/vad.py
+"""
+Voice-activity detection before Whisper (numpy only: CPU, no model, no network).
+
+Audio is cut into 20 ms frames. A frame counts as speech when it is
+- loud enough: VAD_MARGIN_DB above the recording's own noise floor (10th
+  percentile of frame energy), and never below VAD_FLOOR_DB dBFS;
+- voice-band heavy: at least VAD_BAND_RATIO of its energy in 100-4000 Hz
+  (rules out mains hum, rumble and hiss);
+- modulated: within +-0.5 s the energy changes by at least
+  VAD_MIN_MODULATION_DB per frame on average. Speech rises and falls with
+  every syllable; music beds and sustained tones are steady, and the single
+  step where one starts or stops averages out. 0 turns this check off.
+
+Speech frames become regions: gaps shorter than VAD_MIN_SILENCE_MS are
+bridged, regions shorter than VAD_MIN_SPEECH_MS dropped, and VAD_PAD_MS is
+kept on both sides so word onsets are not clipped.
+
+`transcribe_speech` sends only those regions to Whisper, joined with short
+pauses, and maps the returned segment (and word) times back to the
+original audio. When no speech is found at all it transcribes everything
+(a quiet recording is better transcribed than dropped); when speech
+covers more than VAD_MAX_SPEECH_RATIO of the audio there is nothing
+worth skipping and the audio goes through unchanged.
+
+    VAD_ENABLED=1   VAD_MARGIN_DB=12   VAD_FLOOR_DB=-50   VAD_BAND_RATIO=0.5
+    VAD_MIN_MODULATION_DB=1.5   VAD_MIN_SPEECH_MS=250   VAD_MIN_SILENCE_MS=600
+    VAD_PAD_MS=200   VAD_GAP_MS=300   VAD_MAX_SPEECH_RATIO=0.9
+"""
+import bisect
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.audio_download import SAMPLE_RATE
+from services.logging_setup import get_logger
+from services.metrics import REGISTRY, track_stage
+
+logger = get_logger(__name__)
+
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") == "1"
+VAD_MARGIN_DB = float(os.environ.get("VAD_MARGIN_DB", "12"))
+VAD_FLOOR_DB = float(os.environ.get("VAD_FLOOR_DB", "-50"))
+VAD_BAND_RATIO = float(os.environ.get("VAD_BAND_RATIO", "0.5"))
+VAD_MIN_MODULATION_DB = float(os.environ.get("VAD_MIN_MODULATION_DB", "1.5"))
+VAD_MIN_SPEECH_MS = float(os.environ.get("VAD_MIN_SPEECH_MS", "250"))
+VAD_MIN_SILENCE_MS = float(os.environ.get("VAD_MIN_SILENCE_MS", "600"))
+VAD_PAD_MS = float(os.environ.get("VAD_PAD_MS", "200"))
+VAD_GAP_MS = float(os.environ.get("VAD_GAP_MS", "300"))
+VAD_MAX_SPEECH_RATIO = float(os.environ.get("VAD_MAX_SPEECH_RATIO", "0.9"))
+
+FRAME = SAMPLE_RATE // 50  # 20 ms
+_FRAME_MS = 1000 * FRAME / SAMPLE_RATE
+_BLOCK_FRAMES = 3000       # one minute of frames per FFT batch
+_MODULATION_FRAMES = 50    # 1 s window
+
+SKIPPED_SECONDS = REGISTRY.counter("vad_skipped_seconds_total", "Audio seconds not sent to Whisper.")
+SPEECH_RATIO = REGISTRY.histogram("vad_speech_ratio", "Share of each recording detected as speech.",
+                                  buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0))
+
+Region = Tuple[int, int]  # [start, end) in samples
+
+
+# ======================================================
+# 🔊 Frame features + speech regions
+# ======================================================
+def frame_features(audio: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(energy in dBFS, share of energy in the voice band) per 20 ms frame; works on memmaps block by block."""
+    n = len(audio) // FRAME
+    energy = np.empty(n, dtype="float32")
+    band = np.empty(n, dtype="float32")
+    freqs = np.fft.rfftfreq(FRAME, 1.0 / SAMPLE_RATE)
+    voice = (freqs >= 100) & (freqs <= 4000)
+    window = np.hanning(FRAME).astype("float32")
+    for b in range(0, n, _BLOCK_FRAMES):
+        e = min(n, b + _BLOCK_FRAMES)
+        frames = np.asarray(audio[b * FRAME:e * FRAME], dtype="float32").reshape(-1, FRAME)
+        energy[b:e] = 10.0 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+        spectrum = np.square(np.abs(np.fft.rfft(frames * window, axis=1)))
+        band[b:e] = spectrum[:, voice].sum(axis=1) / (spectrum.sum(axis=1) + 1e-12)
+    return energy, band
+
+
+def _modulation(energy: np.ndarray, width: int) -> np.ndarray:
+    """Mean absolute frame-to-frame energy change (dB) over a centred window."""
+    steps = np.abs(np.diff(energy.astype("float64"), prepend=float(energy[0])))
+    pad = width // 2
+    padded = np.pad(steps, (pad, width - 1 - pad), mode="edge")
+    sums = np.concatenate([[0.0], np.cumsum(padded)])
+    return (sums[width:] - sums[:-width]) / width
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    edges = np.diff(np.concatenate([[0], mask.astype("int8"), [0]]))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def speech_regions(audio: np.ndarray, margin_db: float = VAD_MARGIN_DB, floor_db: float = VAD_FLOOR_DB,
+                   band_ratio: float = VAD_BAND_RATIO, min_modulation_db: float = VAD_MIN_MODULATION_DB,
+                   min_speech_ms: float = VAD_MIN_SPEECH_MS, min_silence_ms: float = VAD_MIN_SILENCE_MS,
+                   pad_ms: float = VAD_PAD_MS) -> List[Region]:
+    """Speech regions of 16 kHz mono audio as [start, end) sample ranges, in order."""
+    energy, band = frame_features(audio)
+    if not len(energy):
+        return []
+    threshold = max(float(np.percentile(energy, 10)) + margin_db, floor_db)
+    speech = (energy > threshold) & (band >= band_ratio)
+    if min_modulation_db > 0:
+        # deep pauses would dominate the steps; clip them a little below the threshold
+        speech &= _modulation(np.maximum(energy, threshold - 20.0), _MODULATION_FRAMES) >= min_modulation_db
+
+    runs: List[List[int]] = []
+    for start, end in _runs(speech):
+        if runs and start - runs[-1][1] < min_silence_ms / _FRAME_MS:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+
+    pad = int(pad_ms / _FRAME_MS)
+    regions: List[Region] = []
+    for start, end in runs:
+        if end - start < min_speech_ms / _FRAME_MS:
+            continue
+        start, end = max(0, start - pad) * FRAME, min(len(audio), (end + pad) * FRAME)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def clip(regions: Sequence[Region], start: int, end: int) -> List[Region]:
+    """The parts of `regions` inside [start, end), relative to `start` (for windowed transcription)."""
+    return [(max(s, start) - start, min(e, end) - start) for s, e in regions if e > start and s < end]
+
+
+# ======================================================
+# ✂️ Speech-only audio + time mapping
+# ======================================================
+class TimeMap:
+    """Maps times in the compacted audio back to the original recording."""
+
+    def __init__(self, pieces: List[Tuple[float, float, float]]):
+        self.pieces = pieces  # (start in compacted audio, start in original, length), seconds
+        self._starts = [p[0] for p in pieces]
+
+    def to_original(self, t: float, is_start: bool = False) -> float:
+        i = max(0, bisect.bisect_right(self._starts, t) - 1)
+        compact_start, original_start, length = self.pieces[i]
+        offset = t - compact_start
+        if offset > length and is_start and i + 1 < len(self.pieces):
+            return self.pieces[i + 1][1]  # starts inside the inserted pause belong to the next region
+        return original_start + min(max(offset, 0.0), length)
+
+    def restore(self, result: Dict) -> Dict:
+        """Rewrite segment and word times of a Whisper result in place."""
+        for seg in result.get("segments", []):
+            seg["start"] = round(self.to_original(seg["start"], is_start=True), 3)
+            seg["end"] = max(seg["start"], round(self.to_original(seg["end"]), 3))
+            for word in seg.get("words") or []:
+                word["start"] = round(self.to_original(word["start"], is_start=True), 3)
+                word["end"] = max(word["start"], round(self.to_original(word["end"]), 3))
+        return result
+
+
+def compact(audio: np.ndarray, regions: Sequence[Region], gap_ms: float = VAD_GAP_MS) -> Tuple[np.ndarray, TimeMap]:
+    """Concatenate the regions with short pauses between them, so Whisper still sees sentence breaks."""
+    gap = np.zeros(int(gap_ms * SAMPLE_RATE / 1000), dtype="float32")
+    parts, pieces, pos = [], [], 0
+    for start, end in regions:
+        if parts:
+            parts.append(gap)
+            pos += len(gap)
+        pieces.append((pos / SAMPLE_RATE, start / SAMPLE_RATE, (end - start) / SAMPLE_RATE))
+        parts.append(np.asarray(audio[start:end], dtype="float32"))
+        pos += end - start
+    return np.concatenate(parts), TimeMap(pieces)
+
+
+def transcribe_speech(model, audio: np.ndarray, regions: Optional[Sequence[Region]] = None, **kwargs) -> Dict:
+    """
+    model.transcribe(audio, **kwargs) on the speech regions only, with times
+    in original-audio seconds. `regions` skips detection (an empty list means
+    "no speech here": nothing is transcribed).
+    """
+    if not VAD_ENABLED:
+        return model.transcribe(audio, **kwargs)
+    if regions is None:
+        with track_stage("vad"):
+            regions = speech_regions(audio)
+        if not regions:
+            logger.info("vad_no_speech_detected", extra={"seconds": round(len(audio) / SAMPLE_RATE, 1)})
+            return model.transcribe(audio, **kwargs)
+    if not regions:
+        return {"text": "", "segments": [], "language": None}
+
+    speech = sum(end - start for start, end in regions)
+    SPEECH_RATIO.observe(speech / max(1, len(audio)))
+    if speech >= VAD_MAX_SPEECH_RATIO * len(audio):
+        return model.transcribe(audio, **kwargs)
+
+    speech_audio, time_map = compact(audio, regions)
+    SKIPPED_SECONDS.inc((len(audio) - speech) / SAMPLE_RATE)
+    logger.info("vad_trimmed", extra={
+        "seconds": round(len(audio) / SAMPLE_RATE, 1), "speech_s": round(speech / SAMPLE_RATE, 1), "regions": len(regions),
+    })
+    return time_map.restore(model.transcribe(speech_audio, **kwargs))
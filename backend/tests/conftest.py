@@ -0,0 +1,16 @@
+# tests/conftest.py
+import pytest
+
+
+@pytest.fixture
+def fixture_env(monkeypatch, tmp_path):
+    """Run in tmp_path with instant fixture downloads and the canned Whisper."""
+    # imported here so modules that do not use it still collect without numpy
+    from services import audio_download, fixture_backends, model_registry
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fixture_backends, "FIXTURE_DOWNLOAD_MS", 0)
+    monkeypatch.setattr(audio_download, "DOWNLOAD_BACKEND", "fixture")
+    monkeypatch.setitem(audio_download._backends, "fixture", fixture_backends.fixture_download)
+    monkeypatch.setattr(model_registry, "get_whisper", lambda name: fixture_backends.FixtureWhisper(latency_ms=0))
+    return tmp_path
@@ -0,0 +1,46 @@
+# tests/test_admission.py
+import asyncio
+import pytest
+from api.admission import AdmissionController, Lane, Rejected
+
+def _controller():
+    return AdmissionController([
+        Lane("qa", limit=4, queue_limit=4, queue_timeout=1, priority=0, interactive=True),
+        Lane("ingest", limit=4, queue_limit=1, queue_timeout=1, priority=1),
+    ], total_slots=4, reserved_interactive=2)
+
+def test_batch_cannot_use_reserved_interactive_slots():
+    async def scenario():
+        ctl = _controller()
+        await ctl.acquire("ingest")
+        await ctl.acquire("ingest")
+        # third ingest request must queue: the remaining 2 slots are reserved for QA
+        waiter = asyncio.ensure_future(ctl.acquire("ingest"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await ctl.acquire("qa")
+        await ctl.acquire("qa")
+        # queue holds one ingest request, the next is rejected
+        with pytest.raises(Rejected):
+            await ctl.acquire("ingest")
+        ctl.release("ingest")
+        await waiter
+        assert ctl.lanes["ingest"].in_flight == 2
+    asyncio.run(scenario())
+
+def test_freed_slot_goes_to_interactive_first():
+    async def scenario():
+        ctl = AdmissionController([
+            Lane("qa", limit=1, queue_limit=4, queue_timeout=1, priority=0, interactive=True),
+            Lane("ingest", limit=1, queue_limit=4, queue_timeout=1, priority=1),
+        ], total_slots=1, reserved_interactive=0)
+        await ctl.acquire("qa")
+        batch = asyncio.ensure_future(ctl.acquire("ingest"))
+        qa = asyncio.ensure_future(ctl.acquire("qa"))
+        await asyncio.sleep(0)
+        ctl.release("qa")
+        await qa
+        assert not batch.done()
+        ctl.release("qa")
+        await batch
+    asyncio.run(scenario())
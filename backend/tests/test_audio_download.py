@@ -0,0 +1,43 @@
+# tests/test_audio_download.py
+import os
+import wave
+
+import numpy as np
+
+from services import audio_download
+
+
+def _write_wav(path, samples, rate=8000, channels=1):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+
+
+def test_decode_wav_resamples_to_16k_float32(tmp_path):
+    path = str(tmp_path / "a.wav")
+    _write_wav(path, [16384] * 8000, rate=8000)  # 1 s at 8 kHz, half scale
+
+    audio = audio_download._decode_wav(path)
+    assert audio.dtype == np.float32
+    assert len(audio) == 16000
+    assert np.allclose(audio, 0.5)
+
+
+def test_open_audio_removes_job_dir(tmp_path, monkeypatch):
+    def fake_backend(url, out_dir, convert=True):
+        path = os.path.join(out_dir, "vid.wav")
+        _write_wav(path, [0] * 1600, rate=16000)
+        return path, {"id": "vid", "duration": 0.1}
+
+    monkeypatch.setitem(audio_download._backends, "test", fake_backend)
+    monkeypatch.setattr(audio_download, "DOWNLOAD_BACKEND", "test")
+    monkeypatch.setattr(audio_download, "FFMPEG_BIN", "ffmpeg-not-installed")
+
+    out_dir = str(tmp_path / "tmp")
+    with audio_download.open_audio("https://youtu.be/vid", out_dir=out_dir) as (audio, info):
+        assert info["id"] == "vid"
+        assert len(audio) == 1600
+        assert len(os.listdir(out_dir)) == 1
+    assert os.listdir(out_dir) == []
@@ -0,0 +1,47 @@
+# tests/test_bulk_ingest.py
+import json
+
+import pytest
+
+from services import bulk_ingest, stub_models
+from services.embeddings_index import FaissIndexManager
+
+stub_models.install()
+
+
+def test_expand_sources_dedupes_and_walks_folders(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    (tmp_path / "notes.md").write_text("skipped")
+    items = bulk_ingest.expand_sources(["https://youtu.be/x", "https://youtu.be/x"], directory=str(tmp_path))
+
+    assert [i["kind"] for i in items] == ["video", "file"]
+    assert items[1]["doc_id"].startswith("file_")
+    assert bulk_ingest.default_job_id(items) == bulk_ingest.default_job_id(list(reversed(items)))
+
+
+def test_run_bulk_pipelines_videos_and_files_and_resumes(fixture_env):
+    docs = fixture_env / "docs"
+    docs.mkdir()
+    (docs / "notes.txt").write_text("Bulk ingestion indexes local folders too. " * 20)
+    items = bulk_ingest.expand_sources(["https://youtu.be/bulk00001", "https://youtu.be/bulk00002"], directory=str(docs))
+
+    job = bulk_ingest.run_bulk(bulk_ingest.BulkJob("t1", items), parse_workers=0, fetch_workers=2, embed_batch=4)
+
+    assert job.state == "done" and job.counts["failed"] == 0, job.failures
+    assert job.counts["indexed"] == 3
+    fm = FaissIndexManager()
+    assert fm.search("bulk00002", "Fixture sentence 1", top_k=1)
+    with open("data/bulk/t1.jsonl", encoding="utf-8") as f:
+        assert {json.loads(line)["status"] for line in f} == {"done"}
+
+    # a second run with the same id only picks up what is new
+    items.append({"source": "https://youtu.be/bulk00003", "kind": "video", "doc_id": None})
+    again = bulk_ingest.run_bulk(bulk_ingest.BulkJob("t1", items), parse_workers=0)
+    assert again.counts["skipped"] == 3 and again.counts["indexed"] == 1
+
+
+@pytest.mark.parametrize("job_id", ["../faiss_index", "/home", "..", "a/b", "", "x" * 65])
+def test_job_ids_that_could_leave_the_work_dirs_are_rejected(job_id):
+    with pytest.raises(ValueError):
+        bulk_ingest.start_bulk(["https://youtu.be/x"], job_id=job_id)
+    assert bulk_ingest.get_job(job_id) is None
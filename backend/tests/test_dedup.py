@@ -0,0 +1,66 @@
+# tests/test_dedup.py
+import numpy as np
+
+from services import dedup, stub_models
+from services.dedup import Deduper
+from services.embeddings_index import FaissIndexManager, load_cached_index
+from services.rag import _source
+
+stub_models.install()
+
+SPONSOR = ("This video is sponsored by Acme VPN which keeps your browsing private on every device "
+           "and you can get two months free with the link below")
+
+
+def _meta(texts, first=0):
+    return [{"chunk_text": t, "start": (first + i) * 10.0, "end": (first + i + 1) * 10.0} for i, t in enumerate(texts)]
+
+
+def test_build_folds_exact_and_near_copies_and_keeps_their_timestamps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    texts = [
+        SPONSOR,
+        "Gradient descent follows the slope of the loss to update every weight.",
+        SPONSOR.upper().replace(" which", ", which"),   # same words, different case / punctuation
+        "Kubernetes schedules containers onto nodes and restarts them when they fail.",
+        SPONSOR + " today",                              # one extra word
+    ]
+    fm = FaissIndexManager(index_dir=str(tmp_path))
+    fm.build_index("vid", texts, _meta(texts))
+
+    index, metas = load_cached_index("vid", index_dir=str(tmp_path))
+    assert index.ntotal == 3
+    assert [m["chunk_id"] for m in metas] == [0, 1, 2]
+    assert metas[0]["duplicates"] == [{"start": 20.0, "end": 30.0}, {"start": 40.0, "end": 50.0}]
+
+    # appended chunks are compared with what the index already holds
+    added = fm.append_chunks("vid", [SPONSOR, "Docker images bundle an app with its dependencies."],
+                             _meta([SPONSOR, "Docker images bundle an app with its dependencies."], first=5))
+    assert added == [3]
+    _, metas = load_cached_index("vid", index_dir=str(tmp_path))
+    assert {"start": 50.0, "end": 60.0} in metas[0]["duplicates"]
+
+    hit = fm.search("vid", "sponsored vpn two months free", top_k=1)[0]
+    assert [a["start"] for a in _source(hit)["also_at"]] == [20.0, 40.0, 50.0]
+
+
+def test_similar_vectors_with_different_wording_are_kept():
+    texts = ["The cache keeps recent indexes in memory.", "Loaded indexes stay resident for reuse."]
+    d = Deduper(similarity=0.9)
+    keep, records = d.exact(texts, _meta(texts))
+    assert keep == [0, 1]
+    same = np.ones((2, 8), dtype="float32")  # identical embeddings, little word overlap
+    assert d.near(texts, records, same) == [0, 1]
+    assert d.dropped == {"exact": 0, "near": 0}
+
+
+def test_near_copies_are_found_across_blocks(monkeypatch):
+    monkeypatch.setattr(dedup, "_NEAR_BLOCK", 2)
+    texts = [SPONSOR, "Gradient descent updates every weight.", "Kubernetes restarts failed containers.",
+             SPONSOR + " today"]
+    vectors = np.eye(4, dtype="float32")
+    vectors[3] = vectors[0]  # the copy lands in the second block, after the first joined the index
+    d = Deduper()
+    keep, records = d.exact(texts, _meta(texts))
+    assert d.near(texts, records, vectors) == [0, 1, 2]
+    assert records[0]["duplicates"] == [{"start": 30.0, "end": 40.0}]
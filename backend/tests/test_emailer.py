@@ -0,0 +1,36 @@
+# tests/test_emailer.py
+import smtplib
+import time
+from api.services.emailer import StandInSMTP, PooledSMTPSender, EmailQueue, _build_message
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not cond():
+        time.sleep(0.01)
+    return cond()
+
+def test_queue_reuses_one_connection():
+    StandInSMTP.reset()
+    q = EmailQueue(PooledSMTPSender(connection_factory=StandInSMTP))
+    for i in range(3):
+        assert q.enqueue(_build_message(f"user{i}@example.com", "hi", "body"))
+    assert _wait_for(lambda: len(StandInSMTP.outbox) == 3)
+    assert StandInSMTP.connections == 1
+    q.stop()
+
+def test_transient_failure_is_retried():
+    StandInSMTP.reset()
+    calls = {"n": 0}
+
+    class Flaky(StandInSMTP):
+        def send_message(self, msg):
+            calls["n"] += 1
+            if calls["n"] <= 2:
+                raise smtplib.SMTPServerDisconnected("dropped")
+            return super().send_message(msg)
+
+    q = EmailQueue(PooledSMTPSender(connection_factory=Flaky), backoff_base=0.01)
+    q.enqueue(_build_message("user@example.com", "hi", "body"))
+    assert _wait_for(lambda: len(StandInSMTP.outbox) == 1)
+    assert q.failed == 0
+    q.stop()
@@ -0,0 +1,58 @@
+# tests/test_embeddings_index.py
+import os
+import pickle
+
+import faiss
+import numpy as np
+
+from services import stub_models
+from services.embeddings_index import FaissIndexManager, load_cached_index, index_version
+
+stub_models.install()
+
+
+def _meta(texts):
+    return [{"chunk_text": t, "start": i, "end": i + 1} for i, t in enumerate(texts)]
+
+
+def test_append_delete_replace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fm = FaissIndexManager(index_dir=str(tmp_path))
+    texts = ["alpha apples", "bravo bananas", "charlie cherries"]
+    fm.build_index("doc", texts, _meta(texts))
+    v1 = index_version(str(tmp_path / "doc"))
+
+    assert fm.append_chunks("doc", ["delta dates"], _meta(["delta dates"])) == [3]
+    assert fm.delete_chunks("doc", [1]) == 1
+    fm.replace_chunks("doc", [0], ["echo eggplant"], _meta(["echo eggplant"]))
+
+    index, metas = load_cached_index("doc", index_dir=str(tmp_path))
+    assert index.ntotal == 3
+    assert [m["chunk_id"] for m in metas] == [0, 2, 3]
+    assert metas[0]["chunk_text"] == "echo eggplant"
+    assert fm.search("doc", "eggplant", top_k=1)[0]["chunk_id"] == 0
+    assert fm.search("doc", "bananas", top_k=3)[0]["chunk_id"] != 1
+    assert index_version(str(tmp_path / "doc")) != v1
+    # only the live version and its predecessor are kept
+    assert len([d for d in os.listdir(tmp_path / "doc") if d.startswith("v")]) == 2
+
+
+def test_legacy_flat_folder_is_read_and_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "old"
+    folder.mkdir()
+    texts = ["legacy one", "legacy two"]
+    vectors = stub_models.StubEmbedder().encode(texts)
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(np.asarray(vectors, dtype="float32"))
+    faiss.write_index(flat, str(folder / "index.faiss"))
+    with open(folder / "meta.pkl", "wb") as f:
+        pickle.dump(_meta(texts), f)
+
+    fm = FaissIndexManager(index_dir=str(tmp_path))
+    assert fm.search("old", "two", top_k=1)[0]["chunk_text"] == "legacy two"
+
+    fm.append_chunks("old", ["legacy three"], _meta(["legacy three"]))
+    assert not (folder / "index.faiss").exists()
+    _, metas = load_cached_index("old", index_dir=str(tmp_path))
+    assert [m["chunk_id"] for m in metas] == [0, 1, 2]
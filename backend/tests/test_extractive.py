@@ -0,0 +1,55 @@
+# tests/test_extractive.py
+import numpy as np
+
+from services import dedup, stub_models
+from services.embeddings_index import FaissIndexManager, load_chunk_vectors
+from services.extractive import select_sections
+from services.summarize import generate_summary_json
+
+stub_models.install()
+
+TOPICS = [
+    "Gradient descent updates the weights. The learning rate controls each gradient step. Momentum smooths noisy gradient updates.",
+    "Docker images package the service. Kubernetes schedules the docker containers. Deployment rollouts replace containers gradually.",
+]
+
+
+def _doc(per_topic=6):
+    texts, metas = [], []
+    for t, text in enumerate(TOPICS):
+        for i in range(per_topic):
+            start = (t * per_topic + i) * 30.0
+            texts.append(text)
+            metas.append({"chunk_text": text, "start": start, "end": start + 30.0})
+    return texts, metas
+
+
+def test_sections_follow_topics_and_respect_budget():
+    texts, metas = _doc()
+    vectors = np.zeros((len(texts), 4), dtype="float32")
+    vectors[:6, 0] = 1.0
+    vectors[6:, 1] = 1.0
+
+    sections = select_sections(metas, vectors, max_sections=2, budget_chars=400)
+
+    assert [(s["start"], s["end"]) for s in sections] == [(0.0, 180.0), (180.0, 360.0)]
+    assert "gradient" in sections[0]["keywords"] and "containers" in sections[1]["keywords"]
+    assert sum(len(x) for s in sections for x in s["sentences"]) <= 400
+    assert all(len(set(s["sentences"])) == len(s["sentences"]) for s in sections)
+
+
+def test_summary_uses_stored_vectors_and_builds_outline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dedup, "DEDUP_ENABLED", False)  # the fixture repeats each topic verbatim
+    texts, metas = _doc()
+    FaissIndexManager().build_index("vid_sections", texts, metas)
+    FaissIndexManager().delete_chunks("vid_sections", [0])
+
+    meta, vectors = load_chunk_vectors("vid_sections")
+    assert len(meta) == vectors.shape[0] == len(texts) - 1
+    assert np.allclose(vectors[0], stub_models.StubEmbedder().encode([meta[0]["chunk_text"]])[0], atol=1e-5)
+
+    summary = generate_summary_json("vid_sections", max_sections=2)
+    assert len(summary["outline"]) == 2
+    assert summary["outline"][0]["timestamp"].startswith("00:30")
+    assert all(o["bullets"] for o in summary["outline"])
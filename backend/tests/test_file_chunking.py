@@ -0,0 +1,59 @@
+# tests/test_file_chunking.py
+import csv
+import tracemalloc
+
+import pytest
+
+from services.chunking import chunk_csv, chunk_docx, document_chunks
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "city", "notes"])
+        for i in range(rows):
+            w.writerow([i, f"city{i % 7}", f"note number {i} about the shipment"])
+    return str(path)
+
+
+def test_csv_chunks_keep_column_names_and_row_ranges(tmp_path):
+    path = _write_csv(tmp_path / "data.csv", 40)
+
+    chunks = list(chunk_csv(path, max_chars=400))
+
+    text, meta = chunks[0]
+    assert text.splitlines()[0] == "id: 0; city: city0; notes: note number 0 about the shipment"
+    assert meta["columns"] == ["id", "city", "notes"] and meta["row_start"] == 2
+    assert [m["row_start"] for _, m in chunks[1:]] == [m["row_end"] + 1 for _, m in chunks[:-1]]
+    assert chunks[-1][1]["row_end"] == 41
+
+
+def test_csv_chunking_memory_does_not_grow_with_the_file(tmp_path):
+    path = _write_csv(tmp_path / "big.csv", 60000)
+
+    tracemalloc.start()
+    count = sum(1 for _ in document_chunks(path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count > 100
+    assert peak < 4 * 1024 * 1024  # the file itself is ~3.5 MB; its rows as lists would be far larger
+
+
+def test_docx_paragraphs_are_grouped_under_their_heading(tmp_path):
+    docx = pytest.importorskip("docx")
+    doc = docx.Document()
+    doc.add_heading("Setup", level=1)
+    doc.add_paragraph("Install the package.")
+    doc.add_heading("Caching", level=2)
+    doc.add_paragraph("Indexes are cached per process.")
+    doc.add_paragraph("Entries are validated by version.")
+    doc.add_heading("Usage", level=1)
+    doc.add_paragraph("Call the API.")
+    doc.save(tmp_path / "guide.docx")
+
+    chunks = list(chunk_docx(str(tmp_path / "guide.docx")))
+
+    assert [m["heading"] for _, m in chunks] == ["Setup", "Setup > Caching", "Usage"]
+    assert chunks[1][0] == "Setup > Caching\nIndexes are cached per process.\nEntries are validated by version."
+    assert (chunks[1][1]["para_start"], chunks[1][1]["para_end"]) == (3, 4)
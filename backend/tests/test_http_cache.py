@@ -0,0 +1,106 @@
+# tests/test_http_cache.py
+import asyncio
+import gzip
+import json
+import os
+import shutil
+
+import numpy as np
+
+from api import http_cache
+from services import model_registry
+from services.embeddings_index import CURRENT_FILE, META_FILE
+
+
+def _run(app, headers):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    asyncio.run(http_cache.CompressionMiddleware(app, min_bytes=100)(scope, receive, send))
+    return dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def _json_app(payload: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+            (b"etag", b'"abc"'),
+        ]})
+        await send({"type": "http.response.body", "body": payload})
+    return app
+
+
+def test_large_json_is_gzipped_and_small_bodies_are_not():
+    payload = json.dumps({"summary": "words " * 200}).encode()
+    headers, body = _run(_json_app(payload), [(b"accept-encoding", b"gzip, deflate")])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"etag"] == b'"abc-gzip"'
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(body) < len(payload)
+    assert gzip.decompress(body) == payload
+
+    headers, body = _run(_json_app(b'{"ok":true}'), [(b"accept-encoding", b"gzip")])
+    assert b"content-encoding" not in headers and body == b'{"ok":true}'
+
+    headers, body = _run(_json_app(payload), [(b"accept-encoding", b"gzip;q=0")])
+    assert b"content-encoding" not in headers and body == payload
+
+
+def test_etag_follows_the_index_version_and_ignores_the_coding_suffix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert http_cache.document_etag("vid", "summary") is None  # no index yet: nothing to validate
+
+    folder = os.path.join("faiss_index", "vid")
+    os.makedirs(folder)
+    with open(os.path.join(folder, CURRENT_FILE), "w") as f:
+        f.write("v000001")
+    first = http_cache.document_etag("vid", "summary")
+    assert first == http_cache.document_etag("vid", "summary")
+    assert first != http_cache.document_etag("vid", "rag", "what is it?", 5)
+
+    assert http_cache.matches(first[:-1] + '-gzip"', first)
+    assert http_cache.matches(f'"other", W/{first}', first)
+    assert not http_cache.matches('"other"', first)
+
+    with open(os.path.join(folder, CURRENT_FILE), "w") as f:
+        f.write("v000002")  # appended chunks: every cached copy is stale
+    assert not http_cache.matches(first, http_cache.document_etag("vid", "summary"))
+
+
+def _write_version(folder, tag, meta=b"meta"):
+    os.makedirs(os.path.join(folder, tag))
+    with open(os.path.join(folder, tag, META_FILE), "wb") as f:
+        f.write(meta)
+    with open(os.path.join(folder, CURRENT_FILE), "w") as f:
+        f.write(tag)
+
+
+def test_etag_changes_after_reingest_and_with_the_loaded_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = os.path.join("faiss_index", "vid")
+    _write_version(folder, "v000001")
+    first = http_cache.summary_etag("vid", 5)
+    assert first == http_cache.summary_etag("vid", 5)
+
+    shutil.rmtree(folder)  # evicted, then ingested again: the version tag starts over
+    _write_version(folder, "v000001", meta=b"rebuilt meta")
+    assert http_cache.summary_etag("vid", 5) != first
+
+    current = http_cache.summary_etag("vid", 5)
+    monkeypatch.setitem(model_registry._variant_of, "summarizer", "facebook/bart-base")
+    assert http_cache.summary_etag("vid", 5) != current
+
+    answer = http_cache.answer_etag("vid", "what?", 5)
+    monkeypatch.setitem(model_registry._variant_of, "rag", "google/flan-t5-small")  # downgraded under pressure
+    assert http_cache.answer_etag("vid", "what?", 5) != answer
+
+
+def test_json_renderer_handles_numpy_values():
+    body = http_cache.FastJSONResponse({"score": np.float32(0.5), "ids": np.arange(2)}).body
+    assert json.loads(body) == {"score": 0.5, "ids": [0, 1]}
@@ -0,0 +1,45 @@
+# tests/test_memory_governor.py
+import pytest
+from services.memory_governor import MemoryGovernor, AdmissionTimeout
+
+MB = 1024 ** 2
+
+def test_admit_evicts_least_recently_used():
+    gov = MemoryGovernor(budget_bytes=100 * MB, reserve_bytes=0)
+    unloaded = []
+    gov.track("old", 40 * MB, unload=lambda: unloaded.append("old"))
+    gov.track("new", 40 * MB, unload=lambda: unloaded.append("new"))
+    gov.touch("old")  # "new" is now the coldest
+
+    with gov.admit("rag", estimate=50 * MB):
+        assert unloaded == ["new"]
+    assert gov.tracked_bytes() == 40 * MB
+
+def test_admit_times_out_when_pinned_items_fill_budget():
+    gov = MemoryGovernor(budget_bytes=100 * MB, reserve_bytes=0)
+    gov.track("model", 60 * MB, unload=lambda: None)
+    with gov.pin("model"), gov.admit("summarize", estimate=30 * MB):
+        with pytest.raises(AdmissionTimeout):
+            with gov.admit("summarize", estimate=30 * MB, timeout=0.05):
+                pass
+
+def test_choose_variant_falls_back_to_smaller_model():
+    gov = MemoryGovernor(budget_bytes=1000 * MB, reserve_bytes=0)
+    gov.track("pinned", 800 * MB)  # no unload callback: cannot be evicted
+    chosen = gov.choose_variant("summarizer", [("large", 500 * MB), ("small", 150 * MB)])
+    assert chosen == "small"
+    assert gov.decisions[-1]["action"] == "downgrade"
+
+def test_models_in_use_are_not_evicted():
+    from services import model_registry, stub_models
+    from services.memory_governor import governor
+
+    loads = []
+    model_registry.override("summarizer", lambda variant: loads.append(variant) or stub_models.StubSummarizer())
+    try:
+        with model_registry.use("summarizer") as summarizer:
+            governor.make_room(governor.headroom() + 1, reason="test")  # evicts everything it may
+            assert model_registry.get("summarizer") is summarizer
+        assert len(loads) == 1
+    finally:
+        stub_models.install()
@@ -0,0 +1,18 @@
+# tests/test_metrics.py
+from services.metrics import MetricsRegistry
+
+def test_prometheus_rendering():
+    reg = MetricsRegistry()
+    c = reg.counter("jobs_total", "Jobs run.", ("stage",))
+    h = reg.histogram("job_seconds", "Job time.", ("stage",), buckets=(0.1, 1.0))
+    c.inc(stage="embedding")
+    c.inc(2, stage="embedding")
+    h.observe(0.05, stage="embedding")
+    h.observe(5.0, stage="embedding")
+
+    text = reg.render()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{stage="embedding"} 3' in text
+    assert 'job_seconds_bucket{stage="embedding",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{stage="embedding",le="+Inf"} 2' in text
+    assert 'job_seconds_count{stage="embedding"} 2' in text
@@ -0,0 +1,87 @@
+# tests/test_model_server.py
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from services import model_registry, model_server, stub_models
+
+stub_models.install()
+
+
+@pytest.fixture
+def server():
+    srv = model_server.ModelServer(("127.0.0.1", 0), authkey=b"test", wait_ms=50)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.close()
+
+
+def test_embeddings_come_back_through_shared_memory(server):
+    client = model_server.ModelClient([server.address], authkey=b"test", shm_min_bytes=0)
+    texts = [f"chunk number {i} about caching" for i in range(50)]
+
+    vectors = model_server.RemoteEmbedder(client).encode(texts)
+
+    assert vectors.shape == (50, 384)
+    assert np.allclose(vectors, stub_models.StubEmbedder().encode(texts))
+    client.close()
+
+
+def test_concurrent_requests_are_batched_into_one_model_call(server):
+    calls = []
+
+    class Counting(stub_models.StubSummarizer):
+        def __call__(self, inputs, **kwargs):
+            calls.append(len(inputs))
+            return super().__call__(inputs, **kwargs)
+
+    model_registry.override("summarizer", lambda variant: Counting())
+    client = model_server.ModelClient([server.address], authkey=b"test")
+    remote = model_server.RemoteSummarizer(client)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: remote(f"Topic {i} first. Topic {i} second. Third.", max_length=50), range(8)))
+
+    assert [r[0]["summary_text"] for r in results] == [f"Topic {i} first. Topic {i} second." for i in range(8)]
+    assert sum(calls) == 8 and len(calls) < 8
+    stub_models.install()
+
+
+def test_server_errors_surface_as_remote_model_error(server):
+    client = model_server.ModelClient([server.address], authkey=b"test")
+    with pytest.raises(model_server.RemoteModelError):
+        client.call("nope")
+
+
+def test_silent_clients_and_malformed_requests_do_not_block_others(server):
+    silent = socket.create_connection(server.address)  # connects, never answers the auth challenge
+    client = model_server.ModelClient([server.address], authkey=b"test")
+    try:
+        with pytest.raises(model_server.RemoteModelError):
+            client.call("summarize", {"kwargs": {}})  # no "inputs"
+        assert "summary_text" in client.call("summarize", {"inputs": ["One. Two."], "kwargs": {}})[0]
+    finally:
+        silent.close()
+        client.close()
+
+
+def test_no_default_key_and_private_unix_socket(tmp_path, monkeypatch):
+    monkeypatch.delenv("MODEL_SERVER_AUTHKEY", raising=False)
+    with pytest.raises(ValueError):
+        model_server.ModelClient(["127.0.0.1:9"], authkey=b"")
+    with pytest.raises(ValueError):
+        model_server.ModelServer(("127.0.0.1", 0), authkey="")
+
+    path = str(tmp_path / "models.sock")
+    srv = model_server.ModelServer(path, authkey=b"test")
+    try:
+        assert os.stat(path).st_mode & 0o777 == 0o600
+    finally:
+        srv.close()
+
+    with pytest.raises(SystemExit):  # TCP without an explicit key
+        model_server.main(["--address", "127.0.0.1:0"])
@@ -0,0 +1,39 @@
+# tests/test_parallel_embed.py
+import numpy as np
+
+from services import parallel_embed, stub_models
+from services.embeddings_index import FaissIndexManager
+from services.parallel_embed import ParallelEncoder, length_sorted_batches
+
+stub_models.install()
+
+
+def test_length_sorted_batches_cover_every_index_once():
+    texts = ["a" * n for n in (5, 1, 9, 3, 7)]
+    batches = length_sorted_batches(texts, batch_size=2)
+    assert [list(b) for b in batches] == [[2, 4], [0, 3], [1]]
+
+
+def test_parallel_encode_restores_original_order(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")  # spawned workers load the stub embedder
+    texts = [f"chunk {i} " + "word " * (i % 13) for i in range(200)]
+    encoder = ParallelEncoder(workers=2, batch_size=16)
+    try:
+        vectors = encoder.encode(texts)
+    finally:
+        encoder.shutdown()
+    assert np.allclose(vectors, stub_models.StubEmbedder().encode(texts), atol=1e-6)
+
+
+def test_pool_shut_down_under_a_build_falls_back_to_in_process(monkeypatch):
+    encoder = ParallelEncoder(workers=2)
+    pool = encoder._ensure_pool()
+    encoder._drop_pool()  # evicted by the governor between _ensure_pool and map
+    monkeypatch.setattr(encoder, "_ensure_pool", lambda: pool)
+    monkeypatch.setattr(parallel_embed, "get_encoder", lambda: encoder)
+    texts = ["alpha", "bravo", "charlie"]
+    try:
+        vectors = FaissIndexManager()._embed(texts, parallel=True)
+    finally:
+        encoder.shutdown()
+    assert np.allclose(vectors, stub_models.StubEmbedder().encode(texts), atol=1e-6)
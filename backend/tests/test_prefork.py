@@ -0,0 +1,36 @@
+# tests/test_prefork.py
+import gc
+import os
+
+from api import prefork
+from services import embeddings_index, model_registry, stub_models
+from services.embeddings_index import FaissIndexManager
+from services.storage import artifacts
+
+stub_models.install()
+
+
+def test_preload_warms_recent_indexes_and_skips_remote_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fm = FaissIndexManager()
+    for doc_id in ("cold", "hot"):
+        fm.build_index(doc_id, [f"{doc_id} text"], [{"chunk_text": f"{doc_id} text", "start": 0, "end": 1}])
+    monkeypatch.setattr(artifacts, "recently_accessed", lambda limit: ["hot", "missing"][:limit])
+    embeddings_index._index_cache.clear()
+    model_registry.override("summarizer", lambda variant: stub_models.StubSummarizer(), remote=True)
+    try:
+        timings = prefork.preload(["embedder", "summarizer"], warm_indexes=2)
+    finally:
+        stub_models.install()
+
+    assert "embedder" in timings and "summarizer" not in timings
+    assert list(embeddings_index._index_cache) == [os.path.join("faiss_index", "hot")]
+
+
+def test_freeze_moves_objects_to_the_permanent_generation():
+    before = gc.get_freeze_count()
+    prefork.freeze()
+    try:
+        assert gc.get_freeze_count() > before
+    finally:
+        gc.unfreeze()
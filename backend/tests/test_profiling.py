@@ -0,0 +1,104 @@
+# tests/test_profiling.py
+import contextvars
+import threading
+
+import pytest
+
+from services import profiling
+from services.profiling import MemoryTracer, RequestProfiler
+
+
+def _spin_here(stop):
+    while not stop.is_set():
+        sum(range(500))
+
+
+def test_sample_stacks_sees_busy_thread_and_skips_idle():
+    stop = threading.Event()
+    busy = threading.Thread(target=_spin_here, args=(stop,), name="busy-worker")
+    parked = threading.Thread(target=stop.wait, name="parked-worker")
+    busy.start()
+    parked.start()
+    try:
+        stacks = profiling.sample_stacks(0.2, interval_s=0.002)
+    finally:
+        stop.set()
+        busy.join()
+        parked.join()
+
+    text = profiling.collapsed(stacks)
+    busy_lines = [line for line in text.splitlines() if line.startswith("busy-worker;")]
+    assert busy_lines and all("_spin_here (test_profiling.py:" in line for line in busy_lines)
+    assert not any(line.startswith("parked-worker;") for line in text.splitlines())
+    assert int(busy_lines[0].rsplit(" ", 1)[1]) >= 1
+
+
+def test_request_rule_matches_route_and_header_then_expires():
+    rp = RequestProfiler()
+    assert not rp.armed
+    with pytest.raises(ValueError):
+        rp.arm()
+
+    rp.arm(route="/rag/", header="X-Profile", count=2)
+    assert not rp.claim("/summarize/abc", {"x-profile": "1"})
+    assert not rp.claim("/rag/query", {})
+    assert rp.claim("/rag/query", {"x-profile": "1"})
+    assert rp.claim("/rag/query", {"x-profile": "1"})
+    assert not rp.armed  # count used up
+    assert not rp.claim("/rag/query", {"x-profile": "1"})
+
+    rp.arm(route="/rag/", ttl_s=-1)
+    assert not rp.claim("/rag/query", {})
+    assert not rp.armed
+
+
+def test_instrumented_sync_endpoint_profiles_only_inside_request():
+    def endpoint(n: int):
+        return sum(range(n))
+
+    wrapped = profiling._profiled(endpoint)
+    assert wrapped(10) == 45  # no profile armed: plain call
+
+    rp = RequestProfiler()
+    results = {}
+
+    def request():
+        profile = profiling.start_request_profile()
+        # the threadpool runs sync endpoints in a copy of the request's context
+        ctx = contextvars.copy_context()
+        worker = threading.Thread(target=ctx.run, args=(lambda: results.update(value=wrapped(1000)),))
+        worker.start()
+        worker.join()
+        return rp.record(profile, "GET", "/rag/query", 200, 0.01)
+
+    entry = contextvars.copy_context().run(request)
+    assert results["value"] == 499500
+    report = profiling.render_profile(entry, "cumulative", 10)
+    assert "endpoint" in report
+    assert rp.get(entry["id"]) is entry
+    assert profiling.dump_profile(entry)
+
+    empty = rp.record(profiling.start_request_profile(), "GET", "/missing", 404, 0.0)
+    assert empty["calls"] == 0
+
+
+def test_memory_diff_points_at_growing_line():
+    tracer = MemoryTracer(keep=2)
+    with pytest.raises(RuntimeError):
+        tracer.snapshot("nope")
+    tracer.start(frames=1)
+    try:
+        tracer.snapshot("before")
+        hoard = [bytearray(1024) for _ in range(2000)]
+        tracer.snapshot("after")
+        rows = tracer.diff("before", "after", top=5)
+        assert rows[0]["size_diff_bytes"] >= 2000 * 1024
+        assert rows[0]["where"][0].startswith(__file__.rstrip("c"))
+        with pytest.raises(KeyError):
+            tracer.diff("before", "missing")
+        tracer.snapshot("third")
+        assert [s["label"] for s in tracer.status()["snapshots"]] == ["after", "third"]
+        del hoard
+    finally:
+        tracer.stop()
+    assert not tracer.status()["tracing"]
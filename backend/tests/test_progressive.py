@@ -0,0 +1,56 @@
+# tests/test_progressive.py
+import numpy as np
+
+from services import audio_download, progressive, stub_models
+from services.embeddings_index import FaissIndexManager, load_coverage
+from services.transcript_store import read_transcript
+
+stub_models.install()
+
+
+def test_split_points_cut_at_quiet_frames():
+    rate = audio_download.SAMPLE_RATE
+    audio = np.full(25 * rate, 0.5, dtype="float32")
+    audio[int(8.5 * rate):int(8.6 * rate)] = 0.0  # pause just before the first 10 s boundary
+
+    cuts = progressive.split_points(audio, window_s=10, seek_s=3)
+    assert 8.5 * rate <= cuts[0] < 8.6 * rate
+    assert cuts[-1] == len(audio)
+    assert all(b - a <= 10 * rate for a, b in zip([0] + cuts, cuts))
+
+
+def test_run_progressive_grows_index_window_by_window(fixture_env):
+    job = progressive.run_progressive(progressive.IngestJob("https://youtu.be/progress01"), window_s=15)
+
+    assert job.state == "done", job.error
+    assert job.windows_done == job.windows_total > 1
+    assert job.coverage["complete"] and job.coverage["percent"] == 100.0
+    assert load_coverage("progress01") == job.coverage
+
+    transcript = read_transcript("transcripts/progress01/transcript.tsz")
+    starts = [s["start"] for s in transcript["segments"]]
+    assert starts == sorted(starts) and len(starts) == 12
+    assert FaissIndexManager().search("progress01", "Fixture sentence 11", top_k=1)[0]["start"] >= 45
+
+
+def test_second_job_for_a_running_video_returns_the_running_job(fixture_env, monkeypatch):
+    monkeypatch.setattr(progressive, "_jobs", {})
+
+    running = progressive.IngestJob("https://www.youtube.com/watch?v=progress02")
+    running.video_id, running.state = "progress02", "indexing"
+    progressive._remember(running, running.video_id)
+
+    assert progressive.start_progressive(running.url) is running  # same URL: not even queued
+    job = progressive.run_progressive(progressive.IngestJob("https://youtu.be/progress02"))
+    assert job.state == "duplicate" and job.duplicate_of is running
+    assert progressive.get_job(job.job_id) is running
+    assert not (fixture_env / "transcripts" / "progress02").exists()
+
+    first, second = progressive.IngestJob("https://youtu.be/progress04"), progressive.IngestJob("https://youtu.be/progress04?t=9")
+    first.video_id = second.video_id = "progress04"
+    first.state = second.state = "downloading"
+    assert progressive._claim(first) is None and progressive._claim(second) is first
+
+    queued = progressive.IngestJob("https://youtu.be/progress03")
+    progressive._remember(queued, queued.job_id)
+    assert progressive.get_job(queued.job_id) is queued  # polled by job id until the video id is known
@@ -0,0 +1,35 @@
+# tests/test_retrieval_eval.py
+from benchmarks.retrieval_eval import _mark_frontier, _relevant, score
+
+
+QUESTION = {"doc": "talk", "question": "Why was the cache resized?", "spans": [[10.0, 20.0]], "answers": ["the billing lead"]}
+
+
+def test_relevant_matches_spans_duplicates_and_answers():
+    assert _relevant({"chunk_text": "intro", "start": 0.0, "end": 10.0}, QUESTION) == []  # touching is not overlapping
+    assert _relevant({"chunk_text": "x", "start": 30.0, "end": 40.0, "duplicates": [{"start": 15.0, "end": 16.0}]},
+                     QUESTION) == [0]
+    assert _relevant({"chunk_text": "Ask The billing-lead.", "start": 12.0, "end": 14.0}, QUESTION) == [0, 1]
+
+
+def test_score_recall_and_reciprocal_rank():
+    ranked = [
+        {"chunk_text": "nothing here", "start": 0.0, "end": 5.0},
+        {"chunk_text": "resized at 15 s", "start": 14.0, "end": 18.0},
+        {"chunk_text": "nothing either", "start": 50.0, "end": 55.0},
+        {"chunk_text": "refunds: the billing lead", "start": 60.0, "end": 65.0},
+    ]
+    assert score(ranked, QUESTION, k=1) == (0.0, 0.0)
+    assert score(ranked, QUESTION, k=3) == (0.5, 0.5)
+    assert score(ranked, QUESTION, k=4) == (1.0, 0.5)
+    assert score(ranked, {"question": "nothing expected"}, k=4) == (0.0, 0.0)
+
+
+def test_mark_frontier_keeps_only_undominated_rows():
+    rows = [
+        {"recall": 0.9, "p50_ms": 2.0},  # best recall
+        {"recall": 0.6, "p50_ms": 0.5},  # fastest
+        {"recall": 0.6, "p50_ms": 1.0},  # as good as the fastest on recall, slower
+    ]
+    _mark_frontier(rows)
+    assert [r["frontier"] for r in rows] == [True, True, False]
@@ -0,0 +1,66 @@
+# tests/test_storage.py
+import os
+import time
+
+from services.storage import ArtifactManager
+
+MB = 1024 ** 2
+
+
+def _make_doc(doc_id, nbytes, upload=False):
+    os.makedirs(os.path.join("faiss_index", doc_id), exist_ok=True)
+    with open(os.path.join("faiss_index", doc_id, "index.faiss"), "wb") as f:
+        f.write(b"\0" * nbytes)
+    if upload:
+        os.makedirs("uploaded_files", exist_ok=True)
+        with open(os.path.join("uploaded_files", f"{doc_id}.pdf"), "wb") as f:
+            f.write(b"%PDF")
+
+
+def test_register_drops_upload_and_tracks_latest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mgr = ArtifactManager(catalog_path="artifacts.json")
+    _make_doc("file_a", 10, upload=True)
+    mgr.register("file_a", owner="u1", kind="file")
+
+    assert not os.path.exists(os.path.join("uploaded_files", "file_a.pdf"))
+    assert mgr.latest_indexed() == "file_a"
+
+
+def test_user_quota_evicts_coldest_and_dry_run_keeps_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mgr = ArtifactManager(catalog_path="artifacts.json", user_quota_bytes=MB, min_idle_s=60)
+    for doc_id in ("old", "mid", "new", "other"):
+        _make_doc(doc_id, MB // 2)
+        mgr.register(doc_id, owner="u2" if doc_id == "other" else "u1")
+    now = time.time()
+    for doc_id, age in (("old", 3000), ("mid", 2000), ("new", 10), ("other", 5000)):
+        mgr._catalog()[doc_id]["last_access"] = now - age
+
+    report = mgr.collect(dry_run=True)
+    # u1 holds 1.5 MB: only the coldest doc has to go; "new" is too recent anyway
+    assert [a["doc_id"] for a in report["evict"]] == ["old"]
+    assert os.path.isdir(os.path.join("faiss_index", "old"))
+
+    mgr.collect()
+    assert not os.path.exists(os.path.join("faiss_index", "old"))
+    assert sorted(mgr.usage()) == ["mid", "new", "other"]
+
+
+def test_workers_merge_their_catalog_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = ArtifactManager(catalog_path="artifacts.json")
+    second = ArtifactManager(catalog_path="artifacts.json")
+    _make_doc("a", 10)
+    _make_doc("b", 10)
+    first.register("a", owner="u1")
+    second.recently_accessed(5)          # second has now read the catalog
+    second.register("b", owner="u2")     # must not drop "a"
+    first.touch("a")
+    first._flush(force=True)
+
+    fresh = ArtifactManager(catalog_path="artifacts.json")
+    assert sorted(fresh._catalog()) == ["a", "b"]
+    assert fresh._catalog()["a"]["owner"] == "u1"
+    assert second.latest_indexed() == "b" and sorted(second._catalog()) == ["a", "b"]
+    assert not [f for f in os.listdir(".") if f.endswith(".tmp")]
@@ -0,0 +1,72 @@
+# tests/test_summary_engine.py
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from services import model_registry, stub_models
+from services.summary_engine import SummaryEngine, length_buckets, summarize_bucketed
+
+stub_models.install()
+
+
+class Recording(stub_models.StubSummarizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def __call__(self, inputs, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        self.calls.append(len(texts))
+        if any("poison" in t for t in texts):
+            raise ValueError("cannot summarize poison")
+        return super().__call__(texts, **kwargs)
+
+
+def test_length_buckets_group_similar_lengths_within_token_budget():
+    buckets = length_buckets([10, 500, 12, 480, 11, 490], max_texts=4, max_tokens=1500)
+    assert buckets == [[1, 5, 3], [2, 4, 0]]
+
+
+def test_failed_chunk_does_not_sink_its_batch():
+    summarizer = Recording()
+    results = summarize_bucketed(summarizer, ["One. Two.", "poison here.", "Three. Four."], {"max_length": 20})
+
+    assert isinstance(results[1], ValueError)
+    assert results[0]["summary_text"] == "One. Two." and results[2]["summary_text"] == "Three. Four."
+
+
+def test_concurrent_requests_share_model_calls_and_keep_their_order():
+    summarizer = Recording()
+    model_registry.override("summarizer", lambda variant: summarizer)
+    engine = SummaryEngine(wait_ms=100, max_texts=16)
+    try:
+        with ThreadPoolExecutor(6) as pool:
+            results = list(pool.map(
+                lambda r: engine.summarize([f"Request {r} chunk {c}." for c in range(3)], max_length=20), range(6)))
+    finally:
+        stub_models.install()
+
+    assert [[x["summary_text"] for x in res] for res in results] == \
+        [[f"Request {r} chunk {c}." for c in range(3)] for r in range(6)]
+    assert sum(summarizer.calls) == 18 and len(summarizer.calls) < 6
+
+
+def test_unhashable_kwargs_and_timeouts_fail_only_their_request():
+    release = threading.Event()
+
+    class Blocking(stub_models.StubSummarizer):
+        def __call__(self, inputs, **kwargs):
+            release.wait(5)
+            return super().__call__(inputs, **kwargs)
+
+    model_registry.override("summarizer", lambda variant: Blocking())
+    engine = SummaryEngine(wait_ms=0)
+    try:
+        bad = engine.submit("Some text.", stop=["\n"])
+        assert isinstance(bad.exception(timeout=5), TypeError)
+
+        assert isinstance(engine.summarize(["Slow text."], timeout=0.05, max_length=20)[0], TimeoutError)
+        release.set()
+        assert engine.summarize(["Still serving."], max_length=20)[0]["summary_text"] == "Still serving."
+    finally:
+        release.set()
+        stub_models.install()
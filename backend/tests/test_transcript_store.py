@@ -0,0 +1,45 @@
+# tests/test_transcript_store.py
+import json
+import os
+
+import pytest
+
+from services import transcript_store
+
+SEGMENTS = [
+    {"id": i, "start": i * 2.5, "end": i * 2.5 + 2.0, "text": f" Segment {i} — ünïcode", "tokens": [1, 2, 3]}
+    for i in range(1200)
+]
+
+
+@pytest.mark.parametrize("codec", ["zlib", transcript_store._default_codec()])
+def test_roundtrip_keeps_text_and_times(tmp_path, codec):
+    path = str(tmp_path / "transcript.tsz")
+    transcript_store.write_transcript(path, {"segments": SEGMENTS, "language": "en"}, codec=codec)
+
+    back = transcript_store.read_transcript(path)
+    assert back["language"] == "en"
+    assert [(s["start"], s["end"], s["text"]) for s in back["segments"]] == [
+        (s["start"], s["end"], s["text"]) for s in SEGMENTS
+    ]
+    assert back["text"] == "".join(s["text"] for s in SEGMENTS)
+    assert len(transcript_store.read_footer(path)["blocks"]) == 3
+
+
+def test_iter_segments_time_range(tmp_path):
+    path = str(tmp_path / "transcript.tsz")
+    transcript_store.write_transcript(path, {"segments": SEGMENTS})
+    ids = [s["id"] for s in transcript_store.iter_segments(path, start=2000.0, end=2010.0)]
+    assert ids == [800, 801, 802, 803, 804]
+
+
+def test_convert_json(tmp_path):
+    video_dir = tmp_path / "abc"
+    video_dir.mkdir()
+    json_path = video_dir / "transcript.json"
+    json_path.write_text(json.dumps({"text": "x", "segments": SEGMENTS[:3]}, indent=2), encoding="utf-8")
+
+    converted = transcript_store.convert_tree(str(tmp_path), remove_json=True)
+    assert converted == [str(video_dir / "transcript.tsz")]
+    assert not os.path.exists(json_path)
+    assert transcript_store.transcript_path(str(video_dir)) == converted[0]
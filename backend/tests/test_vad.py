@@ -0,0 +1,81 @@
+# tests/test_vad.py
+import numpy as np
+
+from services import vad
+from services.audio_download import SAMPLE_RATE
+
+
+def _speech(seconds: float) -> np.ndarray:
+    """Voiced harmonics of 150 Hz, pulsing at 4 syllables per second."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * 150 * k * t) for k in range(1, 16)) / 15
+    return (0.3 * voice * np.square(np.sin(np.pi * 4 * t))).astype("float32")
+
+
+def _music(seconds: float) -> np.ndarray:
+    """A sustained chord: loud, in the voice band, but steady."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.1 * sum(np.sin(2 * np.pi * f * t) for f in (440.0, 554.4, 659.3))).astype("float32")
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype="float32")
+
+
+class RecordingWhisper:
+    def __init__(self, segments=None):
+        self.calls = []
+        self.segments = segments or []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(len(audio))
+        return {"text": "", "language": "en", "segments": [dict(s) for s in self.segments]}
+
+
+def test_speech_regions_skip_silence_and_music():
+    audio = np.concatenate([_silence(2), _speech(3), _music(4), _silence(2), _speech(2)])
+    regions = [(s / SAMPLE_RATE, e / SAMPLE_RATE) for s, e in vad.speech_regions(audio)]
+
+    assert len(regions) == 2
+    (a0, a1), (b0, b1) = regions
+    assert 1.6 <= a0 <= 2.0 and 5.0 <= a1 <= 6.0    # padded, and at most ~0.5 s into the music
+    assert 10.6 <= b0 <= 11.0 and b1 >= 12.9
+    assert not any(s <= 7.0 <= e for s, e in regions)
+
+
+def test_compacted_times_map_back_to_the_original():
+    audio = _silence(8)
+    regions = [(1 * SAMPLE_RATE, 2 * SAMPLE_RATE), (5 * SAMPLE_RATE, 6 * SAMPLE_RATE)]
+    speech, time_map = vad.compact(audio, regions, gap_ms=300)
+    assert len(speech) == int(2.3 * SAMPLE_RATE)
+
+    result = time_map.restore({"segments": [
+        {"start": 0.5, "end": 0.9, "text": "one", "words": [{"start": 0.5, "end": 0.7}]},
+        {"start": 1.2, "end": 2.0, "text": "two"},   # starts inside the inserted pause
+    ]})
+    first, second = result["segments"]
+    assert (first["start"], first["end"]) == (1.5, 1.9)
+    assert (first["words"][0]["start"], first["words"][0]["end"]) == (1.5, 1.7)
+    assert (second["start"], second["end"]) == (5.0, 5.7)
+
+    assert vad.clip(regions, 4 * SAMPLE_RATE, 8 * SAMPLE_RATE) == [(1 * SAMPLE_RATE, 2 * SAMPLE_RATE)]
+
+
+def test_transcribe_speech_sends_only_speech_and_falls_back_when_unsure():
+    audio = np.concatenate([_music(6), _speech(3), _silence(6)])
+    model = RecordingWhisper([{"start": 0.3, "end": 1.0, "text": "hello"}])
+    result = vad.transcribe_speech(model, audio)
+    assert model.calls[0] < len(audio) / 2
+    assert result["segments"][0]["start"] >= 5.5
+
+    silent = RecordingWhisper()
+    vad.transcribe_speech(silent, _silence(5))          # nothing detected: Whisper gets everything
+    assert silent.calls == [5 * SAMPLE_RATE]
+
+    skipped = RecordingWhisper()
+    assert vad.transcribe_speech(skipped, _silence(5), regions=[])["segments"] == []
+    assert skipped.calls == []
+
+    talk = RecordingWhisper()
+    vad.transcribe_speech(talk, _speech(4), regions=[(0, 4 * SAMPLE_RATE - 10)])  # nothing worth cutting
+    assert talk.calls == [4 * SAMPLE_RATE]
@@ -0,0 +1,85 @@
+# tests/test_warmup.py
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.access_log import AccessLog
+from api.models import Base, DocumentAccess, QueryLog
+from api.warmup import Warmup
+from services import embeddings_index, model_registry, stub_models
+from services.embeddings_index import FaissIndexManager
+from services.storage import artifacts
+
+stub_models.install()
+
+
+def _log(tmp_path, keep_questions=50):
+    engine = create_engine(f"sqlite:///{tmp_path / 'access.db'}")
+    Base.metadata.create_all(bind=engine)
+    return AccessLog(session_factory=sessionmaker(bind=engine), keep_questions=keep_questions)
+
+
+def test_flush_counts_documents_and_keeps_recent_questions(tmp_path):
+    log = _log(tmp_path, keep_questions=2)
+    log.record("vid", "What is a GPU?")
+    log.record("vid", "what is  a gpu?")       # same question, new wording
+    log.record("vid", "Who is speaking?")
+    log.record("vid")                           # summary request: counted, no question
+    assert log.flush() == 4
+    log.record("vid", "Where was it filmed?")
+    log.flush()
+
+    db = log.session_factory()
+    try:
+        assert db.get(DocumentAccess, "vid").queries == 5
+        rows = {r.question_key: (r.count, r.question) for r in db.query(QueryLog).all()}
+    finally:
+        db.close()
+    assert len(rows) == 2 and "where was it filmed?" in rows
+    assert log.hot_documents(5) == ["vid"]
+
+
+def test_workers_flushing_the_same_new_question_both_count(tmp_path):
+    first = _log(tmp_path)
+    second = AccessLog(session_factory=first.session_factory)
+    first.record("vid", "Is it live?")
+    second.record("vid", "is it  live?")
+    assert first.flush() == 1 and second.flush() == 1
+
+    db = first.session_factory()
+    try:
+        assert db.get(DocumentAccess, "vid").queries == 2
+        assert [(r.count, r.question) for r in db.query(QueryLog).all()] == [(2, "is it  live?")]
+    finally:
+        db.close()
+
+
+def test_warmup_loads_hot_indexes_and_question_embeddings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fm = FaissIndexManager()
+    for doc_id in ("cold", "hot"):
+        fm.build_index(doc_id, [f"{doc_id} text"], [{"chunk_text": f"{doc_id} text", "start": 0, "end": 1}])
+    monkeypatch.setattr(artifacts, "recently_accessed", lambda limit: ["cold"][:limit])
+    embeddings_index._index_cache.clear()
+    embeddings_index._query_cache.clear()
+
+    log = _log(tmp_path)
+    for _ in range(3):
+        log.record("hot", "what is hot?")
+    log.record("cold", "what is cold?")
+    log.flush()
+
+    warm = Warmup(log)
+    assert not warm.ready
+    status = warm.run(models=["embedder"], docs=1, questions=5)
+    assert status["ready"] and status["documents"] == ["hot"] and status["questions"] == 1
+    assert list(embeddings_index._index_cache) == [os.path.join("faiss_index", "hot")]
+    assert FaissIndexManager().embed_queries(["what is hot?"]) == 0  # already cached
+    model_registry.unload("embedder")
+    assert FaissIndexManager().embed_queries(["what is hot?"]) == 1  # vectors went with the model
+
+    # a memory budget too small for any index loads nothing, but still becomes ready
+    embeddings_index._index_cache.clear()
+    status = Warmup(log).run(models=[], docs=2, memory_mb=0)
+    assert status["ready"] and status["documents"] == [] and status["skipped"] == ["hot", "cold"]